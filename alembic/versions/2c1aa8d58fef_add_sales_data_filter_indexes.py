@@ -0,0 +1,57 @@
+"""Add sales_data indexes for dashboard filters and customer search
+
+Revision ID: 2c1aa8d58fef
+Revises: 7c77466c704a
+Create Date: 2025-10-23 11:48:55.270391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c1aa8d58fef'
+down_revision: Union[str, Sequence[str], None] = '7c77466c704a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so uploads and dashboard reads keep working during the migration.
+    with op.get_context().autocommit_block():
+        # Equality filter + date range; the INCLUDE columns let the dashboard aggregates
+        # run as index-only scans.
+        op.create_index('ix_sales_data_location_date', 'sales_data', ['location', 'date'],
+                        postgresql_include=['sales_rep', 'customer_name', *PRODUCTS],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_sales_data_sales_rep_date', 'sales_data', ['sales_rep', 'date'],
+                        postgresql_include=['location', 'customer_name', *PRODUCTS],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_sales_data_customer_name_date', 'sales_data', ['customer_name', 'date'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Customer typeahead: prefix matches use the btree, substring matches the trigram index.
+        op.create_index('ix_sales_data_customer_name_prefix', 'sales_data',
+                        [sa.text('lower(customer_name) text_pattern_ops')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        trgm_available = op.get_bind().execute(
+            sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        ).scalar()
+        if trgm_available:
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            op.create_index('ix_sales_data_customer_name_trgm', 'sales_data',
+                            [sa.text('lower(customer_name) gin_trgm_ops')],
+                            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sales_data_customer_name_trgm', table_name='sales_data', if_exists=True)
+    op.drop_index('ix_sales_data_customer_name_prefix', table_name='sales_data')
+    op.drop_index('ix_sales_data_customer_name_date', table_name='sales_data')
+    op.drop_index('ix_sales_data_sales_rep_date', table_name='sales_data')
+    op.drop_index('ix_sales_data_location_date', table_name='sales_data')
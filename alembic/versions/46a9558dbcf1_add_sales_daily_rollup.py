@@ -0,0 +1,59 @@
+"""Add sales_daily_rollup table
+
+Revision ID: 46a9558dbcf1
+Revises: ba3b80f82324
+Create Date: 2025-10-20 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '46a9558dbcf1'
+down_revision: Union[str, Sequence[str], None] = 'ba3b80f82324'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('location', sa.String(), nullable=False),
+    sa.Column('sales_rep', sa.String(), nullable=False),
+    sa.Column('imperial_crown', sa.Float(), server_default='0', nullable=False),
+    sa.Column('cranberry', sa.Float(), server_default='0', nullable=False),
+    sa.Column('orange', sa.Float(), server_default='0', nullable=False),
+    sa.Column('mango', sa.Float(), server_default='0', nullable=False),
+    sa.Column('black_stallion', sa.Float(), server_default='0', nullable=False),
+    sa.Column('transactions', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sale_transactions', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day', 'location', 'sales_rep')
+    )
+    # Backfill from the existing transactions; product totals only count sales (total units > 0).
+    op.execute("""
+        INSERT INTO sales_daily_rollup (day, location, sales_rep, imperial_crown, cranberry, orange, mango,
+                                        black_stallion, transactions, sale_transactions)
+        SELECT date(timezone('UTC', date)), location, sales_rep,
+               coalesce(sum(coalesce(imperial_crown, 0)) FILTER (WHERE is_sale), 0),
+               coalesce(sum(coalesce(cranberry, 0)) FILTER (WHERE is_sale), 0),
+               coalesce(sum(coalesce(orange, 0)) FILTER (WHERE is_sale), 0),
+               coalesce(sum(coalesce(mango, 0)) FILTER (WHERE is_sale), 0),
+               coalesce(sum(coalesce(black_stallion, 0)) FILTER (WHERE is_sale), 0),
+               count(*),
+               count(*) FILTER (WHERE is_sale)
+        FROM (
+            SELECT *, coalesce(imperial_crown, 0) + coalesce(cranberry, 0) + coalesce(orange, 0)
+                      + coalesce(mango, 0) + coalesce(black_stallion, 0) > 0 AS is_sale
+            FROM sales_data
+        ) AS sales
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sales_daily_rollup')
@@ -0,0 +1,60 @@
+"""Add products and sales_line_items tables
+
+Revision ID: 5d8e2f4a6b19
+Revises: 2c1aa8d58fef
+Create Date: 2025-10-27 10:21:36.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2f4a6b19'
+down_revision: Union[str, Sequence[str], None] = '2c1aa8d58fef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    products = op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.bulk_insert(products, [{'name': product} for product in PRODUCTS])
+    op.create_table('sales_line_items',
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales_data.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sale_id', 'product_id')
+    )
+    # Backfill from the wide product columns, keeping only nonzero quantities.
+    op.execute(f"""
+        INSERT INTO sales_line_items (sale_id, product_id, quantity)
+        SELECT sales_data.id, products.id, item.quantity
+        FROM sales_data
+        CROSS JOIN LATERAL unnest(ARRAY[{', '.join(f"'{product}'" for product in PRODUCTS)}],
+                                  ARRAY[{', '.join(PRODUCTS)}]) AS item(product, quantity)
+        JOIN products ON products.name = item.product
+        WHERE item.quantity <> 0
+    """)
+    # Built after the backfill; serves the product filter and per-product aggregates.
+    op.create_index('ix_sales_line_items_product_id_sale_id', 'sales_line_items', ['product_id', 'sale_id'],
+                    postgresql_include=['quantity'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sales_line_items_product_id_sale_id', table_name='sales_line_items')
+    op.drop_table('sales_line_items')
+    op.drop_table('products')
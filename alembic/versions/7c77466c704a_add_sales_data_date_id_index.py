@@ -0,0 +1,28 @@
+"""Add (date, id) index on sales_data for keyset pagination
+
+Revision ID: 7c77466c704a
+Revises: af730114e06e
+Create Date: 2025-10-22 14:05:19.640127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c77466c704a'
+down_revision: Union[str, Sequence[str], None] = 'af730114e06e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_sales_data_date_id', 'sales_data', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sales_data_date_id', table_name='sales_data')
@@ -0,0 +1,72 @@
+"""Add customers table with lifetime stats
+
+Revision ID: 8a3c6e1f9d27
+Revises: 5d8e2f4a6b19
+Create Date: 2025-10-28 09:14:52.306147
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3c6e1f9d27'
+down_revision: Union[str, Sequence[str], None] = '5d8e2f4a6b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NAME_KEY = r"lower(regexp_replace(btrim(customer_name), '\s+', ' ', 'g'))"
+PHONE_KEY = r"regexp_replace(coalesce(phone_no, ''), '\D', '', 'g')"
+TOTAL_UNITS = ("coalesce(imperial_crown, 0) + coalesce(cranberry, 0) + coalesce(orange, 0)"
+               " + coalesce(mango, 0) + coalesce(black_stallion, 0)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name_key', sa.String(), nullable=False),
+    sa.Column('phone_key', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('phone_no', sa.String(), nullable=True),
+    sa.Column('transactions', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('purchases', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('total_units', sa.Float(), server_default='0', nullable=False),
+    sa.Column('first_purchase', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('last_purchase', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('locations', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sales_reps', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name_key', 'phone_key', name='uq_customers_name_key_phone_key')
+    )
+    # Lets write paths recompute the customers they touch without scanning sales_data.
+    op.create_index('ix_sales_data_customer_key', 'sales_data', [sa.text(NAME_KEY), sa.text(PHONE_KEY)])
+    op.execute(f"""
+        INSERT INTO customers (name_key, phone_key, name, phone_no, transactions, purchases, total_units,
+                               first_purchase, last_purchase, locations, sales_reps)
+        SELECT {NAME_KEY}, {PHONE_KEY},
+               (array_agg(customer_name ORDER BY date DESC))[1],
+               (array_agg(phone_no ORDER BY date DESC))[1],
+               count(*),
+               count(*) FILTER (WHERE {TOTAL_UNITS} > 0),
+               coalesce(sum({TOTAL_UNITS}) FILTER (WHERE {TOTAL_UNITS} > 0), 0),
+               min(date) FILTER (WHERE {TOTAL_UNITS} > 0),
+               max(date) FILTER (WHERE {TOTAL_UNITS} > 0),
+               count(DISTINCT location),
+               count(DISTINCT sales_rep)
+        FROM sales_data
+        GROUP BY 1, 2
+    """)
+    op.create_index('ix_customers_total_units_id', 'customers', ['total_units', 'id'])
+    op.create_index('ix_customers_last_purchase', 'customers', ['last_purchase'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customers_last_purchase', table_name='customers')
+    op.drop_index('ix_customers_total_units_id', table_name='customers')
+    op.drop_index('ix_sales_data_customer_key', table_name='sales_data')
+    op.drop_table('customers')
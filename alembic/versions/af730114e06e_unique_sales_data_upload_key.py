@@ -0,0 +1,43 @@
+"""Add unique constraint on sales_data (date, customer_name, location)
+
+Revision ID: af730114e06e
+Revises: 46a9558dbcf1
+Create Date: 2025-10-21 09:37:02.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'af730114e06e'
+down_revision: Union[str, Sequence[str], None] = '46a9558dbcf1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Uploads treat (date, customer_name, location) as the identity of a transaction. Rows that
+    # share one may be distinct purchases, so they are left for an operator to resolve.
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM (
+            SELECT 1 FROM sales_data GROUP BY date, customer_name, location HAVING count(*) > 1
+        ) AS keys
+    """)).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} (date, customer_name, location) keys are shared by several sales_data rows. "
+            "Merge them or give them distinct dates, then rerun the migration. To list them:\n"
+            "    SELECT date, customer_name, location, array_agg(id) FROM sales_data "
+            "GROUP BY 1, 2, 3 HAVING count(*) > 1;"
+        )
+    op.create_unique_constraint('uq_sales_data_date_customer_location', 'sales_data',
+                                ['date', 'customer_name', 'location'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_sales_data_date_customer_location', 'sales_data', type_='unique')
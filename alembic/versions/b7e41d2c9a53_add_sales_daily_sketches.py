@@ -0,0 +1,116 @@
+"""Add sales_daily_sketches table
+
+Revision ID: b7e41d2c9a53
+Revises: 8a3c6e1f9d27
+Create Date: 2025-10-29 11:02:17.845210
+
+"""
+from hashlib import blake2b
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d2c9a53'
+down_revision: Union[str, Sequence[str], None] = '8a3c6e1f9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The backfill is frozen here rather than imported from the app, so this revision always
+# writes what it wrote when it was made: HyperLogLog sketches as serialized by
+# app/utilities/hll.py at this revision, for each UTC day as a whole ('all'), per location and
+# per sales rep.
+PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
+SKETCH_COLUMNS = {
+    'customers': ('customer_name', True),
+    'sales_reps': ('sales_rep', True),
+    'all_customers': ('customer_name', False),
+    'all_locations': ('location', False),
+    'all_sales_reps': ('sales_rep', False),
+}
+PRECISION = 12
+SPARSE_PRECISION = 25
+SPARSE_LIMIT = (1 << PRECISION) // 4
+RANK_BITS = 6
+EXTRA_BITS = SPARSE_PRECISION - PRECISION
+
+
+def _entry(value: str) -> int:
+    rank_bits = 64 - SPARSE_PRECISION
+    hashed = int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+    rank = rank_bits - (hashed & ((1 << rank_bits) - 1)).bit_length() + 1
+    return (hashed >> rank_bits) << RANK_BITS | rank
+
+
+def _sketch(values: set) -> bytes:
+    # The highest entry of a sparse index is the one with the highest rank.
+    best = {}
+    for value in values:
+        entry = _entry(str(value))
+        best[entry >> RANK_BITS] = max(best.get(entry >> RANK_BITS, 0), entry)
+    entries = sorted(best.values())
+    if len(entries) <= SPARSE_LIMIT:
+        return b'H' + bytes([PRECISION]) + b'S' + np.array(entries, dtype='<u4').tobytes()
+    registers = bytearray(1 << PRECISION)
+    for entry in entries:
+        index = entry >> RANK_BITS
+        extra = index & ((1 << EXTRA_BITS) - 1)
+        rank = EXTRA_BITS - extra.bit_length() + 1 if extra else EXTRA_BITS + (entry & ((1 << RANK_BITS) - 1))
+        registers[index >> EXTRA_BITS] = max(registers[index >> EXTRA_BITS], rank)
+    return b'H' + bytes([PRECISION]) + b'D' + bytes(registers)
+
+
+def _write_day(connection, day, values: dict):
+    connection.execute(sa.text(
+        "INSERT INTO sales_daily_sketches (day, dimension, value, " + ", ".join(SKETCH_COLUMNS) + ") "
+        "VALUES (:day, :dimension, :value, " + ", ".join(f":{column}" for column in SKETCH_COLUMNS) + ")"
+    ), [{'day': day, 'dimension': dimension, 'value': value,
+         **{column: _sketch(sets[column]) for column in SKETCH_COLUMNS}}
+        for (dimension, value), sets in values.items()])
+
+
+def _backfill(connection):
+    """Sketch every day of sales_data, one day at a time."""
+    is_sale = ' + '.join(f"coalesce({product}, 0)" for product in PRODUCTS) + ' > 0'
+    rows = connection.execute(sa.text(
+        f"SELECT date(timezone('UTC', date)) AS day, location, sales_rep, customer_name, {is_sale} AS sale "
+        "FROM sales_data ORDER BY 1"
+    ).execution_options(stream_results=True))
+    day, values = None, {}
+    for row in rows:
+        if row.day != day:
+            if values:
+                _write_day(connection, day, values)
+            day, values = row.day, {}
+        for key in (('all', ''), ('location', row.location), ('sales_rep', row.sales_rep)):
+            sets = values.setdefault(key, {column: set() for column in SKETCH_COLUMNS})
+            for column, (sketched, sales_only) in SKETCH_COLUMNS.items():
+                if row.sale or not sales_only:
+                    sets[column].add(getattr(row, sketched))
+    if values:
+        _write_day(connection, day, values)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_daily_sketches',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('customers', sa.LargeBinary(), nullable=False),
+    sa.Column('sales_reps', sa.LargeBinary(), nullable=False),
+    sa.Column('all_customers', sa.LargeBinary(), nullable=False),
+    sa.Column('all_locations', sa.LargeBinary(), nullable=False),
+    sa.Column('all_sales_reps', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'dimension', 'value')
+    )
+    # There is no HyperLogLog in core Postgres, so the sketches are built in Python.
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sales_daily_sketches')
@@ -0,0 +1,101 @@
+"""Partition sales_data by month
+
+Revision ID: c4f9a7e2b816
+Revises: b7e41d2c9a53
+Create Date: 2025-10-30 14:37:05.118492
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f9a7e2b816'
+down_revision: Union[str, Sequence[str], None] = 'b7e41d2c9a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
+MONTHS_AHEAD = 3
+NAME_KEY = r"lower(regexp_replace(btrim(customer_name), '\s+', ' ', 'g'))"
+PHONE_KEY = r"regexp_replace(coalesce(phone_no, ''), '\D', '', 'g')"
+
+
+def _month(moment: datetime) -> date:
+    moment = moment.astimezone(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _create_indexes(partitioned: bool) -> None:
+    op.create_primary_key('sales_data_pkey', 'sales_data', ['id', 'date'] if partitioned else ['id'])
+    op.create_unique_constraint('uq_sales_data_date_customer_location', 'sales_data', ['date', 'customer_name', 'location'])
+    op.create_foreign_key('sales_data_user_id_fkey', 'sales_data', 'admins', ['user_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_sales_data_date_id', 'sales_data', ['date', 'id'])
+    op.create_index('ix_sales_data_location_date', 'sales_data', ['location', 'date'],
+                    postgresql_include=['sales_rep', 'customer_name', *PRODUCTS])
+    op.create_index('ix_sales_data_sales_rep_date', 'sales_data', ['sales_rep', 'date'],
+                    postgresql_include=['location', 'customer_name', *PRODUCTS])
+    op.create_index('ix_sales_data_customer_name_date', 'sales_data', ['customer_name', 'date'])
+    op.create_index('ix_sales_data_customer_name_prefix', 'sales_data', [sa.text('lower(customer_name) text_pattern_ops')])
+    op.create_index('ix_sales_data_customer_key', 'sales_data', [sa.text(NAME_KEY), sa.text(PHONE_KEY)])
+    trgm_installed = op.get_bind().execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+    if trgm_installed:
+        op.create_index('ix_sales_data_customer_name_trgm', 'sales_data', [sa.text('lower(customer_name) gin_trgm_ops')],
+                        postgresql_using='gin')
+
+
+def _replace_sales_data(new_table: str) -> None:
+    """Swap the filled `new_table` in for sales_data, keeping its id sequence."""
+    op.drop_constraint('sales_line_items_sale_id_fkey', 'sales_line_items', type_='foreignkey')
+    op.execute("ALTER SEQUENCE sales_data_id_seq OWNED BY NONE")
+    op.drop_table('sales_data')
+    op.rename_table(new_table, 'sales_data')
+    op.execute("ALTER SEQUENCE sales_data_id_seq OWNED BY sales_data.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.execute("CREATE TABLE sales_data_partitioned (LIKE sales_data INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+    # One partition per UTC month from the oldest row to a few months past today.
+    first, last = bind.execute(sa.text("SELECT min(date), max(date) FROM sales_data")).one()
+    now = datetime.now(timezone.utc)
+    month, stop = _month(first or now), _month(max(last or now, now))
+    for _ in range(MONTHS_AHEAD):
+        stop = _next_month(stop)
+    while month <= stop:
+        op.execute(f"CREATE TABLE sales_data_y{month.year}m{month.month:02d} PARTITION OF sales_data_partitioned "
+                   f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{_next_month(month)} 00:00:00+00')")
+        month = _next_month(month)
+    op.execute("INSERT INTO sales_data_partitioned SELECT * FROM sales_data")
+
+    # A foreign key to a partitioned table must cover the partition key too.
+    op.add_column('sales_line_items', sa.Column('sale_date', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.execute("UPDATE sales_line_items SET sale_date = sales_data.date FROM sales_data WHERE sales_data.id = sales_line_items.sale_id")
+    op.alter_column('sales_line_items', 'sale_date', nullable=False)
+
+    _replace_sales_data('sales_data_partitioned')
+    # Built after the load, on every partition at once.
+    _create_indexes(partitioned=True)
+    op.create_foreign_key('sales_line_items_sale_id_fkey', 'sales_line_items', 'sales_data',
+                          ['sale_id', 'sale_date'], ['id', 'date'], ondelete='CASCADE', onupdate='CASCADE')
+    op.execute("ANALYZE sales_data")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("CREATE TABLE sales_data_unpartitioned (LIKE sales_data INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO sales_data_unpartitioned SELECT * FROM sales_data")
+    _replace_sales_data('sales_data_unpartitioned')
+    _create_indexes(partitioned=False)
+    op.create_foreign_key('sales_line_items_sale_id_fkey', 'sales_line_items', 'sales_data',
+                          ['sale_id'], ['id'], ondelete='CASCADE')
+    op.drop_column('sales_line_items', 'sale_date')
+    op.execute("ANALYZE sales_data")
@@ -1,16 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from .routers import dashboard, user
 from .routers import auth
-from .utilities import database
+from .utilities import data_version, database, pagination, partitions
+from .utilities.compression import CompressionMiddleware
+from .utilities.config import settings
 from .utilities.database import engine
+from .utilities.metrics import MetricsMiddleware
+from .utilities.responses import ORJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rows for the coming months must have partitions before anyone writes them.
+    with database.SessionLocal() as db:
+        partitions.ensure_upcoming(db)
+        db.commit()
+    listener = asyncio.create_task(data_version.sales_version.listen())
+    yield
+    listener.cancel()
+
 
 # database.Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="Sales Dashboard API",
     description="Sales Dashboard API helps to manage sales data and provides insights through various endpoints."
                 "copyright © 2025 Charvet Group. All rights reserved.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 origins = [
     "https://charvet-group.vercel.app",
@@ -23,9 +45,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+# Added last so it wraps everything else and times the whole request.
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(dashboard.router)
 app.include_router(user.router)
 app.include_router(auth.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint for this worker's request, stage, SQL and pool metrics."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
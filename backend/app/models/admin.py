@@ -1,6 +1,6 @@
 from sqlalchemy.orm import relationship
 from ..utilities import database
-from sqlalchemy import Integer, String, Column, Boolean, TIMESTAMP, text, Float, ForeignKey
+from sqlalchemy import BigInteger, Integer, String, Column, Boolean, TIMESTAMP, text, Float, ForeignKey, ForeignKeyConstraint, Date, UniqueConstraint, Index, func, literal_column, LargeBinary
 
 
 class User(database.Base):
@@ -21,7 +21,8 @@ class User(database.Base):
 class SalesData(database.Base):
     __tablename__ = "sales_data"
     id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
-    date = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    # Part of the primary key because sales_data is partitioned by month on it, see utilities/partitions.py.
+    date = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False, server_default=text('now()'))
     location = Column(String, nullable=False)
     customer_name = Column(String, nullable=False)
     phone_no = Column(String, nullable=True)
@@ -33,3 +34,106 @@ class SalesData(database.Base):
     sales_rep = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey("admins.id", ondelete="CASCADE"))
     owner = relationship("User", back_populates="sales")
+    __table_args__ = (
+        UniqueConstraint('date', 'customer_name', 'location', name='uq_sales_data_date_customer_location'),
+        Index('ix_sales_data_date_id', 'date', 'id'),
+        Index('ix_sales_data_location_date', 'location', 'date',
+              postgresql_include=['sales_rep', 'customer_name', 'imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']),
+        Index('ix_sales_data_sales_rep_date', 'sales_rep', 'date',
+              postgresql_include=['location', 'customer_name', 'imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']),
+        Index('ix_sales_data_customer_name_date', 'customer_name', 'date'),
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
+
+
+Index('ix_sales_data_customer_name_prefix', func.lower(SalesData.customer_name).label('customer_name_lower'),
+      postgresql_ops={'customer_name_lower': 'text_pattern_ops'})
+# Only created where the pg_trgm extension is available.
+Index('ix_sales_data_customer_name_trgm', func.lower(SalesData.customer_name).label('customer_name_lower'),
+      postgresql_using='gin', postgresql_ops={'customer_name_lower': 'gin_trgm_ops'})
+
+# Customer identity: the name compared case- and whitespace-insensitively, and the digits of the
+# phone number. Constants are inlined so the expressions match the index below when grouped on.
+customer_name_key = func.lower(func.regexp_replace(func.btrim(SalesData.customer_name), literal_column(r"'\s+'"),
+                                                   literal_column("' '"), literal_column("'g'")))
+customer_phone_key = func.regexp_replace(func.coalesce(SalesData.phone_no, literal_column("''")), literal_column(r"'\D'"),
+                                         literal_column("''"), literal_column("'g'"))
+Index('ix_sales_data_customer_key', customer_name_key, customer_phone_key)
+
+
+class SalesDailyRollup(database.Base):
+    __tablename__ = "sales_daily_rollup"
+    day = Column(Date, primary_key=True, nullable=False)
+    location = Column(String, primary_key=True, nullable=False)
+    sales_rep = Column(String, primary_key=True, nullable=False)
+    imperial_crown = Column(Float, nullable=False, server_default='0')
+    cranberry = Column(Float, nullable=False, server_default='0')
+    orange = Column(Float, nullable=False, server_default='0')
+    mango = Column(Float, nullable=False, server_default='0')
+    black_stallion = Column(Float, nullable=False, server_default='0')
+    transactions = Column(Integer, nullable=False, server_default='0')
+    sale_transactions = Column(Integer, nullable=False, server_default='0')
+
+
+class SalesDailySketch(database.Base):
+    __tablename__ = "sales_daily_sketches"
+    day = Column(Date, primary_key=True, nullable=False)
+    # 'all' (value ''), 'location' or 'sales_rep'.
+    dimension = Column(String, primary_key=True, nullable=False)
+    value = Column(String, primary_key=True, nullable=False)
+    # Serialized HyperLogLog sketches, see utilities/hll.py; the all_ ones cover every row, the others sales only.
+    customers = Column(LargeBinary, nullable=False)
+    sales_reps = Column(LargeBinary, nullable=False)
+    all_customers = Column(LargeBinary, nullable=False)
+    all_locations = Column(LargeBinary, nullable=False)
+    all_sales_reps = Column(LargeBinary, nullable=False)
+
+
+class Product(database.Base):
+    __tablename__ = "products"
+    id = Column(Integer, primary_key=True, nullable=False)
+    name = Column(String, nullable=False, unique=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+
+class SalesLineItem(database.Base):
+    __tablename__ = "sales_line_items"
+    sale_id = Column(Integer, primary_key=True, nullable=False)
+    # The sale's date, completing the reference to the partitioned sales_data key.
+    sale_date = Column(TIMESTAMP(timezone=True), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    quantity = Column(Float, nullable=False)
+    __table_args__ = (
+        ForeignKeyConstraint(['sale_id', 'sale_date'], ['sales_data.id', 'sales_data.date'],
+                             ondelete='CASCADE', onupdate='CASCADE'),
+        Index('ix_sales_line_items_product_id_sale_id', 'product_id', 'sale_id', postgresql_include=['quantity']),
+    )
+
+
+class Customer(database.Base):
+    __tablename__ = "customers"
+    id = Column(Integer, primary_key=True, nullable=False)
+    name_key = Column(String, nullable=False)
+    phone_key = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    phone_no = Column(String, nullable=True)
+    transactions = Column(Integer, nullable=False, server_default='0')
+    purchases = Column(Integer, nullable=False, server_default='0')
+    total_units = Column(Float, nullable=False, server_default='0')
+    first_purchase = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_purchase = Column(TIMESTAMP(timezone=True), nullable=True)
+    locations = Column(Integer, nullable=False, server_default='0')
+    sales_reps = Column(Integer, nullable=False, server_default='0')
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    __table_args__ = (
+        UniqueConstraint('name_key', 'phone_key', name='uq_customers_name_key_phone_key'),
+        Index('ix_customers_total_units_id', 'total_units', 'id'),
+        Index('ix_customers_last_purchase', 'last_purchase'),
+    )
+
+
+class SalesDataVersion(database.Base):
+    __tablename__ = "sales_data_version"
+    # A single row (id 1); every sales write bumps the version, see utilities/data_version.py.
+    id = Column(Integer, primary_key=True, nullable=False)
+    version = Column(BigInteger, nullable=False, server_default='0')
@@ -60,7 +60,7 @@ def login(user_cred: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 @router.post("/grant-superadmin/{user_id}", status_code=status.HTTP_200_OK)
 def grant_superadmin_privileges(user_id: int, db: Session = Depends(database.get_db),
-                                current_user: admin.User = Depends(oauth2.get_current_superadmin)):
+                                current_user: tk.Principal = Depends(oauth2.get_current_superadmin)):
     # The get_current_superadmin dependency ensures only superadmins can call this
     user_to_promote = db.query(admin.User).filter(admin.User.id == user_id).first()
     if not user_to_promote:
@@ -68,4 +68,5 @@ def grant_superadmin_privileges(user_id: int, db: Session = Depends(database.get
 
     user_to_promote.is_superadmin = True
     db.commit()
+    oauth2.invalidate_principal(user_id)
     return {"message": f"User {user_to_promote.email} is now a superadmin."}
@@ -1,301 +1,454 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy import and_
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import pandas as pd
-from io import BytesIO
-from ..schemas import data
-from ..utilities.database import get_db
+import numpy as np
+from ..schemas import data, tk
+from ..utilities.database import get_db, get_async_db, get_read_db, get_async_read_db, replica
 from ..models import admin
-from ..utilities import oauth2
+from ..utilities import oauth2, analytics, rollup, line_items, customers, sketches, partitions, ingest, pagination, workers, export, responses, metrics, data_version, live, batch
+from ..utilities.cache import analytics_cache
+from ..utilities.data_version import sales_version
+from ..utilities.snapshot import sales_snapshot
+from ..utilities.querylog import query_log
+from ..utilities.analytics import PRODUCTS
+from ..utilities.config import settings
+from ..utilities.responses import ORJSONResponse
 router = APIRouter(
     prefix="/sales",
     tags=["Dashboard"]
 )
 
-PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
-
-def get_sales_data_df(db: Session, filters: data.DashboardFilters = None):
-    """Fetch sales data from database and return as a pandas DataFrame."""
-    try:
-        query = db.query(admin.SalesData)
-        if filters:
-            filter_conditions = []
-            if filters.start_date:
-                filter_conditions.append(admin.SalesData.date >= filters.start_date)
-            if filters.end_date:
-                filter_conditions.append(admin.SalesData.date <= filters.end_date)
-            if filters.location:
-                filter_conditions.append(admin.SalesData.location == filters.location)
-            if filters.sales_rep:
-                filter_conditions.append(admin.SalesData.sales_rep == filters.sales_rep)
-            if filters.customer_name:
-                filter_conditions.append(admin.SalesData.customer_name == filters.customer_name)
-            if filter_conditions:
-                query = query.filter(and_(*filter_conditions))
-        df = pd.read_sql(query.statement, query.session.bind)
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-        return df
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+SALE_RECORD_COLUMNS = list(data.SaleRecord.model_fields)
 
 
 @router.get("/overview")
-async def get_dashboard_overview(filters: data.DashboardFilters = Depends(), db: Session = Depends(get_db)):
-    """Get overall dashboard statistics"""
-    df = get_sales_data_df(db, filters)
-    if df.empty:
-        return {"error": "No data available"}
-
-    df['total_sales'] = df[PRODUCTS].sum(axis=1)
-    df_sales = df[df['total_sales'] > 0].copy()
-    df_sales['location'].replace('-', 'other', inplace=True)
-    overview = {
-        "total_records": len(df),
-        "total_sales_records": len(df_sales),
-        "total_units_sold": float(df_sales['total_sales'].sum()),
-        "avg_units_per_transaction": float(df_sales['total_sales'].mean()),
-        "date_range": {
-            "start": df['date'].min().strftime('%Y-%m-%d') if not df.empty else None,
-            "end": df['date'].max().strftime('%Y-%m-%d') if not df.empty else None
-        },
-        "unique_customers": int(df['customer_name'].nunique()),
-        "unique_locations": int(df['location'].nunique()),
-        "unique_sales_reps": int(df['sales_rep'].nunique()),
-        "product_totals": {
-            product: float(df_sales[product].sum()) for product in PRODUCTS
-        }
-    }
-
-    return overview
+async def get_dashboard_overview(filters: data.DashboardFilters = Depends(), exact: bool = False,
+                                 db: AsyncSession = Depends(get_async_read_db), cache_headers: dict = Depends(data_version.check_etag)):
+    """Get overall dashboard statistics; unique counts are estimated from daily sketches unless `exact`"""
+    overview = await analytics_cache.get_or_compute_async(
+        analytics_cache.key('overview', filters, exact=exact),
+        lambda: db.run_sync(analytics.sales_overview, filters, exact))
+    if overview is None:
+        return ORJSONResponse({"error": "No data available"}, headers=cache_headers)
+    return ORJSONResponse(overview, headers=cache_headers)
 
 
 @router.get("/daily")
-async def get_daily_sales(filters: data.DashboardFilters = Depends(), db: Session = Depends(get_db), current_user: admin.User = Depends(
-    oauth2.get_current_user)):
-    """Get daily sales trends"""
-    df = get_sales_data_df(db, filters)
-    if df.empty:
-        return {
-            "daily_sales": [],
-            "total_days": 0
-        }
-
-    df['total_sales'] = df[PRODUCTS].sum(axis=1)
-    df_sales = df[df['total_sales'] > 0].copy()
-
-    daily_sales = df_sales.groupby(df_sales['date'].dt.date)[PRODUCTS + ['total_sales']].sum().reset_index()
-    daily_sales['date'] = pd.to_datetime(daily_sales['date']).dt.strftime('%Y-%m-%d')
-
-    return {
-        "daily_sales": daily_sales.to_dict('records'),
-        "total_days": len(daily_sales)
-    }
+async def get_daily_sales(filters: data.DashboardFilters = Depends(), granularity: data.Granularity = 'day', tz: str = 'UTC',
+                          fill_gaps: bool = False, db: AsyncSession = Depends(get_async_read_db), current_user: tk.Principal = Depends(
+    oauth2.get_current_user), cache_headers: dict = Depends(data_version.check_etag)):
+    """Get sales trends per day, week, month or quarter, bucketed in the `tz` time zone"""
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown time zone: {tz}")
+    trend = await analytics_cache.get_or_compute_async(
+        analytics_cache.key('daily', filters, granularity=granularity, tz=tz, fill_gaps=fill_gaps),
+        lambda: db.run_sync(analytics.sales_trend, filters, granularity, tz, fill_gaps))
+    return ORJSONResponse({
+        "daily_sales": trend["points"],
+        "total_days": len(trend["points"]),
+        "granularity": trend["granularity"],
+        "timezone": tz
+    }, headers=cache_headers)
 
 
 @router.get("/performances")
-async def get_rep_performance(filters: data.DashboardFilters = Depends(), db: Session = Depends(get_db), current_user: admin.User = Depends(
-    oauth2.get_current_user)):
-    """Get sales rep performance metrics"""
-    df = get_sales_data_df(db, filters)
-    if df.empty:
-        return {"rep_performance": []}
-
-    df['total_sales'] = df[PRODUCTS].sum(axis=1)
-    df_sales = df[df['total_sales'] > 0].copy()
-
-    rep_performance = df_sales.groupby('sales_rep').agg(
-        total_units=('total_sales', 'sum'),
-        avg_units_per_sale=('total_sales', 'mean'),
-        total_transactions=('total_sales', 'count'),
-        unique_customers=('customer_name', 'nunique')
-    ).round(2).reset_index()
-
-    rep_performance = rep_performance.sort_values('total_units', ascending=False)
-
-    return {
-        "rep_performance": rep_performance.to_dict('records')
-    }
+async def get_rep_performance(filters: data.DashboardFilters = Depends(), exact: bool = False, db: AsyncSession = Depends(get_async_read_db),
+                              current_user: tk.Principal = Depends(oauth2.get_current_user),
+                              cache_headers: dict = Depends(data_version.check_etag)):
+    """Get sales rep performance metrics; unique customers are estimated from daily sketches unless `exact`"""
+    return ORJSONResponse({
+        "rep_performance": await analytics_cache.get_or_compute_async(
+            analytics_cache.key('performances', filters, exact=exact),
+            lambda: db.run_sync(analytics.rep_performance, filters, exact))
+    }, headers=cache_headers)
+
+
+@router.get("/products")
+async def get_product_performance(filters: data.DashboardFilters = Depends(), db: AsyncSession = Depends(get_async_read_db), current_user: tk.Principal = Depends(
+    oauth2.get_current_user), cache_headers: dict = Depends(data_version.check_etag)):
+    """Get per-product sales metrics"""
+    return ORJSONResponse({
+        "product_performance": await analytics_cache.get_or_compute_async(
+            analytics_cache.key('products', filters), lambda: db.run_sync(analytics.product_performance, filters))
+    }, headers=cache_headers)
 
 
 @router.get("/locations")
-async def get_location_performance(filters: data.DashboardFilters = Depends(), db: Session = Depends(get_db), current_user: admin.User = Depends(
-    oauth2.get_current_user), limit: int | None = 10):
-    """Get location performance metrics"""
-    df = get_sales_data_df(db, filters)
-    if df.empty:
-        return {"location_performance": []}
-
-    df['total_sales'] = df[PRODUCTS].sum(axis=1)
-    df_sales = df[df['total_sales'] > 0].copy()
-    df_sales['location'].replace('-', 'other', inplace=True)
-    location_performance = df_sales.groupby('location').agg(
-        total_units=('total_sales', 'sum'),
-        avg_units_per_sale=('total_sales', 'mean'),
-        total_transactions=('total_sales', 'count'),
-        unique_customers=('customer_name', 'nunique'),
-        unique_reps=('sales_rep', 'nunique')
-    ).round(2).reset_index()
-
-    location_performance = location_performance.sort_values('total_units', ascending=False)
-    if limit:
-        location_performance = location_performance.head(limit)
-
-    return {
-        "location_performance": location_performance.to_dict('records')
-    }
+async def get_location_performance(filters: data.DashboardFilters = Depends(), db: AsyncSession = Depends(get_async_read_db), current_user: tk.Principal = Depends(
+    oauth2.get_current_user), limit: int | None = 10, exact: bool = False, cache_headers: dict = Depends(data_version.check_etag)):
+    """Get location performance metrics; unique counts are estimated from daily sketches unless `exact`"""
+    return ORJSONResponse({
+        "location_performance": await analytics_cache.get_or_compute_async(
+            analytics_cache.key('locations', filters, limit=limit, exact=exact),
+            lambda: db.run_sync(analytics.location_performance, filters, limit, exact))
+    }, headers=cache_headers)
+
+
+@router.get("/dashboard")
+async def get_dashboard(filters: data.DashboardFilters = Depends(), db: AsyncSession = Depends(get_async_read_db), current_user: tk.Principal = Depends(
+    oauth2.get_current_user), sections: list[data.DashboardSection] | None = Query(None), limit: int | None = 10,
+                        cache_headers: dict = Depends(data_version.check_etag)):
+    """Get the overview, daily, performances and locations sections from a single scan"""
+    sections = tuple(section for section in analytics.DASHBOARD_SECTIONS if not sections or section in sections)
+    return ORJSONResponse(await analytics_cache.get_or_compute_async(
+        analytics_cache.key('dashboard', filters, sections=sections, limit=limit),
+        lambda: db.run_sync(analytics.dashboard_summary, filters, sections, limit)), headers=cache_headers)
+
+
+@router.get("/cache/stats")
+def get_analytics_cache_stats(current_user: tk.Principal = Depends(oauth2.get_current_superadmin)):
+    """Get hit/miss counters for the analytics result cache"""
+    return analytics_cache.stats()
+
+
+@router.get("/replica/status")
+def get_replica_status(current_user: tk.Principal = Depends(oauth2.get_current_superadmin)):
+    """Get this worker's view of the read replica: health, last measured lag and where reads go"""
+    return replica.stats()
+
+
+@router.get("/queries/slow")
+def get_slow_queries(order_by: Literal['total', 'max', 'calls'] = 'total', limit: int = Query(50, ge=1, le=500),
+                     current_user: tk.Principal = Depends(oauth2.get_current_superadmin)):
+    """Get this worker's statement statistics, with EXPLAIN (ANALYZE, BUFFERS) output for slow ones"""
+    return query_log.entries(order_by, limit)
+
+
+@router.get('/customers/search')
+def search_customers(q: str = Query(..., min_length=2), limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_read_db),
+                     current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    """Typeahead search over customer names, prefix matches first"""
+    name = func.lower(admin.SalesData.customer_name)
+    term = q.strip().lower()
+
+    def matching(condition, count):
+        return db.query(admin.SalesData.customer_name, func.count().label('transactions')) \
+            .filter(condition) \
+            .group_by(admin.SalesData.customer_name) \
+            .order_by(admin.SalesData.customer_name) \
+            .limit(count).all()
+
+    customers = matching(name.startswith(term, autoescape=True), limit)
+    if len(customers) < limit:
+        customers += matching(name.contains(term, autoescape=True) & ~name.startswith(term, autoescape=True),
+                              limit - len(customers))
+    return {"customers": [{"customer_name": row.customer_name, "transactions": row.transactions} for row in customers]}
+
+
+@router.get('/customers/top')
+def get_top_customers(limit: int = Query(20, ge=1, le=200), cursor: str | None = None, db: Session = Depends(get_read_db),
+                      current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    """Get customers ranked by lifetime units bought.
+
+    Served from the customers table. Pass the X-Next-Cursor header of a page back as `cursor`
+    to fetch the next page.
+    """
+    after = pagination.decode_cursor(cursor, float) if cursor else None
+    return _customer_page(customers.ranked_customers(db, limit, after), limit)
+
+
+@router.get('/customers/churn-risk')
+def get_churn_risk_customers(days: int = Query(90, ge=1), limit: int = Query(20, ge=1, le=200), cursor: str | None = None,
+                             db: Session = Depends(get_read_db), current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    """Get customers with no purchase in the last `days` days, highest lifetime units first"""
+    after = pagination.decode_cursor(cursor, float) if cursor else None
+    inactive_since = datetime.now(timezone.utc) - timedelta(days=days)
+    return _customer_page(customers.ranked_customers(db, limit, after, inactive_since), limit)
+
+
+def _customer_page(rows: list, limit: int) -> ORJSONResponse:
+    response = ORJSONResponse({"customers": responses.records(customers.CUSTOMER_COLUMNS, rows)})
+    if len(rows) == limit:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(rows[-1].total_units, rows[-1].id)
+    return response
 
 
 @router.get('/customer/{name}')
-def get_customer(name: str, db: Session = Depends(get_db), current_user: admin.User = Depends(oauth2.get_current_user)):
+def get_customer(name: str, db: Session = Depends(get_read_db), current_user: tk.Principal = Depends(oauth2.get_current_user)):
     """Get customer performance metrics"""
-    customer_filters =  data.DashboardFilters(customer_name=name)
-    df = get_sales_data_df(db, customer_filters)
-    if df.empty:
+    sales = sales_snapshot.refresh(db).select(data.DashboardFilters(customer_name=name))
+    if not len(sales):
         return {"error": f"No data found for customer '{name}'"}
-    customer_df = df[df['customer_name'] == name].copy()
-    if customer_df.empty:
-        return {"error": f"No data found for customer '{name}'"}
-    customer_df['total_sales'] = customer_df[PRODUCTS].sum(axis=1)
-    df_sales = customer_df[customer_df['total_sales'] >= 0].copy()
+    totals = sales.totals()
+    sales, totals = sales.take(totals >= 0), totals[totals >= 0]
     customer_summary = {
         "customer_name": name,
-        "total_units_purchased": int(df_sales['total_sales'].sum()),
-        "avg_units_per_transaction": float(df_sales['total_sales'].mean()),
-        "total_transactions": int(len(df_sales)),
-        "first_purchase_date": df_sales['date'].min().strftime('%Y-%m-%d') if not df_sales.empty else None,
-        "last_purchase_date": df_sales['date'].max().strftime('%Y-%m-%d') if not df_sales.empty else None,
-        "unique_locations": int(df_sales['location'].nunique()),
-        "unique_sales_reps": int(df_sales['sales_rep'].nunique()),
-        "product_totals": {
-            product: float(df_sales[product].sum()) for product in PRODUCTS
-        }
+        "total_units_purchased": int(totals.sum()),
+        "avg_units_per_transaction": float(totals.mean()),
+        "total_transactions": len(sales),
+        "first_purchase_date": str(sales.dates.min().astype('datetime64[D]')) if len(sales) else None,
+        "last_purchase_date": str(sales.dates.max().astype('datetime64[D]')) if len(sales) else None,
+        "unique_locations": sales.nunique('location'),
+        "unique_sales_reps": sales.nunique('sales_rep'),
+        "product_totals": dict(zip(PRODUCTS, np.nansum(sales.quantities, axis=0).tolist()))
     }
 
     return {"Customer": customer_summary}
 
 
 @router.get('/location/{location_name}')
-def get_single_location_performance(location_name: str, db: Session = Depends(get_db), limit: int | None = 10, current_user: admin.User = Depends(
+def get_single_location_performance(location_name: str, db: Session = Depends(get_read_db), limit: int | None = 10, current_user: tk.Principal = Depends(
     oauth2.get_current_user)):
     """Get performance metrics for a single location"""
-    location_filter = data.DashboardFilters(location=location_name)
-    df = get_sales_data_df(db, location_filter)
-    if df.empty:
+    sales = sales_snapshot.refresh(db).select(data.DashboardFilters(location=location_name))
+    if not len(sales):
         return {"error": f"No data found for location '{location_name}'"}
-    location_data = df[df['location'] == location_name].copy()
-    location_data['total_sales'] = location_data[PRODUCTS].sum(axis=1)
-    limited_data = location_data.head(limit)
-    return limited_data.to_dict('records')
+    return sales.records(limit)
+
+
+_KEY_CONFLICT = "Another entry already has this date, customer name and location"
+
+
+def _sale_record_columns():
+    return [getattr(admin.SalesData, column) for column in SALE_RECORD_COLUMNS]
 
 
 @router.get('/', response_model=list[data.SaleRecord])
-def get_all_sales(db: Session = Depends(get_db), current_user: admin.User = Depends(oauth2.get_current_user), skip: int = 0, limit: int = 1000):
-    """Get all sales records"""
-    sales = db.query(admin.SalesData).order_by(admin.SalesData.date.desc()).offset(skip).limit(limit).all()
-    return sales
+def get_all_sales(db: Session = Depends(get_read_db), current_user: tk.Principal = Depends(oauth2.get_current_user),
+                  skip: int = 0, limit: int = 1000, cursor: str | None = None):
+    """Get all sales records, newest first.
+
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the next page; that
+    seeks on the (date, id) index, so every page costs the same. `skip` is still honoured
+    when no cursor is given. Rows are serialized straight from the selected columns instead of
+    being validated one by one as SaleRecord models.
+    """
+    query = db.query(*_sale_record_columns()) \
+        .order_by(admin.SalesData.date.desc(), admin.SalesData.id.desc())
+    if cursor:
+        query = query.filter(tuple_(admin.SalesData.date, admin.SalesData.id) < pagination.decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+    sales = query.limit(limit).all()
+    response = ORJSONResponse(responses.records(SALE_RECORD_COLUMNS, sales))
+    if len(sales) == limit and sales:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(sales[-1].date, sales[-1].id)
+    return response
+
+
+@router.get('/stream')
+async def stream_sales(filters: data.DashboardFilters = Depends(), current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    """Stream the sales changes matching the filters as server-sent events, as writes commit.
+
+    `delta` events carry the created, updated and deleted rows with the change to the overview
+    totals; on a `reset` event, refetch. See utilities/live.py.
+    """
+    subscription = await live.sales_feed.subscribe(filters)
+    return StreamingResponse(live.sales_feed.events(subscription), media_type='text/event-stream',
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get('/export')
+async def export_sales(filters: data.DashboardFilters = Depends(), file_format: data.ExportFormat = Query('csv', alias='format'),
+                       db: AsyncSession = Depends(get_async_read_db), current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    """Export the sales records matching the filters as CSV, NDJSON or Parquet, oldest first.
+
+    Rows are read through a server-side cursor in batches of EXPORT_BATCH_ROWS and encoded as
+    they arrive, so the whole history can be exported in constant memory.
+    """
+    encoder = export.ENCODERS[file_format]()
+
+    async def content():
+        result = await db.stream(export.export_query(filters).execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+        yield encoder.start()
+        async for rows in result.partitions():
+            yield await workers.run_cpu_bound(encoder.encode, rows)
+        yield encoder.finish()
+
+    return StreamingResponse(content(), media_type=export.MEDIA_TYPES[file_format],
+                             headers={"Content-Disposition": f'attachment; filename="sales.{file_format}"'})
 
 
 @router.post('/', response_model=data.SaleRecord, status_code=status.HTTP_201_CREATED)
-def create_new_entry(db: Session = Depends(get_db), entry: data.SalesCreate = None, current_user: admin.User = Depends(
+def create_new_entry(db: Session = Depends(get_db), entry: data.SalesCreate = None, current_user: tk.Principal = Depends(
     oauth2.get_current_superadmin)):
-    """Create a new sales transaction entry"""
+    """Create a new sales transaction entry; 409 if another entry has its date, customer and location"""
     try:
-        new_entry = admin.SalesData(**entry.model_dump())
-        db.add(new_entry)
+        values = entry.model_dump()
+        values['date'] = values['date'] or datetime.now(timezone.utc)
+        partitions.ensure_partitions(db, values['date'], values['date'])
+        new_entry = db.execute(insert(admin.SalesData).values(values)
+                               .on_conflict_do_nothing(constraint='uq_sales_data_date_customer_location')
+                               .returning(*_sale_record_columns())).first()
+        if not new_entry:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=_KEY_CONFLICT)
+        line_items.sync_line_items(db, admin.SalesData.id == new_entry.id)
+        rollup.add_sales(db, admin.SalesData.id == new_entry.id)
+        customers.refresh_customers(db, admin.SalesData.id == new_entry.id)
+        sketches.add_sales(db, admin.SalesData.id == new_entry.id)
+        changes = live.Changes()
+        changes.capture_after(db, admin.SalesData.id == new_entry.id)
+        version = sales_version.bump(db)
+        changes.publish(db, version)
         db.commit()
-        db.refresh(new_entry)
-        return new_entry
+        sales_version.committed(version)
+        analytics_cache.invalidate()
+        return new_entry._mapping
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create entry: {str(e)}")
 
 
 @router.put('/{entry_id}', response_model=data.SaleRecord)
-def update_entry(entry_id: int, db: Session = Depends(get_db), entry: data.SalesUpdate = None, current_user: admin.User = Depends(
+def update_entry(entry_id: int, db: Session = Depends(get_db), entry: data.SalesUpdate = None, current_user: tk.Principal = Depends(
     oauth2.get_current_superadmin)):
-    """Update an existing sales transaction entry"""
-    entry_query = db.query(admin.SalesData).filter(admin.SalesData.id == entry_id)
-    existing_entry = entry_query.first()
-    if not existing_entry:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Entry with id {entry_id} not found")
+    """Update an existing sales transaction entry; 409 if it would duplicate another entry's date, customer and location"""
+    update_data = entry.model_dump(exclude_unset=True)
+    if not update_data:
+        existing_entry = db.execute(select(*_sale_record_columns()).where(admin.SalesData.id == entry_id)).first()
+        if not existing_entry:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Entry with id {entry_id} not found")
+        return existing_entry._mapping
     try:
-        update_data = entry.model_dump(exclude_unset=True)
-        entry_query.update(update_data, synchronize_session=False)
+        if update_data.get('date'):
+            partitions.ensure_partitions(db, update_data['date'], update_data['date'])
+        changes = live.Changes()
+        changes.capture_before(db, admin.SalesData.id == entry_id)
+        rollup.remove_sales(db, admin.SalesData.id == entry_id)
+        previous_customers = customers.customer_keys(db, admin.SalesData.id == entry_id)
+        previous_days = sketches.sketch_days(db, admin.SalesData.id == entry_id)
+        updated_entry = db.execute(update(admin.SalesData).where(admin.SalesData.id == entry_id).values(update_data)
+                                   .returning(*_sale_record_columns())).first()
+        if not updated_entry:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Entry with id {entry_id} not found")
+        line_items.sync_line_items(db, admin.SalesData.id == entry_id)
+        rollup.add_sales(db, admin.SalesData.id == entry_id)
+        customers.refresh_customers(db, admin.SalesData.id == entry_id, previous_customers)
+        sketches.refresh_sketches(db, admin.SalesData.id == entry_id, previous_days)
+        changes.capture_after(db, admin.SalesData.id == entry_id)
+        version = sales_version.bump(db)
+        changes.publish(db, version)
         db.commit()
-        return entry_query.first()
+        sales_version.committed(version)
+        analytics_cache.invalidate()
+        sales_snapshot.invalidate()
+        return updated_entry._mapping
+    except HTTPException:
+        db.rollback()
+        raise
+    except IntegrityError as e:
+        db.rollback()
+        # unique_violation; the only unique key a row can move onto is (date, customer_name, location).
+        if getattr(e.orig, 'pgcode', None) == '23505':
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=_KEY_CONFLICT)
+        raise HTTPException(status_code=500, detail=f"Failed to update entry: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update entry: {str(e)}")
 
 
 @router.delete('/{entry_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_entry(entry_id: int, db: Session = Depends(get_db), current_user: admin.User = Depends(
+def delete_entry(entry_id: int, db: Session = Depends(get_db), current_user: tk.Principal = Depends(
     oauth2.get_current_superadmin)):
     """Delete a sales transaction entry"""
-    entry_query = db.query(admin.SalesData).filter(admin.SalesData.id == entry_id)
-    existing_entry = entry_query.first()
-    if not existing_entry:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Entry with id {entry_id} not found")
     try:
-        entry_query.delete(synchronize_session=False)
+        changes = live.Changes()
+        changes.capture_before(db, admin.SalesData.id == entry_id)
+        rollup.remove_sales(db, admin.SalesData.id == entry_id)
+        previous_customers = customers.customer_keys(db, admin.SalesData.id == entry_id)
+        previous_days = sketches.sketch_days(db, admin.SalesData.id == entry_id)
+        deleted = db.execute(delete(admin.SalesData).where(admin.SalesData.id == entry_id)
+                             .returning(admin.SalesData.id)).first()
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Entry with id {entry_id} not found")
+        customers.refresh_customers(db, admin.SalesData.id == entry_id, previous_customers)
+        sketches.refresh_days(db, previous_days)
+        version = sales_version.bump(db)
+        changes.publish(db, version)
         db.commit()
+        sales_version.committed(version)
+        analytics_cache.invalidate()
+        sales_snapshot.invalidate()
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete entry: {str(e)}")
 
 
-@router.post('/upload', status_code=status.HTTP_201_CREATED)
-async def upload_sales_data(db: Session = Depends(get_db), file: UploadFile = File(...), current_user: admin.User = Depends(
+@router.post('/batch')
+def apply_sales_batch(sales_batch: data.SalesBatch, db: Session = Depends(get_db), current_user: tk.Principal = Depends(
     oauth2.get_current_superadmin)):
-    """Upload sales data from an Excel file (.xlsx, .xls)."""
+    """Apply arrays of creates, updates and deletes in one transaction, with a result per item.
+
+    Invalid items, conflicting creates and updates, and unknown ids are reported in the results
+    and the rest of the batch is still applied; see utilities/batch.py.
+    """
+    items = len(sales_batch.creates) + len(sales_batch.updates) + len(sales_batch.deletes)
+    if items > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A batch can hold at most {settings.BATCH_MAX_ITEMS} items, got {items}")
     try:
-        # Read the uploaded file's contents into a BytesIO object
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
-        df.columns = [col.strip().lower().replace(' ','_') for col in df.columns]
-        print(f"Columns found in file: {df.columns.tolist()}")
-
-        required_columns = {'date', 'location', 'sales_rep', 'customer_name', 'phone_no'}.union(set(PRODUCTS))
-        if not required_columns.issubset(df.columns):
-            missing_cols = required_columns - set(df.columns)
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(missing_cols)}")
-
-        # Clean date column
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        if df['date'].isnull().any():
-            raise HTTPException(status_code=400, detail="Invalid date format in 'date' column")
-
-        # Clean product columns - convert "-", empty strings, and NaN to 0.0
-        for product in PRODUCTS:
-            if product in df.columns:
-                df[product] = df[product].replace(['-', '', 'nan', 'NaN', 'null', 'None'], 0)
-                df[product] = pd.to_numeric(df[product], errors='coerce').fillna(0.0)
-        
-        # Clean phone_no column - convert to string and handle null values
-        if 'phone_no' in df.columns:
-            df['phone_no'] = df['phone_no'].fillna('').astype(str).replace('nan', '')
-
-        records = df.to_dict(orient='records')
-        for record in records:
-            # Check if a similar record already exists
-            existing_entry = db.query(admin.SalesData).filter_by(
-                date=record['date'],
-                customer_name=record['customer_name'],
-                location=record['location']
-            ).first()
-
-            if existing_entry:
-                for key, value in record.items():
-                    setattr(existing_entry, key, value)
-            else:
-                new_entry = admin.SalesData(**record)
-                db.add(new_entry)
-
+        changes = live.Changes()
+        result = batch.apply_batch(db, sales_batch, changes)
+        if not (result["created"] or result["updated"] or result["deleted"]):
+            db.rollback()
+            return result
+        version = sales_version.bump(db)
+        changes.publish(db, version)
         db.commit()
-        return {"message": f"Successfully processed {len(records)} records."}
-
+        sales_version.committed(version)
+        analytics_cache.invalidate()
+        if result["updated"] or result["deleted"]:
+            sales_snapshot.invalidate()
+        return result
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to upload data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to apply batch: {str(e)}")
+
+
+@router.post('/upload', status_code=status.HTTP_201_CREATED)
+async def upload_sales_data(db: AsyncSession = Depends(get_async_db), file: UploadFile = File(...), current_user: tk.Principal = Depends(
+    oauth2.get_current_superadmin)):
+    """Upload sales data from an Excel (.xlsx, .xls), CSV or Parquet file.
+
+    The upload is spooled to disk by the multipart parser and read back in chunks of
+    UPLOAD_CHUNK_ROWS rows, each cleaned, merged and committed on its own. Parsing, cleaning
+    and building the COPY records run on worker threads so a large file doesn't hold up other
+    requests; only the database work runs on the event loop.
+    """
+    file_format = ingest.upload_format(file.filename)
+    processed = 0
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    try:
+        with closing(ingest.iter_upload_chunks(file.file, file_format, settings.UPLOAD_CHUNK_ROWS)) as chunks:
+            async for chunk in workers.iterate_cpu_bound(chunks):
+                with metrics.stage('clean'):
+                    chunk = await workers.run_cpu_bound(ingest.clean_upload_chunk, chunk)
+                    records = await workers.run_cpu_bound(ingest.staging_records, chunk)
+                with metrics.stage('merge'):
+                    changes = live.Changes()
+                    for key, value in (await db.run_sync(ingest.bulk_upsert_sales, records, changes)).items():
+                        counts[key] += value
+                    version = await db.run_sync(sales_version.bump)
+                    await db.run_sync(changes.publish, version)
+                    await db.commit()
+                sales_version.committed(version)
+                analytics_cache.invalidate()
+                if counts["updated"]:
+                    sales_snapshot.invalidate()
+                processed += len(chunk)
+        return {"message": f"Successfully processed {processed} records.", **counts}
+
+    except HTTPException as e:
+        await db.rollback()
+        if processed:
+            e.detail = f"{e.detail} (the first {processed} records were already saved)"
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to upload data after {processed} records: {str(e)}")
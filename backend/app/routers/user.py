@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from  ..schemas import user
+from  ..schemas import user, tk
 from ..utilities.database import get_db
 from ..utilities import utils, oauth2
 from ..models import admin
@@ -26,10 +26,10 @@ def create_user(user_create: user.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Failed to create user: {str(e)}")
 
 @router.get("/", response_model=list[user.UserRes])
-def get_all_users(db: Session = Depends(get_db), current_user: admin.User = Depends(oauth2.get_current_superadmin)):
+def get_all_users(db: Session = Depends(get_db), current_user: tk.Principal = Depends(oauth2.get_current_superadmin)):
     users = db.query(admin.User).all()
     return users
 
 @router.get("/me", response_model=user.UserRes)
-def get_current_user(current_user: admin.User = Depends(oauth2.get_current_user)):
-    return current_user
+def get_current_user(db: Session = Depends(get_db), current_user: tk.Principal = Depends(oauth2.get_current_user)):
+    return db.query(admin.User).filter(admin.User.id == current_user.id).first()
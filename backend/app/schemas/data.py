@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from pydantic import BaseModel,field_validator
+from typing import Literal
+
+from pydantic import BaseModel,field_validator,model_validator
 
 
 class Sales(BaseModel):
@@ -48,6 +50,27 @@ class SalesCreate(SalesData):
 class SalesUpdate(SalesData):
     pass
 
+class SalesBatchCreate(SalesData):
+    location: str
+    customer_name: str
+    sales_rep: str
+
+class SalesBatchUpdate(SalesData):
+    id: int
+
+    @model_validator(mode='after')
+    def check_required_not_null(self):
+        for field in ('date', 'location', 'customer_name', 'sales_rep'):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} can't be null")
+        return self
+
+class SalesBatch(BaseModel):
+    # Items are validated one by one, so an invalid item fails alone; see utilities/batch.py.
+    creates: list[dict] = []
+    updates: list[dict] = []
+    deletes: list[int] = []
+
 class SaleRecord(BaseModel):
     id: int
     date: datetime
@@ -72,3 +95,8 @@ class DashboardFilters(BaseModel):
     sales_rep: str | None = None
     product: str | None = None
     customer_name: str | None = None
+
+
+Granularity = Literal['day', 'week', 'month', 'quarter']
+DashboardSection = Literal['overview', 'daily', 'performances', 'locations']
+ExportFormat = Literal['csv', 'ndjson', 'parquet']
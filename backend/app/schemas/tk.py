@@ -5,4 +5,10 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    id: str | None = None
\ No newline at end of file
+    id: str | None = None
+
+class Principal(BaseModel):
+    id: int
+    is_superadmin: bool
+    is_active: bool
+    role: str
@@ -0,0 +1,606 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import TIMESTAMP, and_, case, cast, distinct, exists, func, literal, literal_column, null, or_, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from ..schemas import data
+from . import hll, workers
+from .config import settings
+
+PRODUCTS = ['imperial_crown', 'cranberry', 'orange', 'mango', 'black_stallion']
+
+
+def sale_items(*conditions):
+    """Units per sale from sales_line_items, in total ('units') and per product, for the sales matching `conditions`.
+
+    Join it to sales_data on `joins_sale`; a sale without line items has no row and sold nothing.
+    Pass the outer query's conditions so that only the line items of its sales are summed.
+    """
+    item = admin.SalesLineItem
+    query = select(
+        item.sale_id,
+        # Grouping on sale_id alone follows the primary key's order; a sale has one date.
+        func.min(item.sale_date).label('sale_date'),
+        func.sum(item.quantity).label('units'),
+        *[func.sum(item.quantity).filter(item.product_id == _product_id(product)).label(product) for product in PRODUCTS]
+    )
+    if conditions:
+        query = query.join(admin.SalesData, and_(admin.SalesData.id == item.sale_id,
+                                                 admin.SalesData.date == item.sale_date)).where(*conditions)
+    return query.group_by(item.sale_id).subquery('sale_items')
+
+
+def _product_id(product: str):
+    return select(admin.Product.id).where(admin.Product.name == product).scalar_subquery()
+
+
+def joins_sale(items):
+    """Join condition from a `sale_items` subquery to its sales_data row."""
+    return and_(items.c.sale_id == admin.SalesData.id, items.c.sale_date == admin.SalesData.date)
+
+
+def total_sales(items):
+    """Units of the sale across all products; sales without line items have none."""
+    return func.coalesce(items.c.units, 0)
+
+
+def product_units(items, product: str):
+    return func.coalesce(getattr(items.c, product), 0)
+
+
+def is_sale(items):
+    return total_sales(items) > 0
+
+
+# Grouping expressions inline their constants so SELECT and GROUP BY render identical SQL
+# even on drivers that bind parameters server-side.
+# Reporting name for a location: '-' placeholders from the spreadsheets are grouped as 'other'.
+location_label = case((admin.SalesData.location == literal_column("'-'"), literal_column("'other'")),
+                      else_=admin.SalesData.location)
+# Transaction day, bucketed in UTC.
+sale_day = func.date(func.timezone(literal_column("'UTC'"), admin.SalesData.date))
+
+# sales_daily_sketches columns: (sales_data column sketched, sales rows only). Sketches are kept
+# for each day as a whole ('all') and per value of each of the other dimensions.
+SKETCH_COLUMNS = {
+    'customers': ('customer_name', True),
+    'sales_reps': ('sales_rep', True),
+    'all_customers': ('customer_name', False),
+    'all_locations': ('location', False),
+    'all_sales_reps': ('sales_rep', False),
+}
+SKETCH_DIMENSIONS = ('all', 'location', 'sales_rep')
+
+
+def date_bound(value: str | None):
+    """A filter date bound as Postgres reads it: a timestamptz, in the session time zone unless it has an offset.
+
+    The bounds are strings; casting them in SQL keeps Postgres' parsing whichever driver binds them.
+    """
+    return cast(literal(value), TIMESTAMP(timezone=True))
+
+
+def location_values(location: str) -> list[str]:
+    """The stored locations a location filter matches: every one reported under the same label."""
+    return ['-', 'other'] if location in ('-', 'other') else [location]
+
+
+def build_filter_conditions(filters: data.DashboardFilters = None) -> list:
+    """Translate dashboard filters into SQL predicates on sales_data."""
+    conditions = []
+    if not filters:
+        return conditions
+    if filters.start_date:
+        conditions.append(admin.SalesData.date >= date_bound(filters.start_date))
+    if filters.end_date:
+        conditions.append(admin.SalesData.date <= date_bound(filters.end_date))
+    if filters.location:
+        conditions.append(admin.SalesData.location.in_(location_values(filters.location)))
+    if filters.sales_rep:
+        conditions.append(admin.SalesData.sales_rep == filters.sales_rep)
+    if filters.customer_name:
+        conditions.append(admin.SalesData.customer_name == filters.customer_name)
+    if filters.product:
+        # Sales with a nonzero quantity of the product, probed through its line items. Aliased
+        # so the probe stays uncorrelated in queries that read the line items themselves.
+        item = admin.SalesLineItem.__table__.alias('product_filter_item')
+        product = admin.Product.__table__.alias('product_filter')
+        conditions.append(exists().where(
+            item.c.sale_id == admin.SalesData.id,
+            item.c.product_id == select(product.c.id).where(product.c.name == filters.product).scalar_subquery()
+        ))
+    return conditions
+
+
+def _format_day(value):
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%d')
+
+
+def _sales_aggregates(items, where=None, distinct_counts: bool = True) -> list:
+    """Aggregates over sales rows (total units > 0), as a FILTER clause when `where` is given.
+
+    Units come from `items`, the `sale_items` subquery joined to the rows.
+    Without `distinct_counts` the unique_ columns are NULL, for callers that take them from sketches.
+    """
+    def only_sales(aggregate):
+        return aggregate.filter(where) if where is not None else aggregate
+
+    def unique(column):
+        return only_sales(func.count(distinct(column))) if distinct_counts else null()
+
+    return [
+        only_sales(func.count()).label('transactions'),
+        only_sales(func.sum(total_sales(items))).label('units'),
+        only_sales(func.avg(total_sales(items))).label('avg_units'),
+        unique(admin.SalesData.customer_name).label('unique_customers'),
+        unique(admin.SalesData.sales_rep).label('unique_reps'),
+        *[only_sales(func.sum(product_units(items, product))).label(product) for product in PRODUCTS]
+    ]
+
+
+def _overview_aggregates(distinct_counts: bool = True) -> list:
+    """Aggregates over every filtered row, sales or not; see `_sales_aggregates` for `distinct_counts`."""
+    def unique(column):
+        return func.count(distinct(column)) if distinct_counts else null()
+
+    return [
+        func.count().label('records'),
+        func.min(admin.SalesData.date).label('first_date'),
+        func.max(admin.SalesData.date).label('last_date'),
+        unique(admin.SalesData.customer_name).label('all_customers'),
+        unique(admin.SalesData.location).label('all_locations'),
+        unique(admin.SalesData.sales_rep).label('all_reps')
+    ]
+
+
+def _overview(row) -> dict:
+    return {
+        "total_records": row.records,
+        "total_sales_records": row.transactions,
+        "total_units_sold": float(row.units or 0),
+        "avg_units_per_transaction": float(row.avg_units) if row.avg_units is not None else None,
+        "date_range": {
+            "start": _format_day(row.first_date),
+            "end": _format_day(row.last_date)
+        },
+        "unique_customers": row.all_customers,
+        "unique_locations": row.all_locations,
+        "unique_sales_reps": row.all_reps,
+        "product_totals": {
+            product: float(getattr(row, product) or 0) for product in PRODUCTS
+        }
+    }
+
+
+def _day(row) -> dict:
+    return {
+        "date": row.day.strftime('%Y-%m-%d'),
+        **{product: float(getattr(row, product)) for product in PRODUCTS},
+        "total_sales": float(row.units)
+    }
+
+
+def _rep(row) -> dict:
+    return {
+        "sales_rep": row.sales_rep,
+        "total_units": round(float(row.units), 2),
+        "avg_units_per_sale": round(float(row.avg_units), 2),
+        "total_transactions": row.transactions,
+        "unique_customers": row.unique_customers
+    }
+
+
+def _product(row) -> dict:
+    return {
+        "product": row.product,
+        "total_units": round(float(row.units), 2),
+        "avg_units_per_sale": round(float(row.avg_units), 2),
+        "total_transactions": row.transactions,
+        "unique_customers": row.unique_customers
+    }
+
+
+def _location(row) -> dict:
+    return {
+        "location": row.location,
+        "total_units": round(float(row.units), 2),
+        "avg_units_per_sale": round(float(row.avg_units), 2),
+        "total_transactions": row.transactions,
+        "unique_customers": row.unique_customers,
+        "unique_reps": row.unique_reps
+    }
+
+
+def sales_overview(db: Session, filters: data.DashboardFilters = None, exact: bool = True) -> dict | None:
+    """Overall statistics for the filtered sales, or None when nothing matches.
+
+    Unless `exact`, the unique counts are HyperLogLog estimates where the filters allow it.
+    """
+    dimension = None if exact else _sketch_dimension(filters)
+    conditions = build_filter_conditions(filters)
+    items = sale_items(*conditions)
+    row = db.query(*_overview_aggregates(dimension is None), *_sales_aggregates(items, is_sale(items), dimension is None)) \
+        .select_from(admin.SalesData).outerjoin(items, joins_sale(items)).filter(*conditions).one()
+    if not row.records:
+        return None
+    overview = _overview(row)
+    if dimension is not None:
+        counts = _sketch_counts(db, filters, dimension, ['all_customers', 'all_locations', 'all_sales_reps'])
+        # The filters leave a single value of the dimension.
+        counts = next(iter(counts.values()), {})
+        overview.update({
+            "unique_customers": counts.get('all_customers', 0),
+            "unique_locations": counts.get('all_locations', 0),
+            "unique_sales_reps": counts.get('all_sales_reps', 0)
+        })
+    return overview
+
+
+def _full_day_range(start: datetime | None, end: datetime | None):
+    """Split date bounds into whole UTC days and the partial-day fringes around them.
+
+    Returns (first_day, stop_day, fringe): rollup days d with first_day <= d < stop_day lie
+    entirely inside the bounds (None means unbounded), and `fringe` selects the remaining
+    in-range rows, or is None when there are none. Returns None if no whole day is covered.
+    """
+    first_day = stop_day = None
+    fringes = []
+    if start is not None:
+        start = start.astimezone(timezone.utc)
+        first_day = start.date()
+        if start.timetz() != time(0, tzinfo=timezone.utc):
+            first_day += timedelta(days=1)
+            fringes.append(admin.SalesData.date < datetime.combine(first_day, time(0), timezone.utc))
+    if end is not None:
+        stop_day = end.astimezone(timezone.utc).date()
+        fringes.append(admin.SalesData.date >= datetime.combine(stop_day, time(0), timezone.utc))
+    if first_day is not None and stop_day is not None and first_day >= stop_day:
+        return None
+    return first_day, stop_day, or_(*fringes) if fringes else None
+
+
+def _sketch_dimension(filters: data.DashboardFilters = None, group_by: str = None) -> str | None:
+    """The sketch dimension answering distinct counts under `filters`, per `group_by` value; None if none can."""
+    filters = filters or data.DashboardFilters()
+    if filters.customer_name or filters.product:
+        return None
+    dimensions = {column for column in ('location', 'sales_rep') if getattr(filters, column)}
+    if group_by:
+        dimensions.add(group_by)
+    if len(dimensions) > 1:
+        return None
+    return dimensions.pop() if dimensions else 'all'
+
+
+def _sketch_label(dimension: str, value: str) -> str:
+    return 'other' if dimension == 'location' and value == '-' else value
+
+
+def _sketch_counts(db: Session, filters: data.DashboardFilters, dimension: str, columns: list[str]) -> dict[str, dict[str, int]]:
+    """Estimated distinct counts of the sketch `columns` per value of `dimension` ('' for 'all').
+
+    Whole UTC days in range merge their stored sketches; rows on partial days at the edges of
+    the range are hashed on the spot. Locations are reported under `location_label`. Merging
+    and hashing run through `workers.offload`.
+    """
+    filters = filters or data.DashboardFilters()
+    sales, sketch = admin.SalesData, admin.SalesDailySketch
+    start = end = None
+    if filters.start_date or filters.end_date:
+        start, end = db.execute(select(date_bound(filters.start_date), date_bound(filters.end_date))).one()
+    value = getattr(filters, dimension) if dimension != 'all' else None
+    day_range = _full_day_range(start, end)
+
+    stored = {}
+    fringe = None
+    if day_range is not None:
+        first_day, stop_day, fringe = day_range
+        # One row of sketch arrays per value rather than one row per day and value.
+        query = select(sketch.value, *[func.array_agg(getattr(sketch, column)) for column in columns]) \
+            .where(sketch.dimension == dimension).group_by(sketch.value)
+        if first_day is not None:
+            query = query.where(sketch.day >= first_day)
+        if stop_day is not None:
+            query = query.where(sketch.day < stop_day)
+        if value:
+            query = query.where(sketch.value.in_(location_values(value)) if dimension == 'location'
+                                else sketch.value == value)
+        for row in db.execute(query):
+            group = stored.setdefault(_sketch_label(dimension, row[0]), {column: [] for column in columns})
+            for column, serialized in zip(columns, row[1:]):
+                group[column].extend(serialized)
+    rows = []
+    if day_range is None or fringe is not None:
+        conditions = build_filter_conditions(filters) + ([fringe] if fringe is not None else [])
+        items = sale_items(*conditions)
+        query = select(sales.location, sales.sales_rep, sales.customer_name, is_sale(items).label('sale')) \
+            .outerjoin(items, joins_sale(items)).where(*conditions)
+        rows = db.execute(query).all()
+    return workers.offload(db, _count_sketches, dimension, columns, stored, rows)
+
+
+def _count_sketches(dimension: str, columns: list[str], stored: dict, rows: list) -> dict[str, dict[str, int]]:
+    """Merge the stored sketches with the fringe rows' values and count them."""
+    sketches = {label: {column: hll.HyperLogLog.merge_all(parts) for column, parts in group.items()}
+                for label, group in stored.items()}
+    values = {}
+    for row in rows:
+        label = _sketch_label(dimension, getattr(row, dimension)) if dimension != 'all' else ''
+        group = values.setdefault(label, {column: set() for column in columns})
+        for column in columns:
+            sketched, sales_only = SKETCH_COLUMNS[column]
+            if row.sale or not sales_only:
+                group[column].add(getattr(row, sketched))
+    for label, group in values.items():
+        merged = sketches.setdefault(label, {column: hll.HyperLogLog() for column in columns})
+        for column, column_values in group.items():
+            merged[column].add(column_values)
+    return {label: {column: sketch.count() for column, sketch in group.items()} for label, group in sketches.items()}
+
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+_STEPS = {'day': '1 day', 'week': '1 week', 'month': '1 month', 'quarter': '3 months'}
+
+
+def _trunc(granularity: str, timestamp):
+    return func.date_trunc(literal_column(f"'{granularity}'"), timestamp)
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Local start of the bucket holding `moment`, matching Postgres' date_trunc."""
+    day = moment.date()
+    if granularity == 'week':
+        day -= timedelta(days=day.weekday())
+    elif granularity == 'month':
+        day = day.replace(day=1)
+    elif granularity == 'quarter':
+        day = day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return datetime.combine(day, time(0))
+
+
+def _bucket_count(first: datetime, last: datetime, granularity: str) -> int:
+    """Buckets from the one holding `first` through the one holding `last`."""
+    first, last = _bucket_start(first, granularity), _bucket_start(last, granularity)
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return {
+        'day': (last - first).days + 1,
+        'week': (last - first).days // 7 + 1,
+        'month': months + 1,
+        'quarter': months // 3 + 1
+    }[granularity]
+
+
+def _raw_buckets(bucket, filters: data.DashboardFilters, condition=None):
+    conditions = build_filter_conditions(filters) + ([condition] if condition is not None else [])
+    items = sale_items(*conditions)
+    return select(
+        bucket.label('bucket'),
+        func.count().label('transactions'),
+        *[func.sum(product_units(items, product)).label(product) for product in PRODUCTS]
+    ).join(items, joins_sale(items)).where(is_sale(items), *conditions).group_by(bucket)
+
+
+def _rollup_buckets(granularity: str, filters: data.DashboardFilters, first_day, stop_day):
+    rollup = admin.SalesDailyRollup
+    bucket = _trunc(granularity, cast(rollup.day, TIMESTAMP()))
+    query = select(
+        bucket.label('bucket'),
+        func.sum(rollup.sale_transactions).label('transactions'),
+        *[func.sum(getattr(rollup, product)).label(product) for product in PRODUCTS]
+    )
+    if first_day is not None:
+        query = query.where(rollup.day >= first_day)
+    if stop_day is not None:
+        query = query.where(rollup.day < stop_day)
+    if filters.location:
+        query = query.where(rollup.location.in_(location_values(filters.location)))
+    if filters.sales_rep:
+        query = query.where(rollup.sales_rep == filters.sales_rep)
+    return query.group_by(bucket)
+
+
+def _point(row) -> dict:
+    units = {product: float(getattr(row, product)) for product in PRODUCTS}
+    return {
+        "date": row.bucket.strftime('%Y-%m-%d'),
+        **units,
+        "total_sales": sum(units.values())
+    }
+
+
+def sales_trend(db: Session, filters: data.DashboardFilters = None, granularity: str = 'day', tz: str = 'UTC',
+                fill_gaps: bool = False, max_points: int = None) -> dict:
+    """Product and total units per day, week, month or quarter, bucketed in time zone `tz`.
+
+    Buckets start at local midnight; weeks start on Monday. Without `fill_gaps` only buckets
+    with at least one sale are returned, otherwise every bucket in the range is, with zeros.
+    A granularity that would give more than `max_points` buckets is coarsened until it fits, and
+    if even quarters don't, only the latest `max_points` are returned. Buckets are counted over
+    the date range with `fill_gaps`, otherwise over the span of the matching rows.
+
+    In UTC the whole days are read from sales_daily_rollup; only partial days at the edges of
+    the date range, or filters the rollup can't answer (customer, product), go to sales_data.
+    """
+    if filters is None:
+        filters = data.DashboardFilters()
+    max_points = max_points or settings.TREND_MAX_POINTS
+    # Let Postgres parse the bounds exactly as it does when comparing them to sales_data.date.
+    start, end = date_bound(filters.start_date), date_bound(filters.end_date)
+    start, end, first_date, last_date = db.execute(
+        select(start, end, func.min(admin.SalesData.date), func.max(admin.SalesData.date))
+        .where(*build_filter_conditions(filters))
+    ).one()
+    # Gap filling returns every bucket of the requested range; otherwise only the rows' span has buckets.
+    first, last = (start or first_date, end or last_date) if fill_gaps else (first_date, last_date)
+    if first is None or last is None or first > last:
+        return {"granularity": granularity, "points": []}
+
+    zone = ZoneInfo(tz)
+    first, last = (moment.astimezone(zone).replace(tzinfo=None) for moment in (first, last))
+    for granularity in GRANULARITIES[GRANULARITIES.index(granularity):]:
+        if _bucket_count(first, last, granularity) <= max_points:
+            break
+
+    local_date = func.timezone(literal_column("'{}'".format(tz.replace("'", "''"))), admin.SalesData.date)
+    bucket = _trunc(granularity, local_date)
+    rollup_filters = not filters.customer_name and not filters.product
+    day_range = _full_day_range(start, end) if tz == 'UTC' and rollup_filters else None
+    if day_range is None:
+        buckets = _raw_buckets(bucket, filters).subquery()
+    else:
+        first_day, stop_day, fringe = day_range
+        parts = _rollup_buckets(granularity, filters, first_day, stop_day)
+        if fringe is not None:
+            parts = union_all(parts, _raw_buckets(bucket, filters, fringe))
+        parts = parts.subquery()
+        buckets = select(
+            parts.c.bucket,
+            *[func.sum(getattr(parts.c, product)).label(product) for product in PRODUCTS]
+        ).group_by(parts.c.bucket).having(func.sum(parts.c.transactions) > 0).subquery()
+
+    if fill_gaps:
+        series = select(func.generate_series(
+            literal(_bucket_start(first, granularity), TIMESTAMP()),
+            literal(_bucket_start(last, granularity), TIMESTAMP()),
+            literal_column(f"interval '{_STEPS[granularity]}'")
+        ).label('bucket')).subquery()
+        query = select(
+            series.c.bucket,
+            *[func.coalesce(getattr(buckets.c, product), 0).label(product) for product in PRODUCTS]
+        ).select_from(series.outerjoin(buckets, series.c.bucket == buckets.c.bucket))
+        order = series.c.bucket
+    else:
+        query = select(buckets.c.bucket, *[getattr(buckets.c, product) for product in PRODUCTS])
+        order = buckets.c.bucket
+    rows = db.execute(query.order_by(order.desc()).limit(max_points)).all()
+    return {"granularity": granularity, "points": [_point(row) for row in reversed(rows)]}
+
+
+def daily_sales(db: Session, filters: data.DashboardFilters = None) -> list[dict]:
+    """Per-day product and total units (UTC) for days with at least one sale."""
+    return sales_trend(db, filters)['points']
+
+
+def rep_performance(db: Session, filters: data.DashboardFilters = None, exact: bool = True) -> list[dict]:
+    """Sales rep totals ordered by units sold; see `sales_overview` for `exact`."""
+    dimension = None if exact else _sketch_dimension(filters, 'sales_rep')
+    conditions = build_filter_conditions(filters)
+    items = sale_items(*conditions)
+    rows = db.query(admin.SalesData.sales_rep, *_sales_aggregates(items, distinct_counts=dimension is None)) \
+        .join(items, joins_sale(items)).filter(is_sale(items), *conditions).group_by(admin.SalesData.sales_rep) \
+        .order_by(func.sum(total_sales(items)).desc(), admin.SalesData.sales_rep).all()
+    reps = [_rep(row) for row in rows]
+    if dimension is not None:
+        counts = _sketch_counts(db, filters, dimension, ['customers'])
+        for rep in reps:
+            rep["unique_customers"] = counts.get(rep["sales_rep"], {}).get('customers', 0)
+    return reps
+
+
+def location_performance(db: Session, filters: data.DashboardFilters = None, limit: int | None = None,
+                         exact: bool = True) -> list[dict]:
+    """Location totals ordered by units sold, optionally limited to the top `limit` locations.
+
+    See `sales_overview` for `exact`.
+    """
+    dimension = None if exact else _sketch_dimension(filters, 'location')
+    location = location_label.label('location')
+    conditions = build_filter_conditions(filters)
+    items = sale_items(*conditions)
+    query = db.query(location, *_sales_aggregates(items, distinct_counts=dimension is None)) \
+        .join(items, joins_sale(items)).filter(is_sale(items), *conditions) \
+        .group_by(location).order_by(func.sum(total_sales(items)).desc(), location)
+    if limit:
+        query = query.limit(limit)
+    locations = [_location(row) for row in query.all()]
+    if dimension is not None:
+        counts = _sketch_counts(db, filters, dimension, ['customers', 'sales_reps'])
+        for entry in locations:
+            group = counts.get(entry["location"], {})
+            entry["unique_customers"] = group.get('customers', 0)
+            entry["unique_reps"] = group.get('sales_reps', 0)
+    return locations
+
+
+def product_performance(db: Session, filters: data.DashboardFilters = None) -> list[dict]:
+    """Product totals over sales_line_items ordered by units sold; only products that sold appear."""
+    item = admin.SalesLineItem
+    conditions = build_filter_conditions(filters)
+    items = sale_items(*conditions)
+    query = select(
+        admin.Product.name.label('product'),
+        func.sum(item.quantity).label('units'),
+        func.avg(item.quantity).label('avg_units'),
+        func.count().label('transactions'),
+        func.count(distinct(admin.SalesData.customer_name)).label('unique_customers')
+    ).select_from(item) \
+        .join(admin.Product, admin.Product.id == item.product_id) \
+        .join(admin.SalesData, and_(admin.SalesData.id == item.sale_id, admin.SalesData.date == item.sale_date)) \
+        .join(items, joins_sale(items)) \
+        .where(is_sale(items), *conditions) \
+        .group_by(admin.Product.name) \
+        .order_by(func.sum(item.quantity).desc(), admin.Product.name)
+    return [_product(row) for row in db.execute(query)]
+
+
+DASHBOARD_SECTIONS = ('overview', 'daily', 'performances', 'locations')
+
+
+def dashboard_summary(db: Session, filters: data.DashboardFilters = None, sections=DASHBOARD_SECTIONS,
+                      limit: int | None = None) -> dict:
+    """Build the requested dashboard sections from a single GROUPING SETS scan of sales_data.
+
+    Each section is shaped like the response of its standalone endpoint.
+    """
+    sections = [section for section in DASHBOARD_SECTIONS if section in sections]
+    keys = {
+        'daily': sale_day.label('day'),
+        'performances': admin.SalesData.sales_rep,
+        'locations': location_label.label('location')
+    }
+    keys = {section: key for section, key in keys.items() if section in sections}
+    grouping_sets = [keys[section] if section in keys else tuple_() for section in sections]
+    conditions = build_filter_conditions(filters)
+    items = sale_items(*conditions)
+    query = db.query(
+        # grouping(key) is 0 on the rows of the grouping set built from that key.
+        *[func.grouping(key).label(f'{section}_rollup') for section, key in keys.items()],
+        *keys.values(),
+        *_overview_aggregates(),
+        *_sales_aggregates(items, is_sale(items))
+    ).select_from(admin.SalesData).outerjoin(items, joins_sale(items)).filter(*conditions) \
+        .group_by(func.grouping_sets(*grouping_sets))
+
+    rows = {section: [] for section in DASHBOARD_SECTIONS}
+    for row in query.all():
+        section = next((section for section in keys if getattr(row, f'{section}_rollup') == 0), 'overview')
+        rows[section].append(row)
+
+    summary = {}
+    if 'overview' in sections:
+        overview = rows['overview'][0] if rows['overview'] else None
+        if overview is None or not overview.records:
+            summary['overview'] = {"error": "No data available"}
+        else:
+            summary['overview'] = _overview(overview)
+    if 'daily' in sections:
+        days = sorted((row for row in rows['daily'] if row.transactions), key=lambda row: row.day)
+        summary['daily'] = {
+            "daily_sales": [_day(row) for row in days],
+            "total_days": len(days)
+        }
+    if 'performances' in sections:
+        reps = sorted((row for row in rows['performances'] if row.transactions),
+                      key=lambda row: (-row.units, row.sales_rep))
+        summary['performances'] = {"rep_performance": [_rep(row) for row in reps]}
+    if 'locations' in sections:
+        locations = sorted((row for row in rows['locations'] if row.transactions),
+                           key=lambda row: (-row.units, row.location))
+        if limit:
+            locations = locations[:limit]
+        summary['locations'] = {"location_performance": [_location(row) for row in locations]}
+    return summary
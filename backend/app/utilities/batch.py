@@ -0,0 +1,162 @@
+"""Batched sales writes for POST /sales/batch.
+
+The creates, updates and deletes of a batch are each applied with one statement in the
+caller's transaction; invalid, conflicting and missing items are reported per item.
+"""
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import ARRAY, Boolean, Integer, case, cast, delete, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from ..schemas import data
+from . import customers, line_items, live, partitions, rollup, sketches
+
+SALE_COLUMNS = list(data.SalesData.model_fields)
+# The columns of uq_sales_data_date_customer_location.
+KEY_COLUMNS = ('date', 'customer_name', 'location')
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _validate(items: list, model: type[BaseModel], results: list) -> list[tuple[int, BaseModel]]:
+    """The items that validate as `model`, by index; the others get an invalid result."""
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            results.append({"index": index, "status": "invalid",
+                            "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+    return valid
+
+
+def _create(db: Session, creates: list[tuple[int, data.SalesBatchCreate]], now: datetime, results: list) -> set[int]:
+    sales = admin.SalesData
+    rows = [{**item.model_dump(), "date": _utc(item.date or now)} for _, item in creates]
+    returned = db.execute(insert(sales).values(rows)
+                          .on_conflict_do_nothing(constraint='uq_sales_data_date_customer_location')
+                          .returning(sales.id, sales.date, sales.customer_name, sales.location)).all()
+    ids = {(date, customer_name, location): sale_id for sale_id, date, customer_name, location in returned}
+    created = set()
+    for (index, _), row in zip(creates, rows):
+        # Popped, so a later item with the same key is a conflict.
+        sale_id = ids.pop((row["date"], row["customer_name"], row["location"]), None)
+        if sale_id is None:
+            results.append({"index": index, "status": "conflict"})
+        else:
+            results.append({"index": index, "status": "created", "id": sale_id})
+            created.add(sale_id)
+    return created
+
+
+def _update_conflicts(db: Session, changes: dict[int, dict], reserved: set[tuple]) -> set[int]:
+    """The ids whose update would move the row onto a taken key; `reserved` are the creates' keys."""
+    sales = admin.SalesData
+    columns = [getattr(sales, column) for column in KEY_COLUMNS]
+    moving = [sale_id for sale_id, fields in changes.items() if fields.keys() & set(KEY_COLUMNS)]
+    if not moving:
+        return set()
+    keys = {sale_id: tuple(key) for sale_id, *key in db.execute(select(sales.id, *columns).where(sales.id.in_(moving)))}
+    # In batch order, so of several updates onto one free key the first wins.
+    targets = {}
+    for sale_id in moving:
+        if sale_id in keys:
+            target = tuple(changes[sale_id].get(column, value) for column, value in zip(KEY_COLUMNS, keys[sale_id]))
+            if target != keys[sale_id]:
+                targets[sale_id] = target
+    if not targets:
+        return set()
+    # Rows keep their keys until the statement runs, so a key that another update or a delete frees is still taken.
+    taken = {tuple(key) for key in db.execute(select(*columns).where(tuple_(*columns).in_(set(targets.values()))))}
+    taken |= reserved
+    conflicts = set()
+    for sale_id, target in targets.items():
+        if target in taken:
+            conflicts.add(sale_id)
+        else:
+            taken.add(target)
+    return conflicts
+
+
+def _update(db: Session, changes: dict[int, dict]) -> set[int]:
+    sales = admin.SalesData
+    ids = list(changes)
+    columns = [column for column in SALE_COLUMNS if any(column in fields for fields in changes.values())]
+    arrays, names = [cast(literal(ids, ARRAY(Integer)), ARRAY(Integer))], ['id']
+    for column in columns:
+        # Cast, so an array of only NULLs still has the column's type.
+        column_type = ARRAY(sales.__table__.c[column].type)
+        arrays.append(cast(literal([changes[sale_id].get(column) for sale_id in ids], column_type), column_type))
+        arrays.append(cast(literal([column in changes[sale_id] for sale_id in ids], ARRAY(Boolean)), ARRAY(Boolean)))
+        names += [column, f'set_{column}']
+    source = func.unnest(*arrays).table_valued(*names).render_derived('batch')
+    return set(db.execute(update(sales).where(sales.id == source.c.id).values({
+        column: case((source.c[f'set_{column}'], source.c[column]), else_=getattr(sales, column)) for column in columns
+    }).returning(sales.id)).scalars())
+
+
+def apply_batch(db: Session, batch: data.SalesBatch, changes: live.Changes) -> dict:
+    """Validate and apply `batch`; returns the counts and a result per item. The caller commits."""
+    sales = admin.SalesData
+    results = {"creates": [], "updates": [], "deletes": []}
+    creates = _validate(batch.creates, data.SalesBatchCreate, results["creates"])
+    updates = _validate(batch.updates, data.SalesBatchUpdate, results["updates"])
+    update_fields = {}
+    for _, item in updates:
+        update_fields.setdefault(item.id, {}).update(
+            (field, _utc(value) if field == 'date' else value)
+            for field, value in item.model_dump(include=set(SALE_COLUMNS) & item.model_fields_set).items())
+    delete_ids = set(batch.deletes)
+    now = datetime.now(timezone.utc)
+    dates = [_utc(item.date or now) for _, item in creates] + \
+        [fields['date'] for fields in update_fields.values() if 'date' in fields]
+    if dates:
+        partitions.ensure_partitions(db, min(dates), max(dates))
+    conflicts = _update_conflicts(db, update_fields, {(_utc(item.date or now), item.customer_name, item.location)
+                                                      for _, item in creates}) if update_fields else set()
+    for sale_id in conflicts:
+        del update_fields[sale_id]
+
+    touched = sales.id.in_(update_fields.keys() | delete_ids)
+    previous_customers, previous_days = set(), set()
+    if update_fields or delete_ids:
+        changes.capture_before(db, touched)
+        rollup.remove_sales(db, touched)
+        previous_customers = customers.customer_keys(db, touched)
+        previous_days = sketches.sketch_days(db, touched)
+
+    created_ids = _create(db, creates, now, results["creates"]) if creates else set()
+    updated_ids = _update(db, update_fields) if update_fields else set()
+    for index, item in updates:
+        results["updates"].append({"index": index, "id": item.id, "status": "conflict" if item.id in conflicts
+                                   else "updated" if item.id in updated_ids else "not_found"})
+    deleted_ids = set(db.execute(delete(sales).where(sales.id.in_(delete_ids)).returning(sales.id)).scalars()) \
+        if delete_ids else set()
+    results["deletes"] = [{"index": index, "id": sale_id, "status": "deleted" if sale_id in deleted_ids else "not_found"}
+                          for index, sale_id in enumerate(batch.deletes)]
+
+    written = sales.id.in_(created_ids | updated_ids)
+    if created_ids or updated_ids:
+        line_items.sync_line_items(db, written)
+        rollup.add_sales(db, written)
+        changes.capture_after(db, written)
+    if created_ids or updated_ids or previous_customers:
+        customers.refresh_customers(db, written, previous_customers)
+    if created_ids and (updated_ids or previous_days):
+        sketches.lock_days(db, sketches.sketch_days(db, written) | previous_days)
+    if created_ids:
+        sketches.add_sales(db, sales.id.in_(created_ids))
+    if updated_ids or previous_days:
+        sketches.refresh_sketches(db, sales.id.in_(updated_ids), previous_days)
+
+    for kind in results:
+        results[kind].sort(key=lambda result: result["index"])
+    counts = {status: sum(result["status"] == status for kind in results.values() for result in kind)
+              for status in ('created', 'updated', 'deleted')}
+    counts["failed"] = sum(len(kind) for kind in results.values()) - sum(counts.values())
+    return {**counts, "results": results}
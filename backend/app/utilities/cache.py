@@ -0,0 +1,92 @@
+from threading import Lock
+
+from cachetools import TTLCache
+
+from ..schemas import data
+from . import metrics
+from .config import settings
+
+_MISSING = object()
+
+
+class AnalyticsCache:
+    """In-process cache of analytics results keyed on endpoint and normalized filters.
+
+    Entries expire after `ttl` seconds and the least recently used entry is evicted once
+    `maxsize` entries are held. Sales writes call `invalidate()`; results computed while a
+    write was committing are not stored, so a stale result never outlives the invalidation.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(endpoint: str, filters: data.DashboardFilters = None, **params) -> tuple:
+        """Build a cache key; empty filter values are dropped since they don't filter anything."""
+        normalized = {}
+        if filters:
+            for name, value in filters.model_dump().items():
+                if value:
+                    normalized[name] = value
+        normalized.update(params)
+        return (endpoint, tuple(sorted(normalized.items())))
+
+    def _lookup(self, key: tuple):
+        with self._lock:
+            cached = self._entries.get(key, _MISSING)
+            if cached is not _MISSING:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return cached, self._generation
+
+    def _store(self, key: tuple, result, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = result
+
+    def get_or_compute(self, key: tuple, compute):
+        cached, generation = self._lookup(key)
+        if cached is not _MISSING:
+            return cached
+        with metrics.stage('analytics'):
+            result = compute()
+        self._store(key, result, generation)
+        return result
+
+    async def get_or_compute_async(self, key: tuple, compute):
+        """Like `get_or_compute`, for a `compute` that returns an awaitable."""
+        cached, generation = self._lookup(key)
+        if cached is not _MISSING:
+            return cached
+        with metrics.stage('analytics'):
+            result = await compute()
+        self._store(key, result, generation)
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": int(self._entries.maxsize),
+                "ttl_seconds": self._entries.ttl
+            }
+
+
+analytics_cache = AnalyticsCache(maxsize=settings.ANALYTICS_CACHE_MAX_ENTRIES, ttl=settings.ANALYTICS_CACHE_TTL_SECONDS)
@@ -8,6 +8,19 @@ class Settings(BaseSettings):
     PG_HOST: str
     PG_PORT: str
     TABLE_NAME: str
+    # Each engine (sync and async) gets its own pool of this size
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 2
+
+    # Optional read replica for the GET analytics and list endpoints; unset, everything reads the primary.
+    # The replica uses the primary's database name and credentials.
+    REPLICA_HOST: str | None = None
+    REPLICA_PORT: str | None = None
+    REPLICA_POOL_SIZE: int = 5
+    REPLICA_MAX_OVERFLOW: int = 2
+    # Reads go to the primary while the replica lags more than this or fails its health check
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 5
 
     # Google Drive API settings
     SERVICE_ACCOUNT_FILE: str
@@ -19,6 +32,48 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+
+    # Analytics cache settings
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 256
+
+    # Most buckets a sales trend returns; longer ranges are coarsened to fit
+    TREND_MAX_POINTS: int = 366
+
+    # Columnar snapshot settings; a full reload happens at least this often
+    SNAPSHOT_MAX_AGE_SECONDS: int = 300
+    # Ids below the newest loaded one that are checked again for rows committed late
+    SNAPSHOT_LOOKBACK_IDS: int = 20000
+
+    # Upload settings
+    UPLOAD_CHUNK_ROWS: int = 10000
+
+    # Responses at least this many bytes are compressed when the client accepts br or gzip
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+
+    # Export settings; rows fetched from the cursor and encoded per batch
+    EXPORT_BATCH_ROWS: int = 5000
+
+    # Slow-query log; statements at least this slow get an EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    SLOW_QUERY_LOG_SIZE: int = 200
+
+    # Threads available to CPU-bound work (parsing, pandas) offloaded from async routes
+    CPU_WORKER_THREADS: int = 4
+
+    # Most items (creates, updates and deletes together) one /sales/batch request may carry
+    BATCH_MAX_ITEMS: int = 1000
+
+    # Live stream (/sales/stream): events a client may fall behind by before it is sent a reset,
+    # the most rows one write streams as deltas rather than a reset, and the keep-alive interval
+    STREAM_BUFFER_EVENTS: int = 100
+    STREAM_MAX_ROWS: int = 1000
+    STREAM_HEARTBEAT_SECONDS: int = 15
+
+    # Monthly sales_data partitions created ahead of time, past the current month
+    PARTITION_MONTHS_AHEAD: int = 3
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,115 @@
+"""Maintenance and queries of the customers table: lifetime stats per (normalized name, phone digits) identity.
+
+Write paths take `customer_keys` of the rows before changing them and call `refresh_customers`
+after, in the same transaction; `rebuild_customers` recomputes the whole table:
+
+    python -m app.utilities.customers    (from the backend directory)
+"""
+from datetime import datetime
+
+from sqlalchemy import ARRAY, String, bindparam, delete, distinct, exists, func, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg, insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from . import locks
+from .analytics import is_sale, joins_sale, sale_items, total_sales
+
+_LOCK_KEY = 0x43_55_53_54
+STAT_COLUMNS = ['name', 'phone_no', 'transactions', 'purchases', 'total_units', 'first_purchase', 'last_purchase',
+                'locations', 'sales_reps']
+CUSTOMER_COLUMNS = ['id', *STAT_COLUMNS]
+
+
+def _lock(db: Session, keys: set[tuple[str, str]]):
+    locks.lock_keys(db, _LOCK_KEY, [locks.key_hash(f'{name_key}\x00{phone_key}') for name_key, phone_key in keys])
+
+
+def _stats_select(keys=None):
+    sales = admin.SalesData
+    latest_first = sales.date.desc()
+    conditions = [tuple_(admin.customer_name_key, admin.customer_phone_key).in_(keys)] if keys is not None else []
+    items = sale_items(*conditions)
+    query = select(
+        admin.customer_name_key, admin.customer_phone_key,
+        array_agg(aggregate_order_by(sales.customer_name, latest_first))[1],
+        array_agg(aggregate_order_by(sales.phone_no, latest_first))[1],
+        func.count(),
+        func.count().filter(is_sale(items)),
+        func.coalesce(func.sum(total_sales(items)).filter(is_sale(items)), 0),
+        func.min(sales.date).filter(is_sale(items)),
+        func.max(sales.date).filter(is_sale(items)),
+        func.count(distinct(sales.location)),
+        func.count(distinct(sales.sales_rep))
+    ).select_from(sales).outerjoin(items, joins_sale(items)).where(*conditions)
+    return query.group_by(admin.customer_name_key, admin.customer_phone_key)
+
+
+def _keys_select(keys: set[tuple[str, str]]):
+    # Two array parameters however many customers there are.
+    names, phones = zip(*keys)
+    affected = func.unnest(bindparam('name_keys', list(names), type_=ARRAY(String)),
+                           bindparam('phone_keys', list(phones), type_=ARRAY(String))) \
+        .table_valued('name_key', 'phone_key').render_derived()
+    return select(affected.c.name_key, affected.c.phone_key)
+
+
+def customer_keys(db: Session, condition) -> set[tuple[str, str]]:
+    """Identities of the customers of the sales_data rows matching `condition`."""
+    query = select(admin.customer_name_key, admin.customer_phone_key).where(condition).distinct()
+    return {tuple(row) for row in db.execute(query)}
+
+
+def refresh_customers(db: Session, condition, previous_keys: set[tuple[str, str]] = frozenset()):
+    """Recompute the customers of the rows matching `condition`, plus `previous_keys`; call after the change.
+
+    Customers left without sales rows are deleted.
+    """
+    keys = customer_keys(db, condition) | set(previous_keys)
+    if not keys:
+        return
+    # Taken before the recompute, whose statement then sees what earlier holders committed.
+    _lock(db, keys)
+    stmt = insert(admin.Customer).from_select(['name_key', 'phone_key', *STAT_COLUMNS], _stats_select(_keys_select(keys)))
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_customers_name_key_phone_key',
+        set_={**{column: stmt.excluded[column] for column in STAT_COLUMNS}, 'updated_at': func.now()}
+    )
+    db.execute(stmt)
+    db.execute(delete(admin.Customer).where(
+        tuple_(admin.Customer.name_key, admin.Customer.phone_key).in_(_keys_select(keys)),
+        ~exists().where(admin.customer_name_key == admin.Customer.name_key,
+                        admin.customer_phone_key == admin.Customer.phone_key)
+    ))
+
+
+def rebuild_customers(db: Session):
+    """Recompute the whole customers table from sales_data."""
+    locks.lock_all(db, _LOCK_KEY)
+    db.execute(delete(admin.Customer))
+    db.execute(insert(admin.Customer).from_select(['name_key', 'phone_key', *STAT_COLUMNS], _stats_select()))
+
+
+def ranked_customers(db: Session, limit: int, after: tuple[float, int] | None = None,
+                     inactive_since: datetime | None = None) -> list:
+    """A page of customers by lifetime units, highest first, continuing after the (total_units, id) key `after`.
+
+    With `inactive_since` only customers whose last purchase is older are returned.
+    """
+    customer = admin.Customer
+    query = select(*[getattr(customer, column) for column in CUSTOMER_COLUMNS]) \
+        .order_by(customer.total_units.desc(), customer.id.desc())
+    if after is not None:
+        query = query.where(tuple_(customer.total_units, customer.id) < after)
+    if inactive_since is not None:
+        query = query.where(customer.last_purchase < inactive_since)
+    return db.execute(query.limit(limit)).all()
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        rebuild_customers(session)
+        session.commit()
+        print(f"Rebuilt customers: {session.query(admin.Customer).count()} rows")
@@ -0,0 +1,116 @@
+"""The sales data version, for ETags and cross-worker cache invalidation.
+
+Every write path calls `bump` in its transaction; the new version reaches every worker through
+NOTIFY at commit, and `check_etag` answers a matching If-None-Match with 304.
+"""
+import asyncio
+from hashlib import blake2b
+from threading import Lock
+
+import asyncpg
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from . import database
+from .cache import analytics_cache
+
+CHANNEL = 'sales_data_version'
+# Seconds between attempts to reconnect a dropped listener.
+RECONNECT_SECONDS = 5
+
+
+class SalesVersion:
+    def __init__(self):
+        self.version = None
+        self.listening = False
+        self._lock = Lock()
+        self._listeners = {}
+
+    def add_listener(self, channel: str, callback):
+        """Have the listener connection also pass the payloads of `channel` to `callback`; call before it starts."""
+        self._listeners[channel] = callback
+
+    def bump(self, db: Session) -> int:
+        """Increment the version in `db`'s transaction; hand the result to `committed` after the commit.
+
+        The row lock is held until commit, so call it last, just before committing.
+        """
+        row = admin.SalesDataVersion
+        version = db.execute(update(row).where(row.id == 1).values(version=row.version + 1)
+                             .returning(row.version)).scalar_one()
+        db.execute(select(func.pg_notify(CHANNEL, str(version))))
+        return version
+
+    def _advance(self, version: int) -> bool:
+        with self._lock:
+            if self.version is not None and version <= self.version:
+                return False
+            self.version = version
+            return True
+
+    def committed(self, version: int):
+        """Record a version this worker committed, so its next ETags don't wait for the notification."""
+        self._advance(version)
+
+    def _observe(self, version: int):
+        if self._advance(version):
+            analytics_cache.invalidate()
+            database.replica.note_write()
+
+    async def current(self, db: AsyncSession) -> int:
+        if self.listening and self.version is not None:
+            return self.version
+        return (await db.execute(select(admin.SalesDataVersion.version))).scalar_one()
+
+    async def listen(self):
+        """Follow the version until cancelled, reconnecting whenever the connection drops."""
+        while True:
+            try:
+                conn = await asyncpg.connect(user=database.PG_USER, password=database.PG_PASSWORD,
+                                             host=database.PG_HOST, port=database.PG_PORT, database=database.PG_DBNAME,
+                                             server_settings={'application_name': 'sales_data_version listener'})
+            except (OSError, asyncpg.PostgresError):
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            try:
+                await conn.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: self._observe(int(payload)))
+                for channel, callback in self._listeners.items():
+                    await conn.add_listener(channel, lambda _conn, _pid, _channel, payload, callback=callback: callback(payload))
+                # Read after LISTEN, so a bump in between is still announced.
+                self._observe(await conn.fetchval("SELECT version FROM sales_data_version"))
+                self.listening = True
+                await closed.wait()
+            except (OSError, asyncpg.PostgresError):
+                pass
+            finally:
+                self.listening = False
+                await conn.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+sales_version = SalesVersion()
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match compares weakly: W/ prefixes don't matter.
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
+async def check_etag(request: Request, db: AsyncSession = Depends(database.get_async_read_db)) -> dict:
+    """The caching headers of an analytics response; raises 304 when the client's copy is current."""
+    version = await sales_version.current(db)
+    query = sorted(request.query_params.multi_items())
+    digest = blake2b(repr((request.url.path, query)).encode(), digest_size=8).hexdigest()
+    # Weak, since compression changes the bytes but not the content.
+    headers = {"ETag": f'W/"{version}-{digest}"', "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get('if-none-match'), headers["ETag"]):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return headers
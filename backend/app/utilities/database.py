@@ -1,12 +1,20 @@
-from sqlalchemy import create_engine
+from threading import Lock
+from time import monotonic
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 import os
 import sys
 from dotenv import load_dotenv
+from . import metrics
+from .config import settings
+from .querylog import query_log
 
 load_dotenv()
-from typing_extensions import Generator
+from typing_extensions import AsyncGenerator, Generator
 PG_DBNAME = os.getenv("PG_DBNAME")
 PG_USER = os.getenv("PG_USER")
 PG_PASSWORD = os.getenv("PG_PASSWORD")
@@ -15,15 +23,146 @@ PG_PORT = os.getenv("PG_PORT")
 
 engine = create_engine(
     f'postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DBNAME}',
-    pool_size=5,
-    max_overflow=2,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=300,
+    pool_pre_ping=True,
+    pool_timeout=30,
+    poolclass=metrics.TimedQueuePool
+)
+
+# Async routes run on asyncpg so waiting on the database doesn't block the event loop.
+async_engine = create_async_engine(
+    f'postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DBNAME}',
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_recycle=300,
     pool_pre_ping=True,
-    pool_timeout=30
+    pool_timeout=30,
+    poolclass=metrics.TimedAsyncQueuePool
 )
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+query_log.instrument(engine)
+query_log.instrument(async_engine.sync_engine)
+
+# The replica has its own pools, so analytics scans can't take the connections writes need.
+read_engine = read_async_engine = None
+if settings.REPLICA_HOST:
+    REPLICA_PORT = settings.REPLICA_PORT or PG_PORT
+    read_engine = create_engine(
+        f'postgresql://{PG_USER}:{PG_PASSWORD}@{settings.REPLICA_HOST}:{REPLICA_PORT}/{PG_DBNAME}',
+        pool_size=settings.REPLICA_POOL_SIZE,
+        max_overflow=settings.REPLICA_MAX_OVERFLOW,
+        pool_recycle=300,
+        pool_pre_ping=True,
+        pool_timeout=30,
+        connect_args={'connect_timeout': 5},
+        poolclass=metrics.TimedReplicaQueuePool
+    )
+    read_async_engine = create_async_engine(
+        f'postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{settings.REPLICA_HOST}:{REPLICA_PORT}/{PG_DBNAME}',
+        pool_size=settings.REPLICA_POOL_SIZE,
+        max_overflow=settings.REPLICA_MAX_OVERFLOW,
+        pool_recycle=300,
+        pool_pre_ping=True,
+        pool_timeout=30,
+        connect_args={'timeout': 5},
+        poolclass=metrics.TimedAsyncReplicaQueuePool
+    )
+    for replica_engine in (read_engine, read_async_engine.sync_engine):
+        metrics.instrument_engine(replica_engine)
+        query_log.instrument(replica_engine)
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else SessionLocal
+AsyncReadSessionLocal = async_sessionmaker(bind=read_async_engine, autoflush=False, expire_on_commit=False) \
+    if read_async_engine else AsyncSessionLocal
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+# or isn't a standby at all, NULL when it can't tell.
+REPLICA_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())::float8 END"
+)
+
+
+class ReplicaRouter:
+    """Decides whether a read-only request goes to the replica or the primary.
+
+    The replica is used while its last health check, at most `check_interval` seconds old,
+    found it reachable and no more than `max_lag` seconds behind. For `max_lag` seconds after
+    this worker commits on the primary, reads stay on the primary too, so a request (or a
+    cached analytics result) never misses a write its worker has just reported as done.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self.healthy = False
+        self._checked_at = float('-inf')
+        self._written_at = float('-inf')
+        self._checking = Lock()
+
+    def note_write(self, *args):
+        self._written_at = monotonic()
+
+    def _check_due(self) -> bool:
+        # One request runs the check; the others meanwhile go by the previous result.
+        return monotonic() - self._checked_at >= self.check_interval and self._checking.acquire(blocking=False)
+
+    def _record(self, lag: float | None):
+        self.lag = lag
+        self.healthy = lag is not None and lag <= self.max_lag
+        self._checked_at = monotonic()
+        self._checking.release()
+
+    def _routable(self) -> bool:
+        return self.healthy and monotonic() - self._written_at > self.max_lag
+
+    def use_replica(self) -> bool:
+        if read_engine is None:
+            return False
+        if self._check_due():
+            lag = None
+            try:
+                with read_engine.connect() as conn:
+                    lag = conn.execute(REPLICA_LAG).scalar()
+            except (SQLAlchemyError, OSError):
+                pass
+            finally:
+                self._record(lag)
+        return self._routable()
+
+    async def use_replica_async(self) -> bool:
+        if read_async_engine is None:
+            return False
+        if self._check_due():
+            lag = None
+            try:
+                async with read_async_engine.connect() as conn:
+                    lag = (await conn.execute(REPLICA_LAG)).scalar()
+            except (SQLAlchemyError, OSError):
+                pass
+            finally:
+                self._record(lag)
+        return self._routable()
+
+    def stats(self) -> dict:
+        return {
+            "configured": read_engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "reading_from": "replica" if self._routable() else "primary"
+        }
+
+
+replica = ReplicaRouter(settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_INTERVAL_SECONDS)
+event.listen(engine, 'commit', replica.note_write)
+event.listen(async_engine.sync_engine, 'commit', replica.note_write)
 
 Base = declarative_base()
 
@@ -33,3 +172,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db():
+    """A session for read-only endpoints: on the replica when `replica` allows it, else on the primary."""
+    db = (ReadSessionLocal if replica.use_replica() else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with (AsyncReadSessionLocal if await replica.use_replica_async() else AsyncSessionLocal)() as db:
+        yield db
@@ -0,0 +1,113 @@
+"""Incremental encoders for streaming sales exports.
+
+Each encoder turns batches of result rows into bytes as they arrive from the cursor, so an
+export holds one batch in memory no matter how many rows it covers. Parquet output is
+written one row group per batch.
+"""
+import csv
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import and_, select
+
+from ..models import admin
+from ..schemas import data
+from .analytics import PRODUCTS, build_filter_conditions
+
+EXPORT_COLUMNS = ['id', 'date', 'location', 'customer_name', 'phone_no', *PRODUCTS, 'sales_rep', 'user_id']
+MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+PARQUET_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('date', pa.timestamp('us', tz='UTC')),
+    ('location', pa.string()),
+    ('customer_name', pa.string()),
+    ('phone_no', pa.string()),
+    *[(product, pa.float64()) for product in PRODUCTS],
+    ('sales_rep', pa.string()),
+    ('user_id', pa.int64())
+])
+
+
+def export_query(filters: data.DashboardFilters = None):
+    query = select(*[getattr(admin.SalesData, column) for column in EXPORT_COLUMNS])
+    conditions = build_filter_conditions(filters)
+    if conditions:
+        query = query.where(and_(*conditions))
+    return query.order_by(admin.SalesData.date, admin.SalesData.id)
+
+
+class CsvEncoder:
+    def start(self) -> bytes:
+        return self.encode([EXPORT_COLUMNS])
+
+    def encode(self, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row])
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        return b''
+
+
+class NdjsonEncoder:
+    def start(self) -> bytes:
+        return b''
+
+    def encode(self, rows) -> bytes:
+        return ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=lambda value: value.isoformat()) + '\n'
+                       for row in rows).encode()
+
+    def finish(self) -> bytes:
+        return b''
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, chunk) -> int:
+        self._chunks.append(bytes(chunk))
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        chunk = b''.join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+class ParquetEncoder:
+    def __init__(self):
+        self._sink = _Drain()
+        self._writer = pq.ParquetWriter(self._sink, PARQUET_SCHEMA)
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows) -> bytes:
+        columns = list(zip(*rows))
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, PARQUET_SCHEMA)],
+            schema=PARQUET_SCHEMA))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+ENCODERS = {'csv': CsvEncoder, 'ndjson': NdjsonEncoder, 'parquet': ParquetEncoder}
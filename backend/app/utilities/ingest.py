@@ -0,0 +1,215 @@
+from io import StringIO
+from itertools import islice
+from typing import BinaryIO, Iterator
+
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, TIMESTAMP, and_, distinct, func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from . import customers, line_items, live, partitions, rollup, sketches
+from .analytics import PRODUCTS
+
+UPLOAD_COLUMNS = ['date', 'location', 'customer_name', 'phone_no', *PRODUCTS, 'sales_rep']
+UPLOAD_KEY = ['date', 'customer_name', 'location']
+STAGING_COLUMNS = ['row_no', *UPLOAD_COLUMNS]
+UPLOAD_FORMATS = {'.xlsx': 'excel', '.xlsm': 'excel', '.xls': 'legacy_excel', '.csv': 'csv', '.parquet': 'parquet'}
+
+
+def upload_format(filename: str | None) -> str:
+    extension = '.' + filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension not in UPLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type '{extension}'. "
+                                                    f"Upload one of: {', '.join(UPLOAD_FORMATS)}")
+    return UPLOAD_FORMATS[extension]
+
+
+def _excel_chunks(file: BinaryIO, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    # read_only mode streams rows from the sheet XML instead of loading the whole workbook.
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column) if column is not None else '' for column in header]
+        while True:
+            batch = list(islice(rows, chunk_rows))
+            if not batch:
+                break
+            chunk = [row for row in batch if any(value is not None for value in row)]
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _parquet_chunks(file: BinaryIO, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def iter_upload_chunks(file: BinaryIO, file_format: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parse an uploaded file into DataFrames of at most `chunk_rows` rows."""
+    if file_format == 'csv':
+        yield from pd.read_csv(file, chunksize=chunk_rows)
+    elif file_format == 'parquet':
+        yield from _parquet_chunks(file, chunk_rows)
+    elif file_format == 'excel':
+        yield from _excel_chunks(file, chunk_rows)
+    else:
+        # The binary .xls format can't be streamed; it is read whole and then chunked.
+        df = pd.read_excel(file)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def clean_upload_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize column names and clean dates, product quantities and phone numbers."""
+    df = df.copy()
+    df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+
+    required_columns = {'date', 'location', 'sales_rep', 'customer_name', 'phone_no'}.union(set(PRODUCTS))
+    if not required_columns.issubset(df.columns):
+        missing_cols = required_columns - set(df.columns)
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(missing_cols)}")
+
+    # Clean date column
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    if df['date'].isnull().any():
+        raise HTTPException(status_code=400, detail="Invalid date format in 'date' column")
+
+    # Clean product columns - convert "-", empty strings, and NaN to 0.0
+    for product in PRODUCTS:
+        df[product] = df[product].replace(['-', '', 'nan', 'NaN', 'null', 'None'], 0)
+        df[product] = pd.to_numeric(df[product], errors='coerce').fillna(0.0)
+
+    # Clean phone_no column - convert to string and handle null values
+    df['phone_no'] = df['phone_no'].fillna('').astype(str).replace('nan', '')
+    return df
+
+
+staging = Table(
+    'sales_upload_staging', MetaData(),
+    Column('row_no', Integer, nullable=False),
+    Column('date', TIMESTAMP(timezone=True)),
+    Column('location', String),
+    Column('customer_name', String),
+    Column('phone_no', String),
+    *[Column(product, Float) for product in PRODUCTS],
+    Column('sales_rep', String),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP'
+)
+
+
+def staging_records(df: pd.DataFrame) -> list[tuple]:
+    """The rows of a cleaned upload chunk as records for the staging table, in STAGING_COLUMNS order.
+
+    This is all pandas work, so async callers build the records on a worker thread and keep
+    only the COPY on the event loop.
+    """
+    rows = df[UPLOAD_COLUMNS].copy()
+    # The drivers are strict about types: naive timestamps are taken as UTC, the zone the
+    # sales days are reported in, and text columns are sent as str.
+    if rows['date'].dt.tz is None:
+        rows['date'] = rows['date'].dt.tz_localize('UTC')
+    rows = rows.astype(object).where(rows.notna(), None)
+    for column in ['location', 'customer_name', 'phone_no', 'sales_rep']:
+        rows[column] = rows[column].map(lambda value: value if value is None else str(value))
+    return [(row_no, *record) for row_no, record in enumerate(rows.itertuples(index=False, name=None))]
+
+
+def _copy_text(value) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _load_staging(db: Session, records: list[tuple]):
+    """Create the per-transaction staging table and load the records into it with COPY."""
+    connection = db.connection()
+    staging.create(connection)
+
+    dbapi_connection = connection.connection.dbapi_connection
+    if hasattr(dbapi_connection, 'run_async'):
+        # asyncpg (async sessions) copies the records as they are.
+        dbapi_connection.run_async(lambda driver_connection: driver_connection.copy_records_to_table(
+            staging.name, records=records, columns=STAGING_COLUMNS))
+        return
+
+    cursor = dbapi_connection.cursor()
+    if hasattr(cursor, 'copy_expert'):
+        # COPY's text format, where NULL (\N) stays distinct from ''.
+        buffer = StringIO(''.join('\t'.join(map(_copy_text, record)) + '\n' for record in records))
+        cursor.copy_expert(f"COPY {staging.name} ({', '.join(STAGING_COLUMNS)}) FROM STDIN", buffer)
+    else:
+        # Drivers without COPY support fall back to batched multi-row INSERTs.
+        db.execute(insert(staging), [dict(zip(STAGING_COLUMNS, record)) for record in records])
+
+
+def bulk_upsert_sales(db: Session, records: list[tuple], changes: live.Changes | None = None) -> dict:
+    """Merge upload rows, as built by `staging_records`, into sales_data keyed on (date, customer_name, location).
+
+    The rows are staged with COPY and merged with one INSERT ... ON CONFLICT; within the file
+    the last row for a key wins. Rows whose values already match are left untouched. The
+    rows are captured into `changes`, if given, for the caller to publish. The caller commits.
+    """
+    _load_staging(db, records)
+    key = tuple_(*[getattr(admin.SalesData, column) for column in UPLOAD_KEY])
+    staged_keys = select(*[staging.c[column] for column in UPLOAD_KEY])
+    first, last = db.execute(select(func.min(staging.c.date), func.max(staging.c.date))).one()
+    if first is not None:
+        partitions.ensure_partitions(db, first, last)
+
+    # Take the current values of every row the upload may touch out of the rollup.
+    if changes is not None:
+        changes.capture_before(db, key.in_(staged_keys))
+    rollup.remove_sales(db, key.in_(staged_keys))
+    previous_customers = customers.customer_keys(db, key.in_(staged_keys))
+
+    latest = select(*[staging.c[column] for column in UPLOAD_COLUMNS]) \
+        .distinct(*[staging.c[column] for column in UPLOAD_KEY]) \
+        .order_by(*[staging.c[column] for column in UPLOAD_KEY], staging.c.row_no.desc())
+    stmt = insert(admin.SalesData).from_select(UPLOAD_COLUMNS, latest)
+    value_columns = [column for column in UPLOAD_COLUMNS if column not in UPLOAD_KEY]
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_sales_data_date_customer_location',
+        set_={column: stmt.excluded[column] for column in value_columns},
+        where=tuple_(*[getattr(admin.SalesData, column) for column in value_columns])
+            .is_distinct_from(tuple_(*[stmt.excluded[column] for column in value_columns]))
+    )
+    # Every CTE reads the snapshot from before the upsert, so `existing` holds the keys that
+    # were there already and the returned rows not among them are the inserted ones.
+    existing = select(*[getattr(admin.SalesData, column) for column in UPLOAD_KEY]) \
+        .where(key.in_(staged_keys)).cte('existing')
+    upserted = stmt.returning(*[getattr(admin.SalesData, column) for column in UPLOAD_KEY]).cte('upserted')
+    was_inserted = existing.c.date.is_(None)
+    upserted_day = func.date(func.timezone(literal_column("'UTC'"), upserted.c.date))
+    inserted, updated, updated_days = db.execute(select(
+        func.count().filter(was_inserted),
+        func.count().filter(~was_inserted),
+        func.array_agg(distinct(upserted_day)).filter(~was_inserted)
+    ).select_from(upserted.outerjoin(existing, and_(*[upserted.c[column] == existing.c[column]
+                                                       for column in UPLOAD_KEY])))).one()
+    distinct_rows = db.execute(select(func.count()).select_from(latest.subquery())).scalar_one()
+
+    line_items.sync_line_items(db, key.in_(staged_keys))
+    rollup.add_sales(db, key.in_(staged_keys))
+    customers.refresh_customers(db, key.in_(staged_keys), previous_customers)
+    # Merging is idempotent, so unchanged rows can go through add_sales too; only days with
+    # rewritten rows may hold values that are gone and need recomputing.
+    sketches.lock_days(db, sketches.sketch_days(db, key.in_(staged_keys)) | set(updated_days or []))
+    sketches.add_sales(db, key.in_(staged_keys))
+    sketches.refresh_days(db, updated_days or [])
+    if changes is not None:
+        changes.capture_after(db, key.in_(staged_keys))
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": distinct_rows - inserted - updated
+    }
@@ -0,0 +1,58 @@
+"""Maintenance of the sales_line_items table.
+
+sales_line_items holds one row per (sale, product) with a nonzero quantity, mirroring the
+wide product columns of sales_data that the API reads and writes. The analytics, the rollup,
+the customers and sketches tables and the snapshot take their units from it. Write paths call
+`sync_line_items` in the same transaction as the change to sales_data, before updating those
+tables; deleted sales take their line items with them through the foreign key.
+`rebuild_line_items` recomputes the table from scratch for backfills, before the rollup:
+
+    python -m app.utilities.line_items    (from the backend directory)
+"""
+from sqlalchemy import delete, func, select, true
+from sqlalchemy.dialects.postgresql import array, insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from .analytics import PRODUCTS
+
+
+def _line_items_select(condition=None):
+    sales = admin.SalesData
+    item = func.unnest(array(PRODUCTS), array([getattr(sales, product) for product in PRODUCTS])) \
+        .table_valued('product', 'quantity').render_derived().lateral('item')
+    query = select(sales.id, sales.date, admin.Product.id, item.c.quantity) \
+        .select_from(sales) \
+        .join(item, true()) \
+        .join(admin.Product, admin.Product.name == item.c.product) \
+        .where(item.c.quantity != 0)
+    if condition is not None:
+        query = query.where(condition)
+    return query
+
+
+def sync_line_items(db: Session, condition):
+    """Rewrite the line items of the sales_data rows matching `condition`; call after changing them."""
+    db.execute(delete(admin.SalesLineItem).where(
+        admin.SalesLineItem.sale_id.in_(select(admin.SalesData.id).where(condition))
+    ))
+    db.execute(insert(admin.SalesLineItem).from_select(
+        ['sale_id', 'sale_date', 'product_id', 'quantity'], _line_items_select(condition)
+    ))
+
+
+def rebuild_line_items(db: Session):
+    """Recompute every line item from sales_data."""
+    db.execute(delete(admin.SalesLineItem))
+    db.execute(insert(admin.SalesLineItem).from_select(
+        ['sale_id', 'sale_date', 'product_id', 'quantity'], _line_items_select()
+    ))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        rebuild_line_items(session)
+        session.commit()
+        print(f"Rebuilt sales_line_items: {session.query(admin.SalesLineItem).count()} rows")
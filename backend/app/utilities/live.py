@@ -0,0 +1,238 @@
+"""Live sales changes for the /sales/stream server-sent events endpoint.
+
+Write paths publish the rows they change through `Changes`; `SalesFeed` streams them to this
+worker's connections as `delta` events, or `reset` when the client has to refetch.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, NamedTuple
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import ARRAY, String, bindparam, func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from ..schemas import data
+from . import database
+from .analytics import PRODUCTS, date_bound, location_values
+from .config import settings
+from .data_version import sales_version
+from .snapshot import sales_snapshot
+
+CHANNEL = 'sales_changes'
+ROW_COLUMNS = ['id', 'date', 'location', 'customer_name', 'phone_no', *PRODUCTS, 'sales_rep']
+# NOTIFY payloads must be shorter than 8000 bytes.
+_PAYLOAD_BYTES = 7900
+_TOTALS = ['total_records', 'total_sales_records', 'total_units_sold']
+
+
+def _encode_row(row) -> list:
+    return [row[0], row[1].astimezone(timezone.utc).isoformat().replace('+00:00', 'Z'), *row[2:]]
+
+
+class Changes:
+    """The sale rows one write touched, before and after the change, by id."""
+
+    def __init__(self):
+        self.before = {}
+        self.after = {}
+        self.too_many = False
+
+    def _capture(self, db: Session, condition, rows: dict):
+        if self.too_many:
+            return
+        found = db.execute(select(*[getattr(admin.SalesData, column) for column in ROW_COLUMNS])
+                           .where(condition).limit(settings.STREAM_MAX_ROWS + 1)).all()
+        if len(rows) + len(found) > settings.STREAM_MAX_ROWS:
+            self.too_many = True
+            self.before, self.after = {}, {}
+        else:
+            rows.update((row[0], _encode_row(row)) for row in found)
+
+    def capture_before(self, db: Session, condition):
+        self._capture(db, condition, self.before)
+
+    def capture_after(self, db: Session, condition):
+        self._capture(db, condition, self.after)
+
+    def publish(self, db: Session, version: int):
+        """Send the rows that changed on CHANNEL in `db`'s transaction; call after `bump`."""
+        if self.too_many:
+            publish_reset(db, version)
+            return
+        changes = [orjson.dumps([self.before.get(sale_id), self.after.get(sale_id)])
+                   for sale_id in sorted(self.before.keys() | self.after.keys())
+                   if self.before.get(sale_id) != self.after.get(sale_id)]
+        # The part number also keeps Postgres from folding identical payloads into one.
+        overhead = len(orjson.dumps({"version": version, "part": 0, "last": False, "changes": []})) + 8
+        batches, size = [[]], overhead
+        for change in changes:
+            if overhead + len(change) > _PAYLOAD_BYTES:
+                publish_reset(db, version)
+                return
+            if size + len(change) + 1 > _PAYLOAD_BYTES:
+                batches.append([])
+                size = overhead
+            batches[-1].append(orjson.Fragment(change))
+            size += len(change) + 1
+        _notify(db, [{"version": version, "part": part, "last": part == len(batches) - 1, "changes": batch}
+                     for part, batch in enumerate(batches)])
+
+
+def publish_reset(db: Session, version: int):
+    """Tell every stream client to refetch once `db`'s transaction commits."""
+    _notify(db, [{"version": version, "part": 0, "last": True, "reset": True}])
+
+
+def _notify(db: Session, messages: list[dict]):
+    payloads = func.unnest(bindparam('payloads', [orjson.dumps(message).decode() for message in messages],
+                                     type_=ARRAY(String))).table_valued('payload', with_ordinality='n').render_derived()
+    db.execute(select(func.pg_notify(CHANNEL, payloads.c.payload)).order_by(payloads.c.n))
+
+
+def _event(name: str, payload: dict, version: int | None = None) -> bytes:
+    event_id = f'id: {version}\n' if version is not None else ''
+    return f'{event_id}event: {name}\ndata: '.encode() + orjson.dumps(payload) + b'\n\n'
+
+
+class _Row(NamedTuple):
+    record: dict
+    date: datetime
+    units: float
+
+
+def _parse(values: list | None) -> _Row | None:
+    if values is None:
+        return None
+    record = dict(zip(ROW_COLUMNS, values))
+    return _Row(record, datetime.fromisoformat(record['date']), sum(record[product] or 0 for product in PRODUCTS))
+
+
+class Subscription:
+    """One stream connection: its filters and its bounded queue of encoded events."""
+
+    def __init__(self, filters: data.DashboardFilters, start: datetime | None = None, end: datetime | None = None):
+        self.filters = filters
+        self.key = tuple(sorted(filters.model_dump().items()))
+        self.start = start
+        self.end = end
+        self.locations = location_values(filters.location) if filters.location else None
+        self.queue = asyncio.Queue(maxsize=settings.STREAM_BUFFER_EVENTS)
+
+    def matches(self, row: _Row) -> bool:
+        filters = self.filters
+        if self.start and row.date < self.start or self.end and row.date > self.end:
+            return False
+        if self.locations and row.record['location'] not in self.locations:
+            return False
+        if any(getattr(filters, column) and row.record[column] != getattr(filters, column)
+               for column in ('sales_rep', 'customer_name')):
+            return False
+        return not filters.product or filters.product in PRODUCTS and bool(row.record[filters.product])
+
+    def delta(self, version: int, rows: list[tuple[_Row | None, _Row | None]]) -> bytes | None:
+        created, updated, deleted = [], [], []
+        totals = dict.fromkeys(_TOTALS, 0)
+        product_totals = dict.fromkeys(PRODUCTS, 0.0)
+        for before, after in rows:
+            before = before if before and self.matches(before) else None
+            after = after if after and self.matches(after) else None
+            if before is None and after is None:
+                continue
+            if after is None:
+                deleted.append(before.record['id'])
+            else:
+                (created if before is None else updated).append(after.record)
+            for row, sign in ((before, -1), (after, 1)):
+                if row is None:
+                    continue
+                totals['total_records'] += sign
+                # Like the overview, unit totals only count sales (rows with units).
+                if row.units > 0:
+                    totals['total_sales_records'] += sign
+                    totals['total_units_sold'] += sign * row.units
+                    for product in PRODUCTS:
+                        product_totals[product] += sign * (row.record[product] or 0)
+        if not (created or updated or deleted):
+            return None
+        return _event('delta', {"version": version, "created": created, "updated": updated, "deleted": deleted,
+                                "totals": {**totals, "product_totals": product_totals}}, version)
+
+    def put(self, event: bytes, version: int):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind for the queued deltas to be of use: drop them and have the client refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_event('reset', {"version": version, "reason": "overflow"}, version))
+
+
+class SalesFeed:
+    """This worker's stream connections, fed from the sales_changes notifications."""
+
+    def __init__(self):
+        self.version = None
+        self._subscriptions = set()
+        self._parts = []
+        self._parts_version = None
+
+    async def subscribe(self, filters: data.DashboardFilters) -> Subscription:
+        """A connection for `filters`, its date bounds read by Postgres as the endpoints' filters read them."""
+        if not (filters.start_date or filters.end_date):
+            return Subscription(filters)
+        # A short session of its own: the stream outlives the request's dependencies.
+        async with database.AsyncReadSessionLocal() as db:
+            try:
+                start, end = (await db.execute(select(date_bound(filters.start_date),
+                                                      date_bound(filters.end_date)))).one()
+            except DBAPIError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date filter")
+        return Subscription(filters, start, end)
+
+    def receive(self, payload: str):
+        message = orjson.loads(payload)
+        version = message['version']
+        if version != self._parts_version:
+            self._parts, self._parts_version = [], version
+        self._parts.extend(message.get('changes', ()))
+        if not message['last']:
+            return
+        changes, self._parts, self._parts_version = self._parts, [], None
+        missed = self.version is not None and version > self.version + 1
+        self.version = version if self.version is None else max(version, self.version)
+        # The columnar snapshot only picks up new rows by itself.
+        if message.get('reset') or missed or any(before is not None for before, _ in changes):
+            sales_snapshot.invalidate()
+        if message.get('reset') or missed:
+            reset = _event('reset', {"version": version, "reason": "missed" if missed else "bulk"}, version)
+            for subscription in self._subscriptions:
+                subscription.put(reset, version)
+            return
+        rows = [(_parse(before), _parse(after)) for before, after in changes]
+        # Connections with the same filters share one encoded event.
+        events = {}
+        for subscription in self._subscriptions:
+            if subscription.key not in events:
+                events[subscription.key] = subscription.delta(version, rows)
+            if events[subscription.key] is not None:
+                subscription.put(events[subscription.key], version)
+
+    async def events(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """The connection's event stream, with a comment line as keep-alive when idle."""
+        self._subscriptions.add(subscription)
+        try:
+            yield _event('ready', {"version": sales_version.version})
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+        finally:
+            self._subscriptions.discard(subscription)
+
+
+sales_feed = SalesFeed()
+sales_version.add_listener(CHANNEL, sales_feed.receive)
@@ -0,0 +1,31 @@
+"""Transaction-level advisory locks on the keys of a derived table."""
+from hashlib import blake2b
+from typing import Iterable
+
+from sqlalchemy import ARRAY, Integer, bindparam, func, select
+from sqlalchemy.orm import Session
+
+
+def key_hash(value: str) -> int:
+    """A signed 32-bit hash of `value` that every worker agrees on."""
+    return int.from_bytes(blake2b(value.encode(), digest_size=4).digest(), 'big', signed=True)
+
+
+def lock_keys(db: Session, namespace: int, keys: Iterable[int]):
+    """Lock the int32 `keys` of `namespace` until the transaction ends.
+
+    The keys are locked in sorted order, so writers with overlapping keys can't deadlock, after
+    a shared lock on the namespace that `lock_all` takes exclusively.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    db.execute(select(func.pg_advisory_xact_lock_shared(namespace)))
+    locked = func.unnest(bindparam('lock_keys', keys, type_=ARRAY(Integer))) \
+        .table_valued('key', with_ordinality='n').render_derived()
+    db.execute(select(func.pg_advisory_xact_lock(namespace, locked.c.key)).order_by(locked.c.n))
+
+
+def lock_all(db: Session, namespace: int):
+    """Lock every key of `namespace` until the transaction ends, e.g. to rebuild the table."""
+    db.execute(select(func.pg_advisory_xact_lock(namespace)))
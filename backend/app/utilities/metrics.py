@@ -0,0 +1,161 @@
+"""Per-request timings exported in Prometheus format and as a Server-Timing header.
+
+`MetricsMiddleware` opens a `RequestMetrics` for every HTTP request. Stages are timed with
+`stage(name)` from the code that does the work (auth, analytics, encoding, ...), and the
+engine and pool hooks add the SQL statement count, time spent in SQL and time spent waiting
+for a pooled connection. When the response starts the timings go into the histograms below
+and into the Server-Timing header, which browser devtools show under "Timing".
+
+The registry is per process; with several uvicorn workers each worker reports its own series.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Time until the response started, by route",
+    ['method', 'route', 'status']
+)
+STAGE_LATENCY = Histogram(
+    'http_request_stage_seconds', "Time spent in each stage of a request, by route",
+    ['route', 'stage']
+)
+SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', "SQL statements executed per request, by route",
+    ['route'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf'))
+)
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', "Time spent waiting for a connection from the pool",
+    ['pool'], buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 30, float('inf'))
+)
+
+
+class RequestMetrics:
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.started = perf_counter()
+        self.stages = {}
+        self.sql_statements = 0
+
+    @property
+    def route(self) -> str:
+        # Set by the router once the request is matched; the template keeps label cardinality low.
+        route = self.scope.get('route')
+        return getattr(route, 'path', None) or 'unmatched'
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.stages.items()]
+        entries.append(f'sql;desc="{self.sql_statements} statements"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage `name` of the current request, if there is one."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add(name, perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start'].pop()
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.sql_statements += 1
+        metrics.add('db', perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't run for a failed statement.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+def instrument_engine(engine):
+    """Count and time the statements `engine` (a sync Engine) executes for the current request."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+class _TimedCheckout:
+    """Mixin timing how long pool checkouts wait, for POOL_WAIT and the current request."""
+    pool_label: str
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = perf_counter() - start
+            POOL_WAIT.labels(self.pool_label).observe(waited)
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.add('pool', waited)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pool_label = 'sync'
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pool_label = 'async'
+
+
+class TimedReplicaQueuePool(_TimedCheckout, QueuePool):
+    pool_label = 'replica_sync'
+
+
+class TimedAsyncReplicaQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pool_label = 'replica_async'
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope)
+        token = _current.set(metrics)
+
+        async def send_with_metrics(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total = perf_counter() - metrics.started
+                route = metrics.route
+                REQUEST_LATENCY.labels(scope["method"], route, str(message["status"])).observe(total)
+                for name, seconds in metrics.stages.items():
+                    STAGE_LATENCY.labels(route, name).observe(seconds)
+                SQL_STATEMENTS.labels(route).observe(metrics.sql_statements)
+                MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current.reset(token)
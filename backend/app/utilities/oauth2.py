@@ -1,5 +1,8 @@
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
+from threading import Lock
+import time
+from cachetools import TLRUCache, TTLCache
 from ..schemas import tk
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
@@ -7,11 +10,21 @@ from fastapi.security import OAuth2PasswordBearer
 from ..models import admin
 from typing import Annotated
 
-from ..utilities import database
+from ..utilities import database, metrics
 from ..utilities.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+# Decoded claims per token, kept no longer than the token itself is valid.
+_token_cache = TLRUCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttu=lambda token, claims, now: min(claims[1], now + settings.PRINCIPAL_CACHE_TTL_SECONDS),
+    timer=time.time
+)
+# Authorization-relevant snapshot of each user, so hot endpoints don't query admins.
+_principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+_cache_lock = Lock()
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -21,6 +34,10 @@ def create_access_token(data: dict):
 
 
 def verify_access_token(token: str, credentials_exception):
+    with _cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None:
+        return cached[0]
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         id: str = payload.get("user_id")
@@ -29,22 +46,41 @@ def verify_access_token(token: str, credentials_exception):
         token_data = tk.TokenData(id=str(id))
     except JWTError:
         raise credentials_exception
+    with _cache_lock:
+        _token_cache[token] = (token_data, payload.get("exp", float("inf")))
     return token_data
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+
+def invalidate_principal(user_id: int):
+    """Drop the cached principal of a user whose privileges or status changed."""
+    with _cache_lock:
+        _principal_cache.pop(int(user_id), None)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> tk.Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token = verify_access_token(token, credentials_exception)
-    user = db.query(admin.User).filter(admin.User.id == token.id).first()
-    return user
+    with metrics.stage('auth'):
+        token = verify_access_token(token, credentials_exception)
+        user_id = int(token.id)
+        with _cache_lock:
+            principal = _principal_cache.get(user_id)
+        if principal is None:
+            user = db.query(admin.User).filter(admin.User.id == user_id).first()
+            if user is None:
+                raise credentials_exception
+            principal = tk.Principal(id=user.id, is_superadmin=user.is_superadmin, is_active=user.is_active, role=user.role)
+            with _cache_lock:
+                _principal_cache[user_id] = principal
+    return principal
 
-def get_current_superadmin(current_user: Annotated[admin.User, Depends(get_current_user)]):
+def get_current_superadmin(current_user: Annotated[tk.Principal, Depends(get_current_user)]):
     if not current_user.is_superadmin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Operation not permitted"
         )
-    return current_user
\ No newline at end of file
+    return current_user
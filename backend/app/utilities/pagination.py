@@ -0,0 +1,23 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: datetime | float, id: int) -> str:
+    """Encode the (key, id) sort key of the last row on a page as an opaque token."""
+    raw = json.dumps([key.isoformat() if isinstance(key, datetime) else key, id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, key_type: type = datetime) -> tuple[datetime | float, int]:
+    """Decode a token from `encode_cursor` whose sort key is a `key_type` (datetime or float)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key, id = json.loads(raw)
+        return datetime.fromisoformat(key) if key_type is datetime else key_type(key), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
@@ -0,0 +1,141 @@
+"""Monthly range partitions of sales_data, one per UTC month, named sales_data_yYYYYmMM.
+
+Rows need the partition of their month: `ensure_partitions` creates missing ones, and
+`detach_before` takes old months out of sales_data for archiving.
+
+    python -m app.utilities.partitions ensure    (from the backend directory)
+    python -m app.utilities.partitions detach --before 2024-01
+"""
+import re
+from datetime import date, datetime, time, timezone
+
+from sqlalchemy import Connection, delete, func, select, text
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from . import customers, live, rollup, sketches
+from .data_version import sales_version
+from .config import settings
+
+_LOCK_KEY = 0x50_41_52_54
+_NAME = re.compile(r'sales_data_y(\d{4})m(\d{2})')
+
+
+def month_start(moment: date) -> date:
+    if isinstance(moment, datetime):
+        moment = (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).astimezone(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def partition_name(month: date) -> str:
+    return f"sales_data_y{month.year}m{month.month:02d}"
+
+
+def partitions(db: Session | Connection) -> dict[str, date]:
+    """The attached monthly partitions of sales_data and the month each holds."""
+    names = db.execute(text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'sales_data'::regclass"
+    )).scalars()
+    matches = filter(None, map(_NAME.fullmatch, names))
+    return {match.string: date(int(match[1]), int(match[2]), 1) for match in matches}
+
+
+def _holds_sales_data(db: Session) -> bool:
+    """Whether `db`'s transaction already holds a lock on sales_data."""
+    return db.execute(text(
+        "SELECT EXISTS (SELECT FROM pg_locks WHERE pid = pg_backend_pid() AND relation = 'sales_data'::regclass)"
+    )).scalar()
+
+
+def _create_partitions(db: Session | Connection, months: list[date]) -> list[str]:
+    # Serialize creators, then look again: another transaction may have just made them.
+    db.execute(select(func.pg_advisory_xact_lock(_LOCK_KEY)))
+    existing = partitions(db)
+    created = []
+    for month in months:
+        name = partition_name(month)
+        if name not in existing:
+            db.execute(text(f"CREATE TABLE {name} PARTITION OF sales_data "
+                            f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})"))
+            created.append(name)
+    return created
+
+
+def ensure_partitions(db: Session, first: date, last: date) -> list[str]:
+    """Create the missing partitions for the months from `first` to `last`; returns the new names.
+
+    They are created and committed on a connection of their own, so sales_data stays locked only
+    while that runs. Call this before `db`'s transaction reads or writes sales_data: the creation
+    waits for the transactions using sales_data to end. If `db`'s has already used it, they are
+    created in that transaction instead, and sales_data stays locked until it ends.
+    """
+    months = [month_start(first)]
+    while months[-1] < month_start(last):
+        months.append(_add_months(months[-1], 1))
+    if not set(map(partition_name, months)) - set(partitions(db)):
+        return []
+    if _holds_sales_data(db):
+        # A connection of our own would wait for `db`'s transaction, which waits for us.
+        return _create_partitions(db, months)
+    with db.get_bind().engine.connect() as connection, connection.begin():
+        return _create_partitions(connection, months)
+
+
+def ensure_upcoming(db: Session, months_ahead: int = None) -> list[str]:
+    """Create the partitions of the current month and the next `months_ahead` ones."""
+    this_month = month_start(datetime.now(timezone.utc))
+    ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    return ensure_partitions(db, this_month, _add_months(this_month, ahead))
+
+
+def detach_before(db: Session, before: date) -> list[str]:
+    """Detach the partitions of months before `before` after taking their rows out of the derived tables."""
+    old = sorted((month, name) for name, month in partitions(db).items() if month < month_start(before))
+    if not old:
+        return []
+    cutoff = datetime.combine(month_start(before), time(0), timezone.utc)
+    condition = admin.SalesData.date < cutoff
+    rollup.remove_sales(db, condition)
+    previous_customers = customers.customer_keys(db, condition)
+    previous_days = sketches.sketch_days(db, condition)
+    # A partition can't be detached while line items still reference its rows.
+    db.execute(delete(admin.SalesLineItem).where(admin.SalesLineItem.sale_date < cutoff))
+    for _, name in old:
+        db.execute(text(f"ALTER TABLE sales_data DETACH PARTITION {name}"))
+    customers.refresh_customers(db, condition, previous_customers)
+    sketches.refresh_days(db, previous_days)
+    live.publish_reset(db, sales_version.bump(db))
+    return [name for _, name in old]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of sales_data.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ensure_command = commands.add_parser('ensure', help="create the partitions of the coming months")
+    ensure_command.add_argument('--months-ahead', type=int, default=None)
+    detach_command = commands.add_parser('detach', help="detach the partitions of months before --before")
+    detach_command.add_argument('--before', required=True, type=lambda value: datetime.strptime(value, '%Y-%m').date(),
+                                help="first month to keep, e.g. 2024-01")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        if args.command == 'ensure':
+            names = ensure_upcoming(session, args.months_ahead)
+        else:
+            names = detach_before(session, args.before)
+        session.commit()
+        print(f"{'Created' if args.command == 'ensure' else 'Detached'} {len(names)} partitions: {', '.join(names) or '-'}")
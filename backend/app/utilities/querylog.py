@@ -0,0 +1,163 @@
+"""Slow-query log for the SQLAlchemy engines.
+
+Every statement is timed and folded into a per-worker table keyed on its normalized text
+(literals and bind parameters replaced by ?, IN lists and multi-row VALUES collapsed), with
+call counts and total/max time. The table holds at most `maxsize` queries; when a new query
+arrives at capacity the one with the least total time is dropped, so the expensive ones and
+the cheap-but-called-thousands-of-times ones (N+1 loops) stay.
+
+Statements slower than the threshold get an EXPLAIN of the same statement and parameters,
+run inside a savepoint on the same connection. ANALYZE runs the query a second time, so it is
+only used for plain reads: writes, row locks (FOR UPDATE/SHARE) and calls of functions with
+side effects (pg_notify, advisory locks, sequences, ...) get a plain EXPLAIN instead. A plan
+is captured once per query and again only when a run is slower than the one it came from.
+"""
+import re
+from datetime import datetime, timezone
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event
+
+from .config import settings
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROWS = re.compile(r"(\(\?(?:, \.\.\.)?\))(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+_WHITESPACE = re.compile(r"\s+")
+_WRITES = re.compile(r"\b(?:insert|update|delete|merge|copy|truncate|create|alter|drop)\b", re.IGNORECASE)
+_SIDE_EFFECTS = re.compile(
+    r"\b(?:pg_notify|pg_(?:try_)?advisory\w*|nextval|setval|set_config|pg_sleep\w*|pg_current_xact_id|txid_current"
+    r"|pg_cancel_backend|pg_terminate_backend|lo_\w+|dblink\w*)\s*\(|\bfor\s+(?:no\s+key\s+|key\s+)?(?:update|share)\b",
+    re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    """Reduce a statement to its shape, so runs with different parameters group together."""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _LIST.sub('?, ...', statement)
+    return _ROWS.sub(r'\1, ...', statement)
+
+
+def _explain_options(statement: str) -> str | None:
+    """The EXPLAIN options for `statement`, or None when it can't be explained."""
+    head = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ''
+    if head not in ('select', 'with', 'insert', 'update', 'delete', 'merge'):
+        return None
+    if head in ('select', 'with') and not _WRITES.search(statement) and not _SIDE_EFFECTS.search(statement):
+        return '(ANALYZE, BUFFERS)'
+    return ''
+
+
+class _QueryStats:
+    __slots__ = ('query', 'calls', 'total', 'max', 'last_seen', 'plan', 'plan_seconds', 'plan_captured_at')
+
+    def __init__(self, query: str):
+        self.query = query
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_seen = None
+        self.plan = None
+        self.plan_seconds = 0.0
+        self.plan_captured_at = None
+
+    def as_dict(self) -> dict:
+        return {
+            "query": self.query,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.calls * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "last_seen": self.last_seen,
+            "plan": self.plan,
+            "plan_ms": round(self.plan_seconds * 1000, 3) if self.plan_captured_at else None,
+            "plan_captured_at": self.plan_captured_at
+        }
+
+
+class QueryLog:
+    """Per-worker statement statistics and captured plans, shared by every instrumented engine."""
+
+    def __init__(self, maxsize: int, threshold: float):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._queries = {}
+        self._lock = Lock()
+
+    def record(self, statement: str, seconds: float) -> bool:
+        """Add one run of `statement`; returns True when its plan should be captured."""
+        query = normalize(statement)
+        with self._lock:
+            stats = self._queries.get(query)
+            if stats is None:
+                if len(self._queries) >= self.maxsize:
+                    cheapest = min(self._queries.values(), key=lambda entry: entry.total)
+                    del self._queries[cheapest.query]
+                stats = self._queries[query] = _QueryStats(query)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.last_seen = datetime.now(timezone.utc)
+            return seconds >= self.threshold and seconds > stats.plan_seconds and _explain_options(statement) is not None
+
+    def store_plan(self, statement: str, seconds: float, plan: str | None):
+        with self._lock:
+            stats = self._queries.get(normalize(statement))
+            if stats is not None and seconds > stats.plan_seconds:
+                stats.plan = plan
+                stats.plan_seconds = seconds
+                stats.plan_captured_at = datetime.now(timezone.utc)
+
+    def entries(self, order_by: str = 'total', limit: int | None = None) -> list[dict]:
+        with self._lock:
+            entries = sorted(self._queries.values(), key=lambda entry: getattr(entry, order_by), reverse=True)
+            return [entry.as_dict() for entry in entries[:limit]]
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('querylog_start', []).append(perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = perf_counter() - conn.info['querylog_start'].pop()
+        if self.record(statement, seconds) and not executemany:
+            plan = _explain(conn, statement, parameters)
+            # Stored even when EXPLAIN failed, so a failing query isn't retried on every run.
+            self.store_plan(statement, seconds, plan)
+
+    @staticmethod
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('querylog_start'):
+            connection.info['querylog_start'].pop()
+
+    def instrument(self, engine):
+        """Time every statement `engine` (a sync Engine) executes."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    # A fresh DBAPI cursor keeps the caller's results intact, and the savepoint keeps a failed
+    # EXPLAIN from aborting the caller's transaction. Raw cursor calls don't fire engine events.
+    if not conn.in_transaction():
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT querylog_explain")
+        try:
+            cursor.execute(f"EXPLAIN {_explain_options(statement)} {statement}", parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT querylog_explain")
+            plan = None
+        cursor.execute("RELEASE SAVEPOINT querylog_explain")
+        return plan
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+
+query_log = QueryLog(maxsize=settings.SLOW_QUERY_LOG_SIZE, threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000)
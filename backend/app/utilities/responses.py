@@ -0,0 +1,20 @@
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+from . import metrics
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """JSON response rendered by orjson; UTC datetimes end in 'Z', as Pydantic writes them."""
+
+    def render(self, content: Any) -> bytes:
+        with metrics.stage('encode'):
+            return orjson.dumps(content,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+
+
+def records(columns: Sequence[str], rows: Iterable[tuple]) -> list[dict]:
+    """Pair selected column tuples with their names, for responses that skip model validation."""
+    return [dict(zip(columns, row)) for row in rows]
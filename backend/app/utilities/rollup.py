@@ -0,0 +1,72 @@
+"""Maintenance of the sales_daily_rollup table.
+
+One rollup row holds, for a (UTC day, location, sales_rep), the product totals of its sales
+(rows with total units > 0), summed from their line items, the number of sales and the number
+of rows. Write paths call `add_sales`/`remove_sales` in the same transaction as the change to
+sales_data so the rollup never drifts; `rebuild_daily_rollup` recomputes it from scratch for
+backfills:
+
+    python -m app.utilities.rollup    (from the backend directory)
+"""
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from .analytics import PRODUCTS, is_sale, joins_sale, product_units, sale_day, sale_items
+
+VALUE_COLUMNS = PRODUCTS + ['transactions', 'sale_transactions']
+
+
+def _rollup_select(condition=None, sign: int = 1):
+    conditions = [condition] if condition is not None else []
+    items = sale_items(*conditions)
+    columns = [
+        *[sign * func.coalesce(func.sum(product_units(items, product)).filter(is_sale(items)), 0)
+          for product in PRODUCTS],
+        sign * func.count(),
+        sign * func.count().filter(is_sale(items))
+    ]
+    return select(sale_day, admin.SalesData.location, admin.SalesData.sales_rep, *columns) \
+        .outerjoin(items, joins_sale(items)) \
+        .where(*conditions) \
+        .group_by(sale_day, admin.SalesData.location, admin.SalesData.sales_rep)
+
+
+def _apply(db: Session, condition, sign: int):
+    stmt = insert(admin.SalesDailyRollup).from_select(
+        ['day', 'location', 'sales_rep', *VALUE_COLUMNS], _rollup_select(condition, sign)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'location', 'sales_rep'],
+        set_={column: getattr(admin.SalesDailyRollup, column) + stmt.excluded[column] for column in VALUE_COLUMNS}
+    )
+    db.execute(stmt)
+
+
+def add_sales(db: Session, condition):
+    """Add the sales_data rows matching `condition` to the rollup; call after syncing their line items."""
+    _apply(db, condition, 1)
+
+
+def remove_sales(db: Session, condition):
+    """Subtract the sales_data rows matching `condition` from the rollup; call before changing them or their line items."""
+    _apply(db, condition, -1)
+    db.execute(delete(admin.SalesDailyRollup).where(admin.SalesDailyRollup.transactions <= 0))
+
+
+def rebuild_daily_rollup(db: Session):
+    """Recompute the whole rollup from sales_data and sales_line_items."""
+    db.execute(delete(admin.SalesDailyRollup))
+    db.execute(insert(admin.SalesDailyRollup).from_select(
+        ['day', 'location', 'sales_rep', *VALUE_COLUMNS], _rollup_select()
+    ))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        rebuild_daily_rollup(session)
+        session.commit()
+        print(f"Rebuilt sales_daily_rollup: {session.query(admin.SalesDailyRollup).count()} rows")
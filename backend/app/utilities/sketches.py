@@ -0,0 +1,168 @@
+"""Maintenance of the sales_daily_sketches table: HyperLogLog sketches (see `hll`) of each UTC day's
+customers, locations and sales reps, for the whole day and per location and per sales rep.
+
+Write paths call `add_sales` for new rows and `refresh_sketches` for rows that changed or went
+away; `rebuild_sketches` recomputes the table:
+
+    python -m app.utilities.sketches    (from the backend directory)
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from . import hll, locks, workers
+from .analytics import SKETCH_COLUMNS, SKETCH_DIMENSIONS, is_sale, joins_sale, sale_day, sale_items
+
+# Rebuilds read this many days of sales_data at a time.
+REBUILD_DAYS = 31
+# Sketch rows per statement, keeping the bind parameters well under the protocol limit.
+BATCH_SIZE = 1000
+_LOCK_KEY = 0x48_4C_4C
+_EMPTY = hll.HyperLogLog().to_bytes()
+
+
+def lock_days(db: Session, days):
+    """Lock the sketches of the given UTC days until the transaction ends.
+
+    Lock every day first when a transaction goes on to call more than one of `add_sales` and
+    `refresh_days`, so its days are taken in one sorted pass.
+    """
+    locks.lock_keys(db, _LOCK_KEY, [day.toordinal() for day in days])
+
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, time(0), timezone.utc)
+    return and_(admin.SalesData.date >= start, admin.SalesData.date < start + timedelta(days=1))
+
+
+def _sketch(entries: np.ndarray) -> bytes:
+    sketch = hll.HyperLogLog()
+    sketch.add_entries(entries)
+    return sketch.to_bytes()
+
+
+def _build(db: Session, condition) -> dict[tuple, dict[str, bytes]]:
+    """Sketches of the sales_data rows matching `condition`, by (day, dimension, value)."""
+    sales = admin.SalesData
+    items = sale_items(condition)
+    rows = db.execute(select(sale_day, sales.location, sales.sales_rep, sales.customer_name, is_sale(items))
+                      .outerjoin(items, joins_sale(items)).where(condition)).all()
+    return workers.offload(db, _sketch_rows, rows)
+
+
+def _sketch_rows(rows: list) -> dict[tuple, dict[str, bytes]]:
+    df = pd.DataFrame(rows, columns=['day', 'location', 'sales_rep', 'customer_name', 'sale'])
+    if df.empty:
+        return {}
+    # Hash each distinct string once.
+    hashed = {}
+    for column in ('location', 'sales_rep', 'customer_name'):
+        codes, uniques = pd.factorize(df[column])
+        hashed[column] = hll.hash_values(list(uniques))[codes]
+
+    sketches = {}
+    for dimension in SKETCH_DIMENSIONS:
+        values = df[dimension] if dimension != 'all' else pd.Series('', index=df.index)
+        # Days without sales still get (empty) sales-only sketches.
+        for day, value in pd.DataFrame({'day': df['day'], 'value': values}).drop_duplicates().itertuples(index=False):
+            sketches[(day, dimension, value)] = dict.fromkeys(SKETCH_COLUMNS, _EMPTY)
+        for column, (sketched, sales_only) in SKETCH_COLUMNS.items():
+            frame = pd.DataFrame({'day': df['day'], 'value': values, 'entry': hashed[sketched]})
+            if sales_only:
+                frame = frame[df['sale']]
+            frame = frame.drop_duplicates().sort_values(['day', 'value'], kind='stable')
+            if frame.empty:
+                continue
+            days, keys, entries = frame['day'].to_numpy(), frame['value'].to_numpy(), frame['entry'].to_numpy()
+            starts = np.flatnonzero((days[1:] != days[:-1]) | (keys[1:] != keys[:-1])) + 1
+            for start, stop in zip(np.r_[0, starts], np.r_[starts, len(frame)]):
+                sketches[(days[start], dimension, keys[start])][column] = _sketch(entries[start:stop])
+    return sketches
+
+
+def _batches(keys: list) -> list[list]:
+    return [keys[i:i + BATCH_SIZE] for i in range(0, len(keys), BATCH_SIZE)]
+
+
+def _write(db: Session, sketches: dict[tuple, dict[str, bytes]]):
+    for batch in _batches(list(sketches)):
+        stmt = insert(admin.SalesDailySketch).values([
+            {'day': day, 'dimension': dimension, 'value': value, **sketches[(day, dimension, value)]}
+            for day, dimension, value in batch
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['day', 'dimension', 'value'],
+            set_={column: stmt.excluded[column] for column in SKETCH_COLUMNS}
+        ))
+
+
+def add_sales(db: Session, condition):
+    """Merge the sales_data rows matching `condition` into the sketches; call after inserting them."""
+    sketches = _build(db, condition)
+    if not sketches:
+        return
+    lock_days(db, {day for day, _, _ in sketches})
+    sketch = admin.SalesDailySketch
+    existing = []
+    for batch in _batches(list(sketches)):
+        existing += db.execute(select(sketch.day, sketch.dimension, sketch.value,
+                                      *[getattr(sketch, column) for column in SKETCH_COLUMNS])
+                               .where(tuple_(sketch.day, sketch.dimension, sketch.value).in_(batch))).all()
+    workers.offload(db, _merge_existing, sketches, existing)
+    _write(db, sketches)
+
+
+def _merge_existing(sketches: dict[tuple, dict[str, bytes]], existing: list):
+    for day, dimension, value, *previous in existing:
+        columns = sketches[(day, dimension, value)]
+        for column, old in zip(SKETCH_COLUMNS, previous):
+            columns[column] = hll.HyperLogLog.merge_all([old, columns[column]]).to_bytes()
+
+
+def sketch_days(db: Session, condition) -> set[date]:
+    """UTC days of the sales_data rows matching `condition`."""
+    return set(db.execute(select(sale_day).where(condition).distinct()).scalars())
+
+
+def refresh_days(db: Session, days):
+    """Recompute the sketches of the given UTC days from sales_data."""
+    days = sorted(set(days))
+    if not days:
+        return
+    lock_days(db, days)
+    db.execute(delete(admin.SalesDailySketch).where(admin.SalesDailySketch.day.in_(days)))
+    _write(db, _build(db, or_(*[_day_bounds(day) for day in days])))
+
+
+def refresh_sketches(db: Session, condition, previous_days: set[date] = frozenset()):
+    """Recompute the days of the rows matching `condition`, plus `previous_days`; call after the change."""
+    refresh_days(db, sketch_days(db, condition) | set(previous_days))
+
+
+def rebuild_sketches(db: Session):
+    """Recompute the whole table from sales_data, REBUILD_DAYS days at a time."""
+    locks.lock_all(db, _LOCK_KEY)
+    db.execute(delete(admin.SalesDailySketch))
+    first, last = db.execute(select(func.min(admin.SalesData.date), func.max(admin.SalesData.date))).one()
+    if first is None:
+        return
+    day, last_day = first.astimezone(timezone.utc).date(), last.astimezone(timezone.utc).date()
+    while day <= last_day:
+        start = datetime.combine(day, time(0), timezone.utc)
+        _write(db, _build(db, and_(admin.SalesData.date >= start,
+                                   admin.SalesData.date < start + timedelta(days=REBUILD_DAYS))))
+        day += timedelta(days=REBUILD_DAYS)
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        rebuild_sketches(session)
+        session.commit()
+        print(f"Rebuilt sales_daily_sketches: {session.query(admin.SalesDailySketch).count()} rows")
@@ -0,0 +1,242 @@
+"""Per-worker columnar snapshot of sales_data.
+
+The rows are held as NumPy arrays: product quantities, read from sales_line_items, as one
+float matrix (zero where a sale has no line item for the product), dates as UTC datetime64
+and the string columns dictionary-encoded (each distinct value stored once, rows hold int32
+codes). Filters become boolean masks over the arrays, so endpoints that used to
+re-read the table into a DataFrame per request work on memory that is already loaded.
+
+`refresh` appends rows above the id high-water mark. Ids are taken when a row is inserted
+but the row only shows once its transaction commits, so a lower id can appear after a higher
+one was loaded; the last SNAPSHOT_LOOKBACK_IDS ids below the mark are checked again for such
+rows. Updates and deletes can't be seen that way. Write paths call `invalidate()` to force a
+full reload, as does the live feed for other workers' updates and deletes (see live.py), and
+the snapshot is reloaded in full once it is older than SNAPSHOT_MAX_AGE_SECONDS.
+"""
+from datetime import timezone
+from threading import Lock
+from time import monotonic
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import admin
+from ..schemas import data
+from . import metrics
+from .analytics import PRODUCTS, joins_sale, location_values, product_units, sale_items
+from .config import settings
+
+_LOAD_BATCH_ROWS = 50000
+_TEXT_COLUMNS = ['location', 'customer_name', 'phone_no', 'sales_rep']
+
+
+class _Dictionary:
+    """Dictionary encoding of a string column; codes only ever grow, so old arrays stay valid."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, values) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+    def code(self, value) -> int | None:
+        return self._codes.get(value)
+
+    def decode(self, codes: np.ndarray) -> list:
+        values = self.values
+        return [values[code] for code in codes.tolist()]
+
+
+def _utc_bound(value: str) -> np.datetime64:
+    bound = pd.Timestamp(value)
+    bound = bound.tz_localize('UTC') if bound.tzinfo is None else bound.tz_convert('UTC')
+    return np.datetime64(bound.tz_localize(None), 'us')
+
+
+class SalesColumns:
+    """An immutable set of sales rows in columnar form, ordered by id."""
+
+    def __init__(self, dictionaries: dict, ids, dates, quantities, user_ids, **codes):
+        self.dictionaries = dictionaries
+        self.ids = ids
+        self.dates = dates
+        self.quantities = quantities
+        self.user_ids = user_ids
+        self.codes = codes
+
+    @classmethod
+    def empty(cls) -> 'SalesColumns':
+        return cls(
+            {column: _Dictionary() for column in _TEXT_COLUMNS},
+            ids=np.empty(0, dtype=np.int64),
+            dates=np.empty(0, dtype='datetime64[us]'),
+            quantities=np.empty((0, len(PRODUCTS)), dtype=np.float64),
+            user_ids=np.empty(0, dtype=np.float64),
+            **{column: np.empty(0, dtype=np.int32) for column in _TEXT_COLUMNS}
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def high_water(self) -> int:
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def _encode(self, rows: list) -> 'SalesColumns':
+        columns = list(zip(*rows))
+        text_start = 2
+        product_start = text_start + len(_TEXT_COLUMNS)
+        return SalesColumns(
+            self.dictionaries,
+            ids=np.array(columns[0], dtype=np.int64),
+            dates=pd.to_datetime(list(columns[1]), utc=True).tz_localize(None).to_numpy().astype('datetime64[us]'),
+            quantities=np.array(list(zip(*columns[product_start:product_start + len(PRODUCTS)])), dtype=np.float64),
+            user_ids=np.array(columns[-1], dtype=np.float64),
+            **{column: self.dictionaries[column].encode(columns[text_start + i])
+               for i, column in enumerate(_TEXT_COLUMNS)}
+        )
+
+    def extend(self, batches) -> 'SalesColumns':
+        """Return a copy with the row batches (id, date, text columns..., products..., user_id), in id order, added."""
+        parts = [self, *[self._encode(rows) for rows in batches if rows]]
+        if len(parts) == 1:
+            return self
+        extended = SalesColumns(
+            self.dictionaries,
+            ids=np.concatenate([part.ids for part in parts]),
+            dates=np.concatenate([part.dates for part in parts]),
+            quantities=np.concatenate([part.quantities for part in parts]),
+            user_ids=np.concatenate([part.user_ids for part in parts]),
+            **{column: np.concatenate([part.codes[column] for part in parts]) for column in _TEXT_COLUMNS}
+        )
+        # The new rows are in id order, so only ones committed late can come before the old ones.
+        if len(self) and parts[1].ids[0] < self.high_water:
+            extended = extended.take(np.argsort(extended.ids, kind='stable'))
+        return extended
+
+    def take(self, index) -> 'SalesColumns':
+        """Return the rows selected by a boolean mask or an index array."""
+        return SalesColumns(
+            self.dictionaries,
+            ids=self.ids[index],
+            dates=self.dates[index],
+            quantities=self.quantities[index],
+            user_ids=self.user_ids[index],
+            **{column: codes[index] for column, codes in self.codes.items()}
+        )
+
+    def mask(self, filters: data.DashboardFilters = None) -> np.ndarray:
+        """Evaluate dashboard filters as a boolean mask over the rows."""
+        mask = np.ones(len(self), dtype=bool)
+        if not filters:
+            return mask
+        if filters.start_date:
+            mask &= self.dates >= _utc_bound(filters.start_date)
+        if filters.end_date:
+            mask &= self.dates <= _utc_bound(filters.end_date)
+        for column in ('location', 'sales_rep', 'customer_name'):
+            value = getattr(filters, column)
+            if value:
+                values = location_values(value) if column == 'location' else [value]
+                codes = [code for code in map(self.dictionaries[column].code, values) if code is not None]
+                if not codes:
+                    return np.zeros(len(self), dtype=bool)
+                mask &= np.isin(self.codes[column], codes)
+        if filters.product:
+            if filters.product not in PRODUCTS:
+                return np.zeros(len(self), dtype=bool)
+            quantities = self.quantities[:, PRODUCTS.index(filters.product)]
+            mask &= (quantities != 0) & ~np.isnan(quantities)
+        return mask
+
+    def select(self, filters: data.DashboardFilters = None) -> 'SalesColumns':
+        return self.take(self.mask(filters))
+
+    def totals(self) -> np.ndarray:
+        """Total units per row; missing quantities count as zero."""
+        return np.nansum(self.quantities, axis=1)
+
+    def nunique(self, column: str) -> int:
+        return int(np.unique(self.codes[column]).size)
+
+    def records(self, limit: int | None = None) -> list[dict]:
+        """Materialize the first `limit` rows as dicts shaped like sales_data rows plus total_sales."""
+        rows = self.take(slice(0, limit))
+        quantities = rows.quantities.tolist()
+        text = {column: rows.dictionaries[column].decode(codes) for column, codes in rows.codes.items()}
+        records = []
+        for i, (row_id, date, user_id, total) in enumerate(zip(
+                rows.ids.tolist(), rows.dates.tolist(), rows.user_ids.tolist(), rows.totals().tolist())):
+            record = {"id": row_id, "date": date.replace(tzinfo=timezone.utc)}
+            record.update((column, text[column][i]) for column in ('location', 'customer_name', 'phone_no'))
+            record.update((product, None if quantity != quantity else quantity)
+                          for product, quantity in zip(PRODUCTS, quantities[i]))
+            record["sales_rep"] = text['sales_rep'][i]
+            record["user_id"] = None if user_id != user_id else int(user_id)
+            record["total_sales"] = total
+            records.append(record)
+        return records
+
+
+class SalesSnapshot:
+    """Holds the worker's current SalesColumns and keeps them in step with sales_data."""
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = Lock()
+        self._columns = None
+        self._loaded_at = 0.0
+        self._stale = True
+
+    def invalidate(self):
+        """Force a full reload on the next refresh; call after sales rows are updated or deleted."""
+        self._stale = True
+
+    def refresh(self, db: Session) -> SalesColumns:
+        """Bring the snapshot up to date and return it."""
+        with metrics.stage('snapshot'), self._lock:
+            if self._stale or self._columns is None or monotonic() - self._loaded_at > self.max_age:
+                # Cleared before loading, so an invalidation that lands mid-load triggers another.
+                self._stale = False
+                self._loaded_at = monotonic()
+                try:
+                    self._columns = self._load(db, SalesColumns.empty())
+                except Exception:
+                    self._stale = True
+                    raise
+            else:
+                self._columns = self._load(db, self._columns)
+            return self._columns
+
+    @staticmethod
+    def _load(db: Session, columns: SalesColumns) -> SalesColumns:
+        sales = admin.SalesData
+        condition = sales.id > columns.high_water
+        if len(columns):
+            floor = columns.high_water - settings.SNAPSHOT_LOOKBACK_IDS
+            recent = np.fromiter(db.execute(select(sales.id).where(sales.id > floor, sales.id <= columns.high_water))
+                                 .scalars(), dtype=np.int64)
+            late = np.setdiff1d(recent, columns.ids[columns.ids > floor])
+            if len(late):
+                condition |= sales.id.in_(late.tolist())
+        items = sale_items(condition)
+        query = select(sales.id, sales.date, *[getattr(sales, column) for column in _TEXT_COLUMNS],
+                       *[product_units(items, product) for product in PRODUCTS], sales.user_id) \
+            .outerjoin(items, joins_sale(items)) \
+            .where(condition) \
+            .order_by(sales.id) \
+            .execution_options(yield_per=_LOAD_BATCH_ROWS)
+        return columns.extend(db.execute(query).partitions())
+
+
+sales_snapshot = SalesSnapshot(max_age=settings.SNAPSHOT_MAX_AGE_SECONDS)
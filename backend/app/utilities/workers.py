@@ -0,0 +1,45 @@
+"""Offloading of CPU-bound work from async routes.
+
+Parsing uploads and pandas transforms hold the GIL for long stretches; running them on the
+event loop would stall every other request on the worker, logins included. They run on
+worker threads instead, behind their own limiter so they can't exhaust the thread pool that
+FastAPI uses for sync routes and dependencies.
+
+Code that async routes hand to `AsyncSession.run_sync` runs on the event loop too. It calls
+`offload` for its CPU-bound steps, which awaits them on a worker thread through the session's
+greenlet and runs them inline for sync sessions.
+"""
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+import anyio
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from .config import settings
+
+T = TypeVar('T')
+
+cpu_limiter = anyio.CapacityLimiter(settings.CPU_WORKER_THREADS)
+_EXHAUSTED = object()
+
+
+async def run_cpu_bound(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run `func(*args, **kwargs)` on a worker thread and await its result."""
+    return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=cpu_limiter)
+
+
+def offload(db: Session, func: Callable[..., T], *args, **kwargs) -> T:
+    """Run `func(*args, **kwargs)` on a worker thread if `db` belongs to an AsyncSession, inline otherwise."""
+    if db.get_bind().dialect.is_async:
+        return await_only(run_cpu_bound(func, *args, **kwargs))
+    return func(*args, **kwargs)
+
+
+async def iterate_cpu_bound(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Advance a blocking iterator on worker threads, yielding its items to the event loop."""
+    while True:
+        item = await run_cpu_bound(next, iterator, _EXHAUSTED)
+        if item is _EXHAUSTED:
+            return
+        yield item
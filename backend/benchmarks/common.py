@@ -0,0 +1,81 @@
+"""Helpers shared by the benchmarks: timing, row-count parsing and the JSON results file."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_rows(value: str) -> int:
+    """Parse a row count such as '10k', '1m' or '250000'."""
+    value = value.strip().lower()
+    if value[-1:] in _SUFFIXES:
+        return int(float(value[:-1]) * _SUFFIXES[value[-1]])
+    return int(value)
+
+
+def summarize(timings: list[float]) -> dict:
+    """Latency summary in milliseconds of a list of durations in seconds."""
+    timings = sorted(timing * 1000 for timing in timings)
+    summary = {"runs": len(timings), "median_ms": round(statistics.median(timings), 3), "best_ms": round(timings[0], 3)}
+    if len(timings) >= 20:
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        summary["p95_ms"] = round(percentiles[94], 3)
+        summary["p99_ms"] = round(percentiles[98], 3)
+    return summary
+
+
+def timed(func, repeat: int) -> dict:
+    """Summary of the wall time of `func()` over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+async def timed_async(func, repeat: int) -> dict:
+    """Like `timed`, for a `func` returning an awaitable."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(benchmark: str, params: dict, results: dict, output: str | None = None) -> str:
+    """Write a results file stamped with the commit, and return its path.
+
+    Without `output` the file goes to benchmarks/results/<benchmark>-<commit>.json, so runs
+    on two commits can be compared with `python -m benchmarks.compare`.
+    """
+    commit = git_commit()
+    report = {
+        "benchmark": benchmark,
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{commit or 'unknown'}.json")
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    return output
@@ -0,0 +1,52 @@
+"""Compare two benchmark results files, e.g. from two commits.
+
+    python -m benchmarks.compare benchmarks/results/micro-abc123.json benchmarks/results/micro-def456.json
+
+Prints the median time of every measurement in both files and the ratio between them, and
+exits with status 1 if any got slower than --threshold times the baseline.
+"""
+import argparse
+import json
+import sys
+
+
+def _medians(results: dict, prefix: str = "") -> dict:
+    """Median times keyed by dotted measurement name, from any depth of the results."""
+    medians = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            if "median_ms" in value:
+                medians[prefix + name] = value["median_ms"]
+            else:
+                medians.update(_medians(value, f"{prefix}{name}."))
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio counted as a regression")
+    args = parser.parse_args()
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    print(f"{baseline['benchmark']}: {baseline['commit']} -> {current['commit']}")
+    before, after = _medians(baseline["results"]), _medians(current["results"])
+    regressions = 0
+    for name in sorted(before.keys() & after.keys()):
+        ratio = after[name] / before[name] if before[name] else float('inf')
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:55} {before[name]:>10.2f} {after[name]:>10.2f} ms  x{ratio:.2f}{flag}")
+    for name in sorted(before.keys() ^ after.keys()):
+        print(f"{name:55} only in {'baseline' if name in before else 'current'}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Deterministic synthetic sales data for benchmarks.
+
+The same --rows and --seed always produce the same rows. Cardinalities follow the shape of
+the real data: a few dozen locations, each served by one to three reps, and a customer base
+that grows with the row count (one customer per ~40 transactions, capped at 250k), with a
+long tail of occasional buyers. Most customers buy at one home location. Transactions have
+strictly increasing timestamps over two years, which also keeps the
+(date, customer_name, location) key unique.
+
+    python -m benchmarks.datagen db --rows 1m [--replace]
+    python -m benchmarks.datagen file --rows 10k --output sales-10k.xlsx
+    python -m benchmarks.datagen file --rows 10m --output sales-10m.csv
+
+`db` loads sales_data with COPY and rebuilds the tables derived from it; point it at a scratch database.
+"""
+import argparse
+import io
+from datetime import datetime, timezone
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from app.utilities.analytics import PRODUCTS
+from .common import parse_rows
+
+FILE_COLUMNS = ['date', 'location', 'sales_rep', 'customer_name', 'phone_no', *PRODUCTS]
+LOCATIONS = [
+    'Ikeja', 'Lekki', 'Yaba', 'Surulere', 'Ajah', 'Ikoyi', 'Victoria Island', 'Apapa', 'Oshodi', 'Maryland',
+    'Gbagada', 'Ogba', 'Festac', 'Ikorodu', 'Magodo', 'Ojota', 'Agege', 'Mushin', 'Badagry', 'Epe',
+    'Abuja Central', 'Wuse', 'Garki', 'Maitama', 'Ibadan', 'Abeokuta', 'Port Harcourt', 'Enugu', 'Benin', '-'
+]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+CHUNK_ROWS = 100_000
+EXCEL_MAX_ROWS = 1_048_575
+
+
+class _Population:
+    """Locations, reps and customers shared by every chunk of one generated dataset."""
+
+    def __init__(self, rows: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.locations = np.array(LOCATIONS)
+        # Location i is served by reps[rep_offset[i]:rep_offset[i] + rep_count[i]].
+        self.rep_count = rng.integers(1, 4, size=len(LOCATIONS))
+        self.rep_offset = np.concatenate([[0], np.cumsum(self.rep_count)[:-1]])
+        self.reps = np.array([f'Rep {i:03d}' for i in range(self.rep_count.sum())])
+
+        customers = min(max(rows // 40, 50), 250_000)
+        self.customers = np.array([f'Customer {i:06d}' for i in range(customers)])
+        self.phones = np.array([f'080{number:08d}' for number in rng.integers(0, 10 ** 8, size=customers)])
+        self.home_location = rng.integers(0, len(LOCATIONS), size=customers)
+        # Zipf-like popularity: a few regulars and a long tail of occasional buyers.
+        weights = 1 / np.arange(1, customers + 1) ** 0.8
+        self.customer_weights = weights / weights.sum()
+
+
+def iter_sales_chunks(rows: int, seed: int = 42, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the dataset as DataFrames of at most `chunk_rows` rows, oldest first."""
+    population = _Population(rows, seed)
+    step = SPAN_SECONDS / rows
+    for chunk_index, start in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, chunk_index])
+        size = min(chunk_rows, rows - start)
+        index = np.arange(start, start + size)
+
+        # Row i falls somewhere in [i * step, (i + 1) * step): strictly increasing and unique.
+        offsets_us = ((index + rng.random(size) * 0.999) * step * 1e6).astype(np.int64)
+        dates = pd.to_datetime(offsets_us, unit='us', utc=True) + (START - datetime(1970, 1, 1, tzinfo=timezone.utc))
+
+        customers = rng.choice(len(population.customers), size=size, p=population.customer_weights)
+        away = rng.random(size) < 0.2
+        locations = np.where(away, rng.integers(0, len(LOCATIONS), size=size), population.home_location[customers])
+        reps = population.rep_offset[locations] + rng.integers(0, 3, size=size) % population.rep_count[locations]
+
+        # Each transaction buys one to three products in half units; ~5% are zero-unit visits.
+        quantities = rng.integers(1, 21, size=(size, len(PRODUCTS))) / 2
+        bought = rng.random((size, len(PRODUCTS))) < rng.choice([0.25, 0.45, 0.65], size=(size, 1))
+        empty = np.flatnonzero(~bought.any(axis=1))
+        bought[empty, rng.integers(0, len(PRODUCTS), size=len(empty))] = True
+        quantities = np.where(bought, quantities, 0.0)
+        quantities[rng.random(size) < 0.05] = 0.0
+        quantities[rng.random((size, len(PRODUCTS))) < 0.01] = np.nan
+
+        chunk = pd.DataFrame({
+            'date': dates,
+            'location': population.locations[locations],
+            'sales_rep': population.reps[reps],
+            'customer_name': population.customers[customers],
+            'phone_no': population.phones[customers]
+        })
+        for i, product in enumerate(PRODUCTS):
+            chunk[product] = quantities[:, i]
+        yield chunk
+
+
+def write_upload_file(path: str, rows: int, seed: int = 42):
+    """Write an upload file (.csv or .xlsx, by extension) in the layout upload_sales_data expects."""
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as file:
+            for i, chunk in enumerate(iter_sales_chunks(rows, seed)):
+                chunk[FILE_COLUMNS].to_csv(file, index=False, header=i == 0, date_format='%Y-%m-%d %H:%M:%S')
+    elif path.endswith('.xlsx'):
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"An Excel sheet holds at most {EXCEL_MAX_ROWS} rows; write a .csv instead")
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(FILE_COLUMNS)
+        for chunk in iter_sales_chunks(rows, seed):
+            chunk = chunk[FILE_COLUMNS].astype(object).where(chunk[FILE_COLUMNS].notna(), None)
+            chunk['date'] = chunk['date'].map(lambda value: value.tz_localize(None).to_pydatetime())
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.append(row)
+        workbook.save(path)
+    else:
+        raise ValueError("Upload files are written as .csv or .xlsx")
+
+
+def load_database(rows: int, seed: int = 42, replace: bool = False) -> int:
+    """COPY the dataset into sales_data and rebuild the derived tables; returns the row count."""
+    from sqlalchemy import func, select, text
+
+    from app.models import admin
+    from app.utilities.database import SessionLocal
+    from app.utilities.customers import rebuild_customers
+    from app.utilities.line_items import rebuild_line_items
+    from app.utilities.partitions import ensure_partitions
+    from app.utilities.rollup import rebuild_daily_rollup
+    from app.utilities.sketches import rebuild_sketches
+
+    columns = ['date', 'location', 'customer_name', 'phone_no', *PRODUCTS, 'sales_rep']
+    with SessionLocal() as db:
+        if db.execute(select(func.count()).select_from(admin.SalesData)).scalar_one():
+            if not replace:
+                raise SystemExit("sales_data is not empty; pass --replace to truncate it first")
+            db.execute(text("TRUNCATE sales_data, sales_line_items, sales_daily_rollup, sales_daily_sketches, customers RESTART IDENTITY"))
+        cursor = db.connection().connection.cursor()
+        for chunk in iter_sales_chunks(rows, seed):
+            ensure_partitions(db, chunk['date'].min().to_pydatetime(), chunk['date'].max().to_pydatetime())
+            buffer = io.StringIO()
+            # Unquoted empty fields load as NULL; the generated strings are never empty.
+            chunk[columns].to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f+00')
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY sales_data ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        rebuild_line_items(db)
+        rebuild_daily_rollup(db)
+        rebuild_customers(db)
+        rebuild_sketches(db)
+        db.execute(text("ANALYZE sales_data, sales_line_items, customers"))
+        db.commit()
+        return db.execute(select(func.count()).select_from(admin.SalesData)).scalar_one()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    db_command = commands.add_parser('db', help="load the rows into sales_data")
+    db_command.add_argument('--replace', action='store_true', help="truncate sales_data first")
+    file_command = commands.add_parser('file', help="write an upload file")
+    file_command.add_argument('--output', required=True, help="path ending in .csv or .xlsx")
+    for command in (db_command, file_command):
+        command.add_argument('--rows', type=parse_rows, default='10k', help="e.g. 10k, 1m, 10m")
+        command.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.command == 'db':
+        print(f"Loaded {load_database(args.rows, args.seed, args.replace)} rows into sales_data")
+    else:
+        write_upload_file(args.output, args.rows, args.seed)
+        print(f"Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""HTTP load driver for the API.
+
+Runs --concurrency clients for --duration seconds, each sending requests drawn from a
+weighted mix of dashboard endpoints plus /users/me, a cheap authenticated request that
+shows whether slow reports hold up light traffic. Targets a running server, or the app
+in-process with --in-process. The server needs a Postgres database with data loaded by
+benchmarks.datagen; the queries use Postgres features (GROUPING SETS, FILTER, ON CONFLICT,
+asyncpg), so SQLite can't stand in for it. Run from the backend directory:
+
+    uvicorn app.main:app --workers 4 &
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+
+--vary-filters gives each analytics request a random date range so it misses the result
+cache. Tokens are minted with the local SECRET_KEY for --user-id, which must exist.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from app.utilities import oauth2
+from .common import summarize, write_results
+
+SCENARIO = {
+    '/sales/overview': 3,
+    '/sales/daily': 3,
+    '/sales/performances': 2,
+    '/sales/locations': 2,
+    '/sales/dashboard': 3,
+    '/sales/?limit=100': 2,
+    '/sales/customers/search?q=cust': 1,
+    '/users/me': 4
+}
+ANALYTICS = {'/sales/overview', '/sales/daily', '/sales/performances', '/sales/locations', '/sales/dashboard'}
+
+
+def _random_range(rng: random.Random, first: date, last: date) -> dict:
+    start = first + timedelta(days=rng.randrange(max((last - first).days, 1)))
+    return {"start_date": start.isoformat(), "end_date": (start + timedelta(days=rng.randrange(7, 120))).isoformat()}
+
+
+async def _client_loop(client: httpx.AsyncClient, deadline: float, seed: int, vary_filters: bool, samples: dict):
+    rng = random.Random(seed)
+    paths, weights = list(SCENARIO), list(SCENARIO.values())
+    while time.perf_counter() < deadline:
+        path = rng.choices(paths, weights)[0]
+        params = _random_range(rng, date(2024, 1, 1), date(2025, 12, 31)) if vary_filters and path in ANALYTICS else None
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        elapsed = time.perf_counter() - start
+        timings, errors = samples.setdefault(path, ([], [0]))
+        timings.append(elapsed)
+        errors[0] += failed
+
+
+async def run(url: str | None, concurrency: int, duration: float, user_id: int, vary_filters: bool) -> dict:
+    headers = {"Authorization": f"Bearer {oauth2.create_access_token({'user_id': user_id})}",
+               "Accept-Encoding": "br, gzip"}
+    if url:
+        transport, base_url = None, url
+    else:
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://benchmark"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    samples = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, headers=headers, limits=limits,
+                                 timeout=120) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[_client_loop(client, deadline, seed, vary_filters, samples) for seed in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    for path, (timings, errors) in sorted(samples.items()):
+        results[path] = {**summarize(timings), "errors": errors[0], "requests_per_second": round(len(timings) / elapsed, 2)}
+    all_timings = [timing for timings, _ in samples.values() for timing in timings]
+    results["total"] = {**summarize(all_timings), "errors": sum(errors[0] for _, errors in samples.values()),
+                        "requests_per_second": round(len(all_timings) / elapsed, 2)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--in-process", action="store_true", help="drive the app in-process instead of over HTTP")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--vary-filters", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    if not args.url and not args.in_process:
+        parser.error("pass --url or --in-process")
+
+    results = asyncio.run(run(args.url, args.concurrency, args.duration, args.user_id, args.vary_filters))
+    for path, summary in results.items():
+        print(f"{path:35} {summary['requests_per_second']:>9.1f} req/s  p50 {summary['median_ms']:>9.2f} ms  "
+              f"p99 {summary.get('p99_ms', float('nan')):>9.2f} ms  errors {summary['errors']}")
+    params = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"Results written to {write_results('load', params, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
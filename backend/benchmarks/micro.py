@@ -0,0 +1,145 @@
+"""Microbenchmarks of the sales router functions.
+
+Each route function is called directly (no HTTP) against the configured database, and the
+results are written to a JSON file stamped with the commit. Analytics routes are timed cold
+(result cache cleared before each call) and warm. The columnar snapshot, which replaced
+get_sales_data_df for the customer and location routes, is timed on a full reload and an
+incremental refresh. Load a dataset with benchmarks.datagen first; run from the backend
+directory:
+
+    python -m benchmarks.micro [--repeat 10] [--include-upload] [--output results.json]
+
+--include-upload also times upload_sales_data on a generated 10k-row CSV, which writes to
+sales_data.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from datetime import timedelta
+
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from app.models import admin
+from app.routers import dashboard
+from app.schemas import data
+from app.utilities.cache import analytics_cache
+from app.utilities.database import AsyncSessionLocal, SessionLocal
+from app.utilities.snapshot import sales_snapshot
+from .common import timed, timed_async, write_results
+from .datagen import write_upload_file
+
+
+def _most_common(db, column):
+    return db.execute(select(column).group_by(column).order_by(func.count().desc()).limit(1)).scalar_one()
+
+
+def _sample_filters(db) -> dict:
+    """Filters typical of the dashboard, picked from the loaded data."""
+    last = db.execute(select(func.max(admin.SalesData.date))).scalar_one()
+    return {
+        "all": data.DashboardFilters(),
+        "last_30_days": data.DashboardFilters(start_date=(last - timedelta(days=30)).isoformat(), end_date=last.isoformat()),
+        "location": data.DashboardFilters(location=_most_common(db, admin.SalesData.location)),
+        "sales_rep": data.DashboardFilters(sales_rep=_most_common(db, admin.SalesData.sales_rep))
+    }
+
+
+async def _drain(response):
+    async for _ in response.body_iterator:
+        pass
+
+
+async def run(repeat: int, include_upload: bool) -> tuple[dict, dict]:
+    results = {}
+    with SessionLocal() as db:
+        async with AsyncSessionLocal() as adb:
+            rows = db.execute(select(func.count()).select_from(admin.SalesData)).scalar_one()
+            filters = _sample_filters(db)
+            location = filters["location"].location
+            customer = _most_common(db, admin.SalesData.customer_name)
+
+            def full_reload():
+                sales_snapshot.invalidate()
+                sales_snapshot.refresh(db)
+
+            results["snapshot.full_reload"] = timed(full_reload, repeat)
+            results["snapshot.incremental_refresh"] = timed(lambda: sales_snapshot.refresh(db), repeat)
+            results["snapshot.select_location"] = timed(lambda: sales_snapshot.refresh(db).select(filters["location"]), repeat)
+
+            # Called directly, the routes get no ETag dependency: pass empty caching headers.
+            routes = {
+                "get_dashboard_overview": lambda f: dashboard.get_dashboard_overview(filters=f, db=adb, cache_headers={}),
+                "get_dashboard_overview_exact": lambda f: dashboard.get_dashboard_overview(filters=f, exact=True, db=adb, cache_headers={}),
+                "get_daily_sales": lambda f: dashboard.get_daily_sales(filters=f, db=adb, current_user=None, cache_headers={}),
+                "get_rep_performance": lambda f: dashboard.get_rep_performance(filters=f, db=adb, current_user=None, cache_headers={}),
+                "get_rep_performance_exact": lambda f: dashboard.get_rep_performance(
+                    filters=f, exact=True, db=adb, current_user=None, cache_headers={}),
+                "get_location_performance": lambda f: dashboard.get_location_performance(
+                    filters=f, db=adb, current_user=None, limit=10, cache_headers={}),
+                "get_dashboard": lambda f: dashboard.get_dashboard(
+                    filters=f, db=adb, current_user=None, sections=None, limit=10, cache_headers={})
+            }
+            for name, route in routes.items():
+                for label, route_filters in filters.items():
+                    async def cold():
+                        analytics_cache.invalidate()
+                        await route(route_filters)
+
+                    results[f"{name}.{label}.cold"] = await timed_async(cold, repeat)
+                results[f"{name}.all.warm"] = await timed_async(lambda: route(filters["all"]), repeat)
+
+            results["get_all_sales.first_page"] = timed(
+                lambda: dashboard.get_all_sales(db=db, current_user=None, skip=0, limit=1000, cursor=None), repeat)
+            deep = max(rows - 1000, 0)
+            results["get_all_sales.offset_last_page"] = timed(
+                lambda: dashboard.get_all_sales(db=db, current_user=None, skip=deep, limit=1000, cursor=None), repeat)
+            results["search_customers"] = timed(
+                lambda: dashboard.search_customers(q=customer[:-2], limit=10, db=db, current_user=None), repeat)
+            results["get_customer"] = timed(lambda: dashboard.get_customer(name=customer, db=db, current_user=None), repeat)
+            results["get_single_location_performance"] = timed(
+                lambda: dashboard.get_single_location_performance(location_name=location, db=db, limit=10, current_user=None),
+                repeat)
+            for file_format in ('csv', 'ndjson', 'parquet'):
+                async def export():
+                    await _drain(await dashboard.export_sales(
+                        filters=filters["last_30_days"], file_format=file_format, db=adb, current_user=None))
+
+                results[f"export_sales.last_30_days.{file_format}"] = await timed_async(export, max(1, repeat // 2))
+
+            if include_upload:
+                results.update(await _upload(adb))
+    return results, {"rows": rows, "repeat": repeat}
+
+
+async def _upload(adb) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'upload.csv')
+        # A seed of its own, so the first upload inserts and the second finds every row unchanged.
+        write_upload_file(path, 10_000, seed=7)
+        for label in ('insert', 'unchanged'):
+            async def upload():
+                with open(path, 'rb') as file:
+                    await dashboard.upload_sales_data(db=adb, file=UploadFile(file, filename='upload.csv'),
+                                                      current_user=None)
+
+            results[f"upload_sales_data.csv_10k.{label}"] = await timed_async(upload, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--include-upload", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    results, params = asyncio.run(run(args.repeat, args.include_upload))
+    for name, summary in results.items():
+        print(f"{name:55} {summary['median_ms']:>10.2f} ms")
+    print(f"Results written to {write_results('micro', params, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
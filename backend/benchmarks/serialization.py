@@ -0,0 +1,80 @@
+"""Serialization cost and response size of /sales/ and /sales/daily.
+
+Times the default FastAPI path (ORM objects validated as SaleRecord, jsonable_encoder,
+json.dumps) against the orjson path the routes use now, the /sales/ query included, and
+reports the body size uncompressed, gzipped and brotli-compressed. Needs a database with
+sales data; run from the backend directory:
+
+    python -m benchmarks.serialization [--rows 1000] [--repeat 20] [--output results.json]
+"""
+import argparse
+import gzip
+import json
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+
+from app.models import admin
+from app.routers.dashboard import SALE_RECORD_COLUMNS
+from app.schemas import data
+from app.utilities import analytics, responses
+from app.utilities.database import SessionLocal
+from .common import timed, write_results
+
+
+def default_render(content) -> bytes:
+    # What fastapi.responses.JSONResponse does after jsonable_encoder.
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def orjson_render(content) -> bytes:
+    return responses.ORJSONResponse(content).body
+
+
+def sizes(body: bytes) -> dict:
+    return {
+        "identity": len(body),
+        "gzip": len(gzip.compress(body, compresslevel=6)),
+        "br": len(brotli.compress(body, quality=5, mode=brotli.MODE_TEXT))
+    }
+
+
+def compare(default, fast, repeat: int) -> dict:
+    default_body, fast_body = default(), fast()
+    result = {"default": timed(default, repeat), "orjson": timed(fast, repeat), "bytes": sizes(fast_body),
+              "same_json": json.loads(default_body) == json.loads(fast_body)}
+    result["speedup"] = round(result["default"]["median_ms"] / result["orjson"]["median_ms"], 2)
+    return result
+
+
+def run(rows: int, repeat: int) -> dict:
+    with SessionLocal() as db:
+        order = (admin.SalesData.date.desc(), admin.SalesData.id.desc())
+        sales = compare(
+            lambda: default_render([data.SaleRecord.model_validate(sale) for sale in
+                                    db.query(admin.SalesData).order_by(*order).limit(rows).all()]),
+            lambda: orjson_render(responses.records(SALE_RECORD_COLUMNS, db.query(
+                *[getattr(admin.SalesData, column) for column in SALE_RECORD_COLUMNS]).order_by(*order).limit(rows).all())),
+            repeat
+        )
+        daily_sales = analytics.daily_sales(db, data.DashboardFilters())
+        daily = {"daily_sales": daily_sales, "total_days": len(daily_sales)}
+        daily = compare(lambda: default_render(daily), lambda: orjson_render(daily), repeat)
+    return {"/sales/": {"rows": rows, **sales}, "/sales/daily": {"days": len(daily_sales), **daily}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    results = run(args.rows, args.repeat)
+    print(json.dumps(results, indent=2))
+    params = {"rows": args.rows, "repeat": args.repeat}
+    print(f"Results written to {write_results('serialization', params, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Fixtures for the tests that need Postgres.
+
+They use the database the app is configured with (PG_* in the environment or backend/.env),
+migrated to head, and are skipped when it can't be reached. Changes are rolled back.
+"""
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture(scope='session')
+def engine():
+    try:
+        from app.utilities import database
+    except ValidationError as e:
+        pytest.skip(f"Database settings are not configured: {e}")
+    try:
+        with database.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    except OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    return database.engine
+
+
+@pytest.fixture
+def db(engine):
+    """A session whose transaction is rolled back after the test, commits included."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode='create_savepoint')
+        try:
+            yield session
+        finally:
+            session.close()
+            transaction.rollback()
+
+
+def _drop_partition(engine, name: str):
+    with engine.begin() as connection:
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            connection.execute(text(f"ALTER TABLE sales_data DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+
+
+@pytest.fixture
+def new_partition(engine):
+    """Drops a month's partition, if any, for the test to create anew, and drops it again after.
+
+    Partitions are committed on a connection of their own, so they outlive the test's
+    transaction; rows rolled back in a kept one would bloat it. Request this before `db`.
+    """
+    from app.utilities import partitions
+    names = []
+
+    def drop(month) -> str:
+        name = partitions.partition_name(partitions.month_start(month))
+        _drop_partition(engine, name)
+        names.append(name)
+        return name
+
+    yield drop
+    for name in names:
+        _drop_partition(engine, name)
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+try:
+    from app.models import admin
+    from app.schemas import data
+    from app.utilities import batch, live, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2025, 5, 1, 9, tzinfo=timezone.utc)
+
+
+def test_updates_onto_a_taken_key_are_conflicts(db):
+    partitions.ensure_partitions(db, DATE, DATE)
+    sales = admin.SalesData
+    ids = db.execute(insert(sales).returning(sales.id, sort_by_parameter_order=True), [
+        {"date": DATE, "location": 'Batch test', "customer_name": f'Batch test {n}', "sales_rep": 'Batch test'}
+        for n in range(5)
+    ]).scalars().all()
+    result = batch.apply_batch(db, data.SalesBatch(
+        creates=[{"date": DATE.isoformat(), "location": 'Batch test', "customer_name": 'Batch test new',
+                  "sales_rep": 'Batch test'}],
+        updates=[
+            {"id": ids[0], "customer_name": 'Batch test 1'},  # held by a row in the table
+            {"id": ids[1], "mango": 2},
+            {"id": ids[2], "customer_name": 'Batch test moved'},
+            {"id": ids[3], "customer_name": 'Batch test moved'},  # taken by the update before
+            {"id": ids[4], "date": DATE.replace(tzinfo=None).isoformat(), "customer_name": 'Batch test new'},  # by the create
+            {"id": ids[0], "mango": 1},
+        ],
+    ), live.Changes())
+
+    assert [update["status"] for update in result["results"]["updates"]] == \
+        ['conflict', 'updated', 'updated', 'conflict', 'conflict', 'conflict']
+    assert (result["created"], result["updated"], result["failed"]) == (1, 2, 4)
+    names = dict(db.execute(select(sales.id, sales.customer_name).where(sales.id.in_(ids))).tuples().all())
+    assert [names[sale_id] for sale_id in ids] == \
+        ['Batch test 0', 'Batch test 1', 'Batch test moved', 'Batch test 3', 'Batch test 4']
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+try:
+    from app.schemas import data
+    from app.utilities.cache import AnalyticsCache
+except ValidationError as e:
+    pytest.skip(f"Settings are not configured: {e}", allow_module_level=True)
+
+
+def test_key_drops_empty_filters():
+    assert AnalyticsCache.key('overview', data.DashboardFilters(location='Ikeja', sales_rep=''), exact=True) == \
+        AnalyticsCache.key('overview', data.DashboardFilters(location='Ikeja'), exact=True)
+    assert AnalyticsCache.key('overview', data.DashboardFilters(location='Ikeja')) != \
+        AnalyticsCache.key('overview', data.DashboardFilters(location='Yaba'))
+
+
+def test_results_are_cached_until_invalidated():
+    cache = AnalyticsCache(maxsize=10, ttl=60)
+    results = iter(range(10))
+    assert cache.get_or_compute('key', lambda: next(results)) == 0
+    assert cache.get_or_compute('key', lambda: next(results)) == 0
+    cache.invalidate()
+    assert cache.get_or_compute('key', lambda: next(results)) == 1
+    assert (cache.hits, cache.misses, cache.invalidations) == (1, 2, 1)
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = AnalyticsCache(maxsize=10, ttl=60)
+
+    def compute_while_writing():
+        # A write commits while the result is computed from the rows before it.
+        cache.invalidate()
+        return 'stale'
+
+    assert cache.get_or_compute('key', compute_while_writing) == 'stale'
+    assert cache.get_or_compute('key', lambda: 'fresh') == 'fresh'
+    assert cache.get_or_compute('key', lambda: 'again') == 'fresh'
+
+
+def test_async_result_computed_across_an_invalidation_is_not_stored():
+    cache = AnalyticsCache(maxsize=10, ttl=60)
+
+    async def compute_while_writing():
+        cache.invalidate()
+        return 'stale'
+
+    async def compute_fresh():
+        return 'fresh'
+
+    async def run():
+        return [await cache.get_or_compute_async('key', compute) for compute in (compute_while_writing, compute_fresh)]
+
+    assert asyncio.run(run()) == ['stale', 'fresh']
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,58 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.utilities.compression import CompressionMiddleware, accepted_encodings
+
+BODY = 'sales ' * 500
+
+
+async def _stream(request):
+    async def events():
+        yield f'data: {BODY}\n\n'
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
+app = Starlette(routes=[
+    Route('/large', lambda request: PlainTextResponse(BODY)),
+    Route('/small', lambda request: PlainTextResponse('sales')),
+    Route('/encoded', lambda request: Response(BODY.encode(), headers={"Content-Encoding": "identity"})),
+    Route('/stream', _stream),
+])
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+client = TestClient(app)
+
+
+@pytest.mark.parametrize('header, encodings', [
+    ('gzip, deflate, br', {'gzip', 'deflate', 'br'}),
+    ('GZIP;q=0.5, br;q=0', {'gzip'}),
+    ('br;q=0.0, gzip;q=bad', set()),
+    ('', set()),
+])
+def test_accepted_encodings(header, encodings):
+    assert accepted_encodings(header) == encodings
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip, br', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('identity', None),
+    ('', None),
+])
+def test_negotiation(accept, encoding):
+    response = client.get('/large', headers={"Accept-Encoding": accept})
+    assert response.headers.get('content-encoding') == encoding
+    assert response.text == BODY
+    if encoding:
+        assert int(response.headers['content-length']) < len(BODY)
+        assert 'accept-encoding' in response.headers['vary'].lower()
+
+
+@pytest.mark.parametrize('path', ['/small', '/encoded', '/stream'])
+def test_left_as_is(path):
+    response = client.get(path, headers={"Accept-Encoding": 'br, gzip'})
+    assert response.headers.get('content-encoding') in (None, 'identity')
+    assert BODY in response.text or response.text == 'sales'
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+try:
+    from app.models import admin
+    from app.routers import dashboard
+    from app.schemas import data
+    from app.utilities import analytics, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2025, 5, 2, 9, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def sale_ids(db):
+    partitions.ensure_partitions(db, DATE, DATE)
+    sales = admin.SalesData
+    ids = db.execute(insert(sales).returning(sales.id, sort_by_parameter_order=True), [
+        {"date": DATE, "location": 'CRUD test', "customer_name": f'CRUD test {n}', "sales_rep": 'CRUD test'}
+        for n in range(2)
+    ]).scalars().all()
+    # Kept when the route rolls back; the test's transaction still undoes them.
+    db.commit()
+    return ids
+
+
+def test_create_onto_a_taken_key_is_a_conflict(db, sale_ids):
+    entry = data.SalesCreate(date=DATE, location='CRUD test', customer_name='CRUD test 0', sales_rep='CRUD test')
+    with pytest.raises(HTTPException) as raised:
+        dashboard.create_new_entry(db=db, entry=entry, current_user=None)
+    assert raised.value.status_code == 409
+
+
+def test_update_onto_a_taken_key_is_a_conflict(db, sale_ids):
+    with pytest.raises(HTTPException) as raised:
+        dashboard.update_entry(sale_ids[1], db=db, entry=data.SalesUpdate(customer_name='CRUD test 0'), current_user=None)
+    assert raised.value.status_code == 409
+
+    updated = dashboard.update_entry(sale_ids[1], db=db, entry=data.SalesUpdate(customer_name='CRUD test 2'), current_user=None)
+    assert updated["customer_name"] == 'CRUD test 2'
+
+
+def test_updated_quantities_reach_the_rollup_through_the_line_items(db):
+    partitions.ensure_partitions(db, DATE, DATE)
+    entry = data.SalesCreate(date=DATE, location='CRUD test', customer_name='CRUD test quantities', sales_rep='CRUD test',
+                             mango=2)
+    created = dashboard.create_new_entry(db=db, entry=entry, current_user=None)
+    dashboard.update_entry(created["id"], db=db, entry=data.SalesUpdate(mango=0, orange=3), current_user=None)
+
+    rollup = admin.SalesDailyRollup
+    assert db.execute(select(rollup.mango, rollup.orange, rollup.sale_transactions)
+                      .where(rollup.location == 'CRUD test')).one() == (0, 3, 1)
+    overview = analytics.sales_overview(db, data.DashboardFilters(customer_name='CRUD test quantities'))
+    assert (overview["product_totals"]["mango"], overview["product_totals"]["orange"]) == (0, 3)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from threading import Thread
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+
+try:
+    from app.models import admin
+    from app.utilities import customers, line_items, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+NAME = 'Concurrent refresh test'
+OTHER_NAME = 'Concurrent refresh other test'
+
+
+def _add_sale(db: Session, date: datetime) -> int:
+    sale_id = db.execute(insert(admin.SalesData).values(date=date, location='Customers test', customer_name=NAME,
+                                                        sales_rep='Customers test', mango=1)
+                         .returning(admin.SalesData.id)).scalar_one()
+    line_items.sync_line_items(db, admin.SalesData.id == sale_id)
+    customers.refresh_customers(db, admin.SalesData.id == sale_id)
+    return sale_id
+
+
+def test_concurrent_refreshes_of_a_customer_both_count(engine):
+    """The second writer's refresh waits for the first to commit and sees its row."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        partitions.ensure_partitions(db, now, now)
+        db.commit()
+    first, second = Session(engine), Session(engine)
+    ids = []
+    try:
+        ids.append(_add_sale(first, now))
+        thread = Thread(target=lambda: ids.append(_add_sale(second, now + timedelta(seconds=1))))
+        thread.start()
+        thread.join(1)
+        first.commit()
+        thread.join(10)
+        second.commit()
+        with Session(engine) as db:
+            transactions = db.execute(select(admin.Customer.transactions)
+                                      .where(admin.Customer.name == NAME)).scalar_one()
+        assert transactions == 2
+    finally:
+        first.close()
+        second.close()
+        with Session(engine) as db:
+            db.execute(delete(admin.SalesData).where(admin.SalesData.customer_name == NAME))
+            db.execute(delete(admin.Customer).where(admin.Customer.name == NAME))
+            db.commit()
+
+
+def test_refreshes_of_other_customers_do_not_wait(engine):
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        partitions.ensure_partitions(db, now, now)
+        db.commit()
+    first, second = Session(engine), Session(engine)
+    try:
+        _add_sale(first, now)
+        second.execute(text("SET LOCAL lock_timeout = '2s'"))
+        second.execute(insert(admin.SalesData).values(date=now, location='Customers test', customer_name=OTHER_NAME,
+                                                      sales_rep='Customers test', mango=1))
+        customers.refresh_customers(second, admin.SalesData.customer_name == OTHER_NAME)
+    finally:
+        first.rollback()
+        second.rollback()
+        first.close()
+        second.close()
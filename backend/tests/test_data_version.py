@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+try:
+    from app.utilities.data_version import _matches
+except ValidationError as e:
+    pytest.skip(f"Settings are not configured: {e}", allow_module_level=True)
+
+ETAG = 'W/"12-abcdef"'
+
+
+@pytest.mark.parametrize('if_none_match, matches', [
+    (None, False),
+    ('', False),
+    ('W/"12-abcdef"', True),
+    ('"12-abcdef"', True),
+    ('"11-abcdef", W/"12-abcdef"', True),
+    ('  "11-abcdef" ,"12-abcdef"  ', True),
+    ('*', True),
+    ('"11-abcdef"', False),
+    ('W/"12-abcdeg"', False),
+])
+def test_if_none_match(if_none_match, matches):
+    assert _matches(if_none_match, ETAG) is matches
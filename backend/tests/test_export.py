@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+import pytest
+from pydantic import ValidationError
+
+try:
+    from app.utilities import export
+except ValidationError as e:
+    pytest.skip(f"Settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2025, 3, 1, 9, 30, tzinfo=timezone.utc)
+ROWS = [
+    [1, DATE, 'Ikeja', 'Ada, "the" customer', None, 1.0, 0.0, None, 2.5, 0.0, 'Ade', 7],
+    [2, DATE, 'Yaba', 'Bola\nNewline', '0801', 0.0, 3.0, 0.0, 0.0, 1.0, 'Dayo', None],
+]
+
+
+def _export(file_format: str, batches: list[list]) -> bytes:
+    encoder = export.ENCODERS[file_format]()
+    return encoder.start() + b''.join(encoder.encode(rows) for rows in batches) + encoder.finish()
+
+
+def test_csv_has_a_header_and_quotes_values():
+    rows = list(csv.reader(io.StringIO(_export('csv', [ROWS[:1], ROWS[1:]]).decode())))
+    assert rows[0] == export.EXPORT_COLUMNS
+    assert rows[1][1] == DATE.isoformat() and rows[1][3] == 'Ada, "the" customer' and rows[1][4] == ''
+    assert rows[2][3] == 'Bola\nNewline'
+    assert len(rows) == 3
+
+
+def test_ndjson_has_an_object_per_row():
+    lines = _export('ndjson', [ROWS[:1], ROWS[1:]]).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {**dict(zip(export.EXPORT_COLUMNS, row)), "date": DATE.isoformat()} for row in ROWS
+    ]
+
+
+def test_parquet_has_a_row_group_per_batch():
+    parquet = pq.ParquetFile(io.BytesIO(_export('parquet', [ROWS[:1], ROWS[1:]])))
+    assert parquet.schema_arrow == export.PARQUET_SCHEMA
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().to_pylist() == [dict(zip(export.EXPORT_COLUMNS, row)) for row in ROWS]
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'ndjson', 'parquet'])
+def test_empty_export(file_format):
+    content = _export(file_format, [])
+    if file_format == 'parquet':
+        assert pq.read_table(io.BytesIO(content)).num_rows == 0
+    else:
+        assert content == (b'' if file_format == 'ndjson' else (','.join(export.EXPORT_COLUMNS) + '\r\n').encode())
@@ -0,0 +1,86 @@
+"""The dashboard filters and customer search use the indexes of migration 2c1aa8d58fef.
+
+Rows are loaded into a new partition of their own and analyzed. Each query's plan is read with
+EXPLAIN, then read again after dropping the index in the same transaction: the index must be
+in the first plan and make it cheaper than the second.
+"""
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import func, select, text
+
+try:
+    from app.models import admin
+    from app.schemas import data
+    from app.utilities import analytics, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+MONTH = date(2099, 1, 1)
+ROWS = 20_000
+
+name = func.lower(admin.SalesData.customer_name)
+
+
+def _filtered(**filters):
+    return select(func.count(), func.sum(admin.SalesData.mango)).where(
+        *analytics.build_filter_conditions(data.DashboardFilters(**filters)))
+
+
+def _search(condition):
+    # As in GET /sales/customers/search.
+    return select(admin.SalesData.customer_name, func.count()).where(condition) \
+        .group_by(admin.SalesData.customer_name).order_by(admin.SalesData.customer_name).limit(10)
+
+
+CASES = {
+    'ix_sales_data_location_date': _filtered(location='Plan location 3', start_date='2099-01-05', end_date='2099-01-10'),
+    'ix_sales_data_sales_rep_date': _filtered(sales_rep='Plan rep 7', start_date='2099-01-05', end_date='2099-01-10'),
+    'ix_sales_data_customer_name_date': _filtered(customer_name='Plan customer 00042'),
+    'ix_sales_data_customer_name_prefix': _search(name.startswith('plan customer 0004', autoescape=True)),
+    'ix_sales_data_customer_name_trgm': _search(name.contains('n customer 0004', autoescape=True)),
+}
+
+
+@pytest.fixture
+def sales(new_partition, db):
+    new_partition(MONTH)
+    partitions.ensure_partitions(db, MONTH, MONTH)
+    db.execute(text(
+        "INSERT INTO sales_data (date, location, customer_name, sales_rep, mango) "
+        "SELECT timestamptz '2099-01-01 00:00+00' + n * interval '2 minutes', 'Plan location ' || n % 10, "
+        "'Plan customer ' || lpad((n % 2000)::text, 5, '0'), 'Plan rep ' || n % 10, n % 5 "
+        "FROM generate_series(1, :rows) AS n"
+    ), {"rows": ROWS})
+    db.execute(text(f"ANALYZE {partitions.partition_name(MONTH)}"))
+    return db
+
+
+def _plan(db, statement) -> dict:
+    sql = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]['Plan']
+
+
+def _indexes(db, plan: dict) -> set[str]:
+    """The indexes a plan scans, by the name of their partitioned parent."""
+    names, nodes = set(), [plan]
+    while nodes:
+        node = nodes.pop()
+        if 'Index Name' in node:
+            names.add(node['Index Name'])
+        nodes.extend(node.get('Plans', ()))
+    return set(db.execute(text("SELECT pg_partition_root(oid)::regclass::text FROM pg_class WHERE relname = ANY(:names)"),
+                          {"names": list(names)}).scalars())
+
+
+@pytest.mark.parametrize('index', CASES)
+def test_filter_uses_index(sales, index):
+    if not sales.execute(text("SELECT to_regclass(:index)"), {"index": index}).scalar():
+        pytest.skip(f"{index} doesn't exist (pg_trgm is unavailable)")
+    with_index = _plan(sales, CASES[index])
+    assert index in _indexes(sales, with_index)
+
+    sales.execute(text(f"DROP INDEX {index}"))
+    without_index = _plan(sales, CASES[index])
+    assert with_index['Total Cost'] < without_index['Total Cost']
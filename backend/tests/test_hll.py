@@ -0,0 +1,62 @@
+from hashlib import blake2b
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from app.utilities import hll
+from app.utilities.hll import HyperLogLog
+
+
+def _values(start: int, stop: int) -> list[str]:
+    return [f'value {i}' for i in range(start, stop)]
+
+
+def _dense_registers(values) -> np.ndarray:
+    """Registers built straight from the 64-bit hashes, as plain HyperLogLog does."""
+    rank_bits = 64 - hll.PRECISION
+    registers = np.zeros(1 << hll.PRECISION, dtype=np.uint8)
+    for value in values:
+        hashed = int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        rank = rank_bits - (hashed & ((1 << rank_bits) - 1)).bit_length() + 1
+        registers[hashed >> rank_bits] = max(registers[hashed >> rank_bits], rank)
+    return registers
+
+
+@pytest.mark.parametrize('count', [100, hll.SPARSE_LIMIT + 1, 20_000])
+def test_sparse_to_dense_matches_registers_built_directly(count):
+    values = _values(0, count)
+    sketch = HyperLogLog.of(values)
+    registers = sketch.registers if not sketch.is_sparse else hll._registers(sketch.entries)
+    assert np.array_equal(registers, _dense_registers(values))
+
+
+def test_merge_is_order_independent():
+    parts = [HyperLogLog.of(_values(0, 300)), HyperLogLog.of(_values(200, 3000)), HyperLogLog.of(_values(2500, 2600))]
+    serialized = [part.to_bytes() for part in parts]
+    merged = {HyperLogLog().merge(HyperLogLog.from_bytes(serialized[a])).merge(HyperLogLog.from_bytes(serialized[b]))
+              .merge(HyperLogLog.from_bytes(serialized[c])).to_bytes() for a, b, c in permutations(range(3))}
+    merged |= {HyperLogLog.merge_all(order).to_bytes() for order in permutations(serialized)}
+    assert merged == {HyperLogLog.of(_values(0, 3000)).to_bytes()}
+
+
+@pytest.mark.parametrize('count', [0, 10, 5000])
+def test_bytes_round_trip(count):
+    sketch = HyperLogLog.of(_values(0, count))
+    data = sketch.to_bytes()
+    restored = HyperLogLog.from_bytes(data)
+    assert restored.is_sparse == sketch.is_sparse
+    assert restored.to_bytes() == data
+    assert restored.count() == sketch.count()
+
+
+@pytest.mark.parametrize('data', [b'', b'X\x0cS', b'H\x0bD' + bytes(1 << 11)])
+def test_merge_all_rejects_other_data(data):
+    with pytest.raises(ValueError):
+        HyperLogLog.merge_all([HyperLogLog().to_bytes(), data])
+
+
+@pytest.mark.parametrize('count', [500, 3000, 20_000, 200_000])
+def test_estimate_within_three_standard_errors(count):
+    error = 1.04 / np.sqrt(1 << hll.PRECISION)
+    assert abs(HyperLogLog.of(_values(0, count)).count() - count) <= 3 * error * count
@@ -0,0 +1,69 @@
+"""Stream connections match rows exactly as the endpoints' SQL filters do."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+
+try:
+    from app.models import admin
+    from app.schemas import data
+    from app.utilities import analytics, database, live, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+MIDNIGHT = datetime(2025, 3, 1, tzinfo=timezone.utc)
+# A second either side of midnight in UTC and in Lagos (UTC+1).
+DATES = [MIDNIGHT + timedelta(hours=hours, seconds=seconds) for hours in (-1, 0) for seconds in (-1, 0, 1)]
+LOCATIONS = ['-', 'other', 'Live test']
+
+
+@pytest.mark.parametrize('time_zone', ['UTC', 'Africa/Lagos'])
+@pytest.mark.parametrize('filters', [
+    {"end_date": '2025-03-01'},
+    {"start_date": '2025-03-01'},
+    {"start_date": '2025-02-28T23:00:00', "end_date": '2025-03-01T00:00:00+00:00'},
+    {"location": 'other'},
+    {"location": '-', "end_date": '2025-03-01'},
+    {"location": 'Live test', "start_date": '2025-03-01'},
+])
+def test_subscription_matches_the_sql_filters(db, time_zone, filters):
+    partitions.ensure_partitions(db, DATES[0], DATES[-1])
+    db.execute(select(func.set_config('TimeZone', time_zone, True)))
+    sales = admin.SalesData
+    ids = db.execute(insert(sales).returning(sales.id), [
+        {"date": date, "location": location, "customer_name": 'Live test', "sales_rep": 'Live test', "mango": 1}
+        for date in DATES for location in LOCATIONS
+    ]).scalars().all()
+    filters = data.DashboardFilters(**filters)
+    expected = set(db.execute(select(sales.id).where(sales.id.in_(ids), *analytics.build_filter_conditions(filters)))
+                   .scalars())
+
+    start, end = db.execute(select(analytics.date_bound(filters.start_date), analytics.date_bound(filters.end_date))).one()
+    subscription = live.Subscription(filters, start, end)
+    rows = db.execute(select(*[getattr(sales, column) for column in live.ROW_COLUMNS]).where(sales.id.in_(ids))).all()
+    # As the rows arrive from a notification.
+    parsed = [live._parse(orjson.loads(orjson.dumps(live._encode_row(row)))) for row in rows]
+    assert {row.record['id'] for row in parsed if subscription.matches(row)} == expected
+    assert expected and expected != set(ids)
+
+
+def _subscribe(filters: data.DashboardFilters) -> live.Subscription:
+    async def subscribe():
+        try:
+            return await live.SalesFeed().subscribe(filters)
+        finally:
+            await database.AsyncReadSessionLocal.kw['bind'].dispose()
+    return asyncio.run(subscribe())
+
+
+def test_subscribe_reads_the_bounds_in_postgres(engine):
+    subscription = _subscribe(data.DashboardFilters(start_date='2025-02-28', end_date='2025-03-01T01:00:00+01:00'))
+    assert (subscription.start, subscription.end) == (MIDNIGHT - timedelta(days=1), MIDNIGHT)
+
+    with pytest.raises(HTTPException) as raised:
+        _subscribe(data.DashboardFilters(end_date='2025-02-30'))
+    assert raised.value.status_code == 400
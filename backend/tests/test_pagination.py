@@ -0,0 +1,35 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.utilities import pagination
+
+
+@pytest.mark.parametrize('key, key_type', [
+    (datetime(2025, 3, 1, 9, 30, tzinfo=timezone.utc), datetime),
+    (1234.5, float),
+])
+def test_cursor_round_trip(key, key_type):
+    cursor = pagination.encode_cursor(key, 42)
+    assert '=' not in cursor
+    assert pagination.decode_cursor(cursor, key_type) == (key, 42)
+
+
+def _token(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    _token(b'not json'),
+    _token(b'["2025-03-01T09:30:00+00:00"]'),
+    _token(b'["yesterday", 42]'),
+    _token(b'["2025-03-01T09:30:00+00:00", "x"]'),
+    _token(b'{"key": 1}'),
+])
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as raised:
+        pagination.decode_cursor(cursor)
+    assert raised.value.status_code == 400
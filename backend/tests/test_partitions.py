@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+try:
+    from app.models import admin
+    from app.utilities import partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2098, 6, 1, 9, tzinfo=timezone.utc)
+
+
+def test_new_partition_does_not_lock_sales_data_for_the_writer(engine, new_partition):
+    name = new_partition(DATE)
+    writer = Session(engine)
+    try:
+        assert partitions.ensure_partitions(writer, DATE, DATE) == [name]
+        writer.execute(insert(admin.SalesData).values(date=DATE, location='Partition test', customer_name='Partition test',
+                                                     sales_rep='Partition test'))
+        # The writer's transaction is still open; a reader doesn't wait for it.
+        with engine.connect() as reader:
+            reader.execute(text("SET lock_timeout = '2s'"))
+            assert reader.execute(select(func.count()).select_from(admin.SalesData)
+                                  .where(admin.SalesData.date == DATE)).scalar() == 0
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_new_partition_after_reading_sales_data_is_created_in_the_transaction(engine, new_partition):
+    name = new_partition(DATE)
+    # A connection of its own would wait for this transaction's lock on sales_data; time it out instead.
+    impatient = create_engine(engine.url, connect_args={"options": "-c lock_timeout=5s"})
+    try:
+        with Session(impatient) as db:
+            db.execute(select(func.count()).select_from(admin.SalesData))
+            assert partitions.ensure_partitions(db, DATE, DATE) == [name]
+            db.rollback()
+        with engine.connect() as connection:
+            assert name not in partitions.partitions(connection)
+    finally:
+        impatient.dispose()
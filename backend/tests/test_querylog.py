@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+try:
+    from app.utilities.querylog import _explain_options
+except ValidationError as e:
+    pytest.skip(f"Settings are not configured: {e}", allow_module_level=True)
+
+
+@pytest.mark.parametrize('statement, options', [
+    ("SELECT sales_data.id FROM sales_data WHERE sales_data.location = %(location_1)s", '(ANALYZE, BUFFERS)'),
+    ("WITH days AS (SELECT 1) SELECT * FROM days", '(ANALYZE, BUFFERS)'),
+    ("SELECT pg_notify(%(pg_notify_1)s, %(pg_notify_2)s) AS pg_notify_1", ''),
+    ("SELECT pg_advisory_xact_lock(%(pg_advisory_xact_lock_1)s)", ''),
+    ("SELECT nextval('sales_data_id_seq')", ''),
+    ("SELECT sales_data.id FROM sales_data WHERE sales_data.id = %(id_1)s FOR UPDATE", ''),
+    ("SELECT customers.id FROM customers FOR NO KEY UPDATE", ''),
+    ("UPDATE sales_data SET mango=%(mango)s WHERE sales_data.id = %(id_1)s", ''),
+    ("WITH moved AS (DELETE FROM sales_data RETURNING id) SELECT count(*) FROM moved", ''),
+    ("COPY sales_upload_staging FROM STDIN", None),
+    ("SAVEPOINT sa_savepoint_1", None),
+])
+def test_explain_options(statement, options):
+    assert _explain_options(statement) == options
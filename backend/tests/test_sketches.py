@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+try:
+    from app.models import admin
+    from app.utilities import line_items, partitions, sketches
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2097, 4, 1, 9, tzinfo=timezone.utc)
+
+
+def _add_sale(db: Session, date: datetime):
+    sale_id = db.execute(insert(admin.SalesData).values(date=date, location='Sketches test', customer_name='Sketches test',
+                                                        sales_rep='Sketches test', mango=1)
+                         .returning(admin.SalesData.id)).scalar_one()
+    line_items.sync_line_items(db, admin.SalesData.id == sale_id)
+    sketches.add_sales(db, admin.SalesData.id == sale_id)
+
+
+@pytest.mark.parametrize('days_apart, waits', [(1, False), (0, True)])
+def test_writers_of_a_day_wait_for_each_other(engine, new_partition, days_apart, waits):
+    new_partition(DATE)
+    with Session(engine) as db:
+        partitions.ensure_partitions(db, DATE, DATE)
+    first, second = Session(engine), Session(engine)
+    try:
+        _add_sale(first, DATE)
+        second.execute(text("SET LOCAL lock_timeout = '1s'"))
+        if waits:
+            with pytest.raises(OperationalError, match='lock timeout'):
+                _add_sale(second, DATE + timedelta(days=days_apart))
+        else:
+            _add_sale(second, DATE + timedelta(days=days_apart))
+    finally:
+        first.rollback()
+        second.rollback()
+        first.close()
+        second.close()
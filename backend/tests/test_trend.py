@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+try:
+    from app.models import admin
+    from app.schemas import data
+    from app.utilities import analytics, line_items, partitions
+except ValidationError as e:
+    pytest.skip(f"Database settings are not configured: {e}", allow_module_level=True)
+
+DATE = datetime(2099, 2, 3, 9, tzinfo=timezone.utc)
+DAYS = 5
+
+
+@pytest.fixture
+def sales(new_partition, db):
+    new_partition(DATE)
+    partitions.ensure_partitions(db, DATE, DATE)
+    db.execute(insert(admin.SalesData), [
+        {"date": DATE + timedelta(days=day), "location": 'Trend test', "customer_name": 'Trend test',
+         "sales_rep": 'Trend test', "mango": 1} for day in range(DAYS)
+    ])
+    line_items.sync_line_items(db, admin.SalesData.customer_name == 'Trend test')
+    return db
+
+
+def test_granularity_follows_the_data_without_gap_filling(sales):
+    filters = data.DashboardFilters(customer_name='Trend test', start_date='2000-01-01')
+    trend = analytics.sales_trend(sales, filters, max_points=10)
+    assert trend["granularity"] == 'day'
+    assert [point["date"] for point in trend["points"]] == \
+        [(DATE + timedelta(days=day)).date().isoformat() for day in range(DAYS)]
+
+
+def test_granularity_follows_the_range_with_gap_filling(sales):
+    filters = data.DashboardFilters(customer_name='Trend test', start_date='2098-10-01')
+    trend = analytics.sales_trend(sales, filters, fill_gaps=True, max_points=10)
+    assert trend["granularity"] == 'month'
+    assert len(trend["points"]) == 5
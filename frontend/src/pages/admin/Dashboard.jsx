@@ -20,17 +20,12 @@ export default function Dashboard() {
   const fetchDashboardData = async () => {
     try {
       setError(null)
-      const [overviewRes, dailyRes, repRes, locationRes] = await Promise.all([
-        api.get('/sales/overview'),
-        api.get('/sales/daily'),
-        api.get('/sales/performances'),
-        api.get('/sales/locations')
-      ])
+      const { data } = await api.get('/sales/dashboard')
 
-      setOverview(overviewRes.data)
-      setDailySales(dailyRes.data.daily_sales?.slice(-14) || [])
-      setRepPerformance(repRes.data.rep_performance?.slice(0, 5) || [])
-      setLocationPerformance(locationRes.data.location_performance?.slice(0, 5) || [])
+      setOverview(data.overview)
+      setDailySales(data.daily?.daily_sales?.slice(-14) || [])
+      setRepPerformance(data.performances?.rep_performance?.slice(0, 5) || [])
+      setLocationPerformance(data.locations?.location_performance?.slice(0, 5) || [])
     } catch (error) {
       console.error('Error fetching dashboard data:', error)
       setError(error.response?.data?.detail || 'Failed to load dashboard data')
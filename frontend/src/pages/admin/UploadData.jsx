@@ -4,6 +4,8 @@ import DashboardLayout from '../../components/DashboardLayout'
 import { AuthContext } from '../../context/AuthContext'
 import api from '../../utils/api'
 
+const UPLOAD_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.parquet']
+
 export default function UploadData() {
   const { user, loading: authLoading } = useContext(AuthContext)
   const [file, setFile] = useState(null)
@@ -32,12 +34,12 @@ export default function UploadData() {
 
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0]
-    if (selectedFile && (selectedFile.name.endsWith('.xlsx') || selectedFile.name.endsWith('.xls'))) {
+    if (selectedFile && UPLOAD_EXTENSIONS.some(ext => selectedFile.name.toLowerCase().endsWith(ext))) {
       setFile(selectedFile)
       setError(null)
     } else {
       setFile(null)
-      setError('Please select a valid Excel file (.xlsx or .xls)')
+      setError('Please select a valid Excel, CSV or Parquet file (.xlsx, .xls, .csv, .parquet)')
     }
   }
 
@@ -79,7 +81,7 @@ export default function UploadData() {
         <div className="flex justify-between items-end border-b border-gray-800 pb-6">
           <div>
             <h1 className="text-5xl font-light text-white tracking-tight">Upload Data</h1>
-            <p className="text-gray-500 mt-3 text-sm tracking-wider">Import sales data from Excel files</p>
+            <p className="text-gray-500 mt-3 text-sm tracking-wider">Import sales data from Excel, CSV or Parquet files</p>
           </div>
         </div>
 
@@ -102,12 +104,12 @@ export default function UploadData() {
                     <input
                       id="file-upload"
                       type="file"
-                      accept=".xlsx,.xls"
+                      accept={UPLOAD_EXTENSIONS.join(',')}
                       onChange={handleFileChange}
                       className="sr-only"
                     />
                   </label>
-                  <p className="mt-4 text-xs text-gray-600 tracking-wider">EXCEL FILES ONLY (.XLSX, .XLS)</p>
+                  <p className="mt-4 text-xs text-gray-600 tracking-wider">EXCEL, CSV OR PARQUET (.XLSX, .XLS, .CSV, .PARQUET)</p>
                 </div>
                 {file && (
                   <div className="mt-6 text-xs text-gray-400">